@@ -1,3 +1,6 @@
+import heapq
+
+
 class PriorityQueue(object):
     """A priority queue implemented using multiple internal queues (typically,
     FIFO queues). The internal queue must implement the following methods:
@@ -27,14 +30,25 @@ class PriorityQueue(object):
         """
         # 队列queue由散列表实现，k存储优先级，v储存这一优先级的Queue(根据qfactory的不同)的队列
         self.queues = {}
+        # heap of the priorities in self.queues, so that the next priority
+        # can be found without scanning all the internal queues when one of
+        # them is drained
+        self.prios = []
+        # running count of objects, to avoid summing the length of all the
+        # internal queues in __len__
+        self._len = 0
         # qfactory是队列的工厂类，主要包括queuelib.queue.py下面的FifoDiskQueue、LifoDiskQueue等六个类，分别是在文件、内存、SQLite三种存储介质上的队列和
         # 栈类。这个qfactory就是我们上面提到的hash表的value
         self.qfactory = qfactory
         for p in startprios:
             # 如果qfactory是FifoDiskQueue或LifoDiskSQLite这种磁盘型队列，则从文件夹+“队列”的形式读取，如果内存型队列则没有缓存
-            self.queues[p] = self.qfactory(p)
+            if p not in self.queues:
+                self.queues[p] = self.qfactory(p)
+                self._len += len(self.queues[p])
+        self.prios = list(self.queues)
+        heapq.heapify(self.prios)
         # curprio 可以看成是一个指针，指向最高优先级的队列桶
-        self.curprio = min(startprios) if startprios else None
+        self.curprio = self.prios[0] if self.prios else None
 
     def push(self, obj, priority=0):
         """
@@ -48,13 +62,20 @@ class PriorityQueue(object):
         """
         # 如果hash表中没有则赋值
         if priority not in self.queues:
-            self.queues[priority] = self.qfactory(priority)
-        q = self.queues[priority]
-        # 该优先级队列push一个obj
-        q.push(obj)  # this may fail (eg. serialization error)
+            q = self.qfactory(priority)
+            try:
+                q.push(obj)  # this may fail (eg. serialization error)
+            except Exception:
+                q.close()
+                raise
+            self.queues[priority] = q
+            heapq.heappush(self.prios, priority)
+        else:
+            # 该优先级队列push一个obj
+            self.queues[priority].push(obj)  # this may fail (eg. serialization error)
+        self._len += 1
         # 保持指针指向最大优先级
-        if self.curprio is None or priority < self.curprio:
-            self.curprio = priority
+        self.curprio = self.prios[0]
 
     def pop(self):
         """
@@ -68,15 +89,21 @@ class PriorityQueue(object):
         q = self.queues[self.curprio]
         # 返回队列数据
         m = q.pop()
+        if m is not None:
+            self._len -= 1
         # 如果pop后队列为空，则删除该优先级的队列，同时重新计算指向最大优先级的指针
         if len(q) == 0:
-            del self.queues[self.curprio]
-            q.close()
-            prios = [p for p, q in self.queues.items() if len(q) > 0]
-            self.curprio = min(prios) if prios else None
+            self._discard_empty()
         # 返回pop对象
         return m
 
+    def _discard_empty(self):
+        # drop the drained internal queues at the top of the heap (queues
+        # passed in startprios may be empty too)
+        while self.prios and len(self.queues[self.prios[0]]) == 0:
+            self.queues.pop(heapq.heappop(self.prios)).close()
+        self.curprio = self.prios[0] if self.prios else None
+
     def close(self):
         """
         关闭队列并保存：如果队列长度大于0，返回该优先级
@@ -97,4 +124,4 @@ class PriorityQueue(object):
 
         """
 
-        return sum(len(x) for x in self.queues.values()) if self.queues else 0
+        return self._len
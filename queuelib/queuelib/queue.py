@@ -3,9 +3,13 @@ import glob
 import json
 import struct
 import sqlite3
+import time
 from collections import deque
 
 
+_replace = getattr(os, 'replace', os.rename)
+
+
 class FifoMemoryQueue(object):
     """In-memory FIFO queue, API compliant with FifoDiskQueue."""
 
@@ -127,6 +131,155 @@ class FifoDiskQueue(object):
             os.rmdir(self.path)
 
 
+class BufferedFifoDiskQueue(FifoDiskQueue):
+    """Persistent FIFO queue, with buffered writes and reads.
+
+    Pushed records are written to disk in blocks of ``buffersize`` bytes, and
+    records are read ahead in blocks of the same size when popping. Files are
+    compatible with FifoDiskQueue.
+
+    The queue state is saved (after writing and fsyncing buffered records)
+    every ``checkpoint_count`` pushed or popped records and every
+    ``checkpoint_interval`` seconds, if given, and whenever a chunk is
+    removed. If the process crashes, records pushed after the last checkpoint
+    are lost and records popped after it are popped again; leftover records
+    are removed from the chunk files when the queue is reopened.
+    """
+
+    def __init__(self, path, chunksize=100000, buffersize=65536,
+                 checkpoint_count=None, checkpoint_interval=None):
+        self.buffersize = buffersize
+        self.checkpoint_count = checkpoint_count
+        self.checkpoint_interval = checkpoint_interval
+        self._wbuf = []
+        self._wbufsize = 0
+        self._rbuf = b''
+        self._rpos = 0
+        self._ops = 0
+        self._lastcheckpoint = time.time()
+        super(BufferedFifoDiskQueue, self).__init__(path, chunksize)
+        self._truncate_head()
+
+    def _truncate_head(self):
+        """Remove the records written after the last saved state, which are
+        left in the head chunk and in later chunks if the process crashed"""
+        hnum = self.info['head'][0]
+        for x in glob.glob(os.path.join(self.path, 'q*')):
+            try:
+                num = int(os.path.basename(x)[1:])
+            except ValueError:
+                continue
+            if num > hnum:
+                os.remove(x)
+        hfd = self.headf.fileno()
+        offset = 0
+        for _ in range(self.info['head'][1]):
+            os.lseek(hfd, offset, os.SEEK_SET)
+            szhdr = os.read(hfd, self.szhdr_size)
+            if len(szhdr) < self.szhdr_size:
+                return
+            size, = struct.unpack(self.szhdr_format, szhdr)
+            offset += self.szhdr_size + size
+        if os.fstat(hfd).st_size > offset:
+            self.headf.truncate(offset)
+
+    def push(self, string):
+        if not isinstance(string, bytes):
+            raise TypeError('Unsupported type: {}'.format(type(string).__name__))
+        hnum, hpos = self.info['head']
+        hpos += 1
+        self._wbuf.append(struct.pack(self.szhdr_format, len(string)))
+        self._wbuf.append(string)
+        self._wbufsize += self.szhdr_size + len(string)
+        if hpos == self.chunksize:
+            self._flush()
+            hpos = 0
+            hnum += 1
+            self.headf.close()
+            self.headf = self._openchunk(hnum, 'ab+')
+        elif self._wbufsize >= self.buffersize:
+            self._flush()
+        self.info['size'] += 1
+        self.info['head'] = [hnum, hpos]
+        self._maybe_checkpoint()
+
+    def _flush(self):
+        if not self._wbuf:
+            return
+        data = b''.join(self._wbuf)
+        hfd = self.headf.fileno()
+        while data:
+            data = data[os.write(hfd, data):]
+        self._wbuf = []
+        self._wbufsize = 0
+
+    def _read(self, size):
+        while len(self._rbuf) - self._rpos < size:
+            data = os.read(self.tailf.fileno(), max(self.buffersize, size))
+            if not data:
+                break
+            self._rbuf = self._rbuf[self._rpos:] + data
+            self._rpos = 0
+        data = self._rbuf[self._rpos:self._rpos + size]
+        self._rpos += len(data)
+        return data
+
+    def pop(self):
+        tnum, tcnt, toffset = self.info['tail']
+        if [tnum, tcnt] >= self.info['head']:
+            return
+        if tnum == self.info['head'][0]:
+            self._flush()
+        szhdr = self._read(self.szhdr_size)
+        if not szhdr:
+            return
+        size, = struct.unpack(self.szhdr_format, szhdr)
+        data = self._read(size)
+        tcnt += 1
+        toffset += self.szhdr_size + size
+        self.info['size'] -= 1
+        if tcnt == self.chunksize and tnum <= self.info['head'][0]:
+            tailf = self.tailf
+            self.tailf = self._openchunk(tnum + 1)
+            self._rbuf = b''
+            self._rpos = 0
+            self.info['tail'] = [tnum + 1, 0, 0]
+            # save the state before removing the chunk it used to point to
+            self.checkpoint()
+            tailf.close()
+            os.remove(tailf.name)
+        else:
+            self.info['tail'] = [tnum, tcnt, toffset]
+            self._maybe_checkpoint()
+        return data
+
+    def _maybe_checkpoint(self):
+        self._ops += 1
+        if self.checkpoint_count and self._ops >= self.checkpoint_count:
+            self.checkpoint()
+        elif (self.checkpoint_interval is not None
+                and time.time() - self._lastcheckpoint >= self.checkpoint_interval):
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Write buffered records to disk and save the queue state"""
+        self._flush()
+        os.fsync(self.headf.fileno())
+        self._saveinfo(self.info)
+        self._ops = 0
+        self._lastcheckpoint = time.time()
+
+    def close(self):
+        self._flush()
+        super(BufferedFifoDiskQueue, self).close()
+
+    def _saveinfo(self, info):
+        infopath = self._infopath()
+        with open(infopath + '.tmp', 'w') as f:
+            json.dump(info, f)
+        _replace(infopath + '.tmp', infopath)
+
+
 
 class LifoDiskQueue(object):
     """Persistent LIFO queue."""
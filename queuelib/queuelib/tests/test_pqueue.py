@@ -34,6 +34,19 @@ class base:
             assert not self.q
             self.assertEqual(len(self.q), 0)
 
+        def test_many_priorities(self):
+            prios = [(i * 7919) % 1000 for i in range(1000)]
+            for prio in prios:
+                self.q.push(str(prio).encode(), prio)
+            self.assertEqual(len(self.q), 1000)
+            for i in range(1000):
+                self.assertEqual(self.q.curprio, i)
+                self.assertEqual(self.q.pop(), str(i).encode())
+                self.assertEqual(len(self.q), 999 - i)
+            self.assertEqual(self.q.curprio, None)
+            self.assertEqual(self.q.pop(), None)
+            self.assertEqual(self.q.queues, {})
+
         def test_close(self):
             self.q.push(b'a', 3)
             self.q.push(b'b', 1)
@@ -137,6 +150,7 @@ class DiskTestMixin(object):
         self.q.push(b'b', 1)
         self.assertRaises(TypeError, self.q.push, lambda x: x, 0)
         self.q.push(b'c', 2)
+        self.assertEqual(len(self.q), 3)
         self.assertEqual(self.q.pop(), b'b')
         self.assertEqual(self.q.pop(), b'c')
         self.assertEqual(self.q.pop(), b'a')
@@ -150,6 +164,7 @@ class DiskTestMixin(object):
         q1.push(b'c', 2)
         active = q1.close()
         q2 = PriorityQueue(self.qfactory, startprios=active)
+        self.assertEqual(len(q2), 3)
         self.assertEqual(q2.pop(), b'b')
         self.assertEqual(q2.pop(), b'c')
         self.assertEqual(q2.pop(), b'a')
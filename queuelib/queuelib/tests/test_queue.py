@@ -4,6 +4,7 @@ import pytest
 
 from queuelib.queue import (
     FifoMemoryQueue, LifoMemoryQueue, FifoDiskQueue, LifoDiskQueue,
+    BufferedFifoDiskQueue,
     FifoSQLiteQueue, LifoSQLiteQueue,
 )
 from queuelib.tests import QueuelibTestCase
@@ -215,6 +216,106 @@ class ChunkSize4FifoDiskQueueTest(FifoDiskQueueTest):
     chunksize = 4
 
 
+class BufferedFifoDiskQueueTest(FifoDiskQueueTest):
+
+    buffersize = 65536
+
+    def queue(self, **kwargs):
+        kwargs.setdefault('buffersize', self.buffersize)
+        return BufferedFifoDiskQueue(self.qpath, chunksize=self.chunksize,
+                                     **kwargs)
+
+    def _reopen(self, q):
+        """Simulate a crash: drop the queue without closing it"""
+        q.headf.close()
+        q.tailf.close()
+        return self.queue()
+
+    def test_many_records(self):
+        q = self.queue()
+        values = [str(i).encode() * (i % 50) for i in range(1000)]
+        for x in values[:500]:
+            q.push(x)
+        self.assertEqual([q.pop() for _ in range(250)], values[:250])
+        for x in values[500:]:
+            q.push(x)
+        q.close()
+        q = self.queue()
+        self.assertEqual(len(q), 750)
+        self.assertEqual([q.pop() for _ in range(750)], values[250:])
+        self.assertEqual(q.pop(), None)
+        q.close()
+
+    def test_writes_are_buffered(self):
+        q = BufferedFifoDiskQueue(self.qpath, buffersize=1000)
+        q.push(b'a' * 10)
+        self.assertEqual(os.path.getsize(q.headf.name), 0)
+        q.push(b'a' * 1000)
+        self.assertEqual(os.path.getsize(q.headf.name), 2 * 4 + 1010)
+        q.close()
+
+    def test_checkpoint_count(self):
+        q = self.queue(checkpoint_count=3)
+        for x in [b'a', b'b', b'c', b'd']:
+            q.push(x)
+        q = self._reopen(q)
+        self.assertEqual(len(q), 3)
+        # records pushed after the last checkpoint are lost, and new records
+        # are not mixed with them
+        q.push(b'e')
+        self.assertEqual([q.pop() for _ in range(4)], [b'a', b'b', b'c', b'e'])
+        self.assertEqual(q.pop(), None)
+        q.close()
+
+    def test_crash_across_chunks(self):
+        q = self.queue()
+        first = [b'a%d' % i for i in range(self.chunksize + 5)]
+        for x in first[:2]:
+            q.push(x)
+        q.checkpoint()
+        for x in first[2:]:
+            q.push(x)
+        q = self._reopen(q)
+        self.assertEqual(len(q), 2)
+        # records of later chunks written after the checkpoint are dropped
+        second = [b'b%d' % i for i in range(self.chunksize + 2)]
+        for x in second:
+            q.push(x)
+        self.assertEqual([q.pop() for _ in range(len(q))], first[:2] + second)
+        self.assertEqual(q.pop(), None)
+        q.close()
+
+    def test_checkpoint_interval(self):
+        q = self.queue(checkpoint_interval=0)
+        q.push(b'a')
+        q.push(b'b')
+        self.assertEqual(q.pop(), b'a')
+        q = self._reopen(q)
+        self.assertEqual(len(q), 1)
+        self.assertEqual(q.pop(), b'b')
+        q.close()
+
+    def test_no_checkpoint(self):
+        q = self.queue()
+        q.push(b'a')
+        q = self._reopen(q)
+        self.assertEqual(len(q), 0)
+        q.close()
+
+
+class ChunkSize1BufferedFifoDiskQueueTest(BufferedFifoDiskQueueTest):
+    chunksize = 1
+
+
+class ChunkSize3BufferedFifoDiskQueueTest(BufferedFifoDiskQueueTest):
+    chunksize = 3
+
+
+class SmallBufferFifoDiskQueueTest(BufferedFifoDiskQueueTest):
+    chunksize = 3
+    buffersize = 1
+
+
 class LifoDiskQueueTest(LifoTestMixin, PersistentTestMixin, QueuelibTestCase):
 
     def queue(self):
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""
+Simulate a crawl of websites with synthetic latency profiles, without
+AutoThrottle, with AutoThrottle in delay mode and in concurrency mode, and
+report the throughput, the latency and the errors for each of them.
+
+Requests for a single download slot are dispatched like the downloader does
+(honouring the concurrency and the delay of the slot), on a virtual clock,
+and AutoThrottle is fed with the responses through its signal handlers.
+The simulated websites are:
+
+* fast: 50 ms responses, up to 32 concurrent requests without slowing down
+* slow: 500 ms responses, whose latency grows beyond 2 concurrent requests
+* limited: 100 ms responses, 429 responses beyond 10 requests per second
+* flaky: 200 ms responses, 5% of downloads time out after 3 s, whose
+  latency grows beyond 4 concurrent requests
+
+usage:
+
+    python extras/autothrottle-sim.py [number of requests]
+
+"""
+import heapq
+import random
+import sys
+from collections import deque
+from types import SimpleNamespace
+from unittest import mock
+
+from scrapy.core.downloader import Slot
+from scrapy.extensions.throttle import AutoThrottle
+from scrapy.http import Request, Response
+from scrapy.spiders import Spider
+from scrapy.utils.test import get_crawler
+
+
+class Website:
+
+    def __init__(self, latency, capacity, rate=None, failure_rate=0.0, timeout=3.0):
+        self.latency = latency
+        self.capacity = capacity
+        self.rate = rate
+        self.failure_rate = failure_rate
+        self.timeout = timeout
+        self.recent = deque()
+        self.random = random.Random(0)
+
+    def respond(self, now, inflight):
+        """Return the latency and the status of a request sent at ``now``
+        while ``inflight`` other requests are being served; the status is
+        ``None`` for failed downloads"""
+        if self.rate:
+            while self.recent and self.recent[0] <= now - 1:
+                self.recent.popleft()
+            if len(self.recent) >= self.rate:
+                return 0.02, 429
+            self.recent.append(now)
+        if self.random.random() < self.failure_rate:
+            return self.timeout, None
+        load = max(1.0, (inflight + 1) / self.capacity)
+        return self.latency * load * self.random.uniform(0.9, 1.1), 200
+
+
+WEBSITES = {
+    'fast': lambda: Website(0.05, 32),
+    'slow': lambda: Website(0.5, 2),
+    'limited': lambda: Website(0.1, 32, rate=10),
+    'flaky': lambda: Website(0.2, 4, failure_rate=0.05),
+}
+
+
+def simulate(website, mode, count):
+    settings = {'AUTOTHROTTLE_ENABLED': mode is not None}
+    if mode:
+        settings['AUTOTHROTTLE_MODE'] = mode
+    crawler = get_crawler(Spider, settings)
+    spider = crawler._create_spider('sim')
+    crawler.stats.open_spider(spider)
+    slot = Slot(crawler.settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN'), 0, False)
+    crawler.engine = SimpleNamespace(downloader=SimpleNamespace(slots={'sim': slot}))
+    throttle = AutoThrottle.from_crawler(crawler) if mode else None
+    if throttle:
+        throttle._spider_opened(spider)
+        slot.delay = spider.download_delay
+
+    now = 0.0
+    slot.lastseen = -1e9
+    events = []  # (time, sequence, request, status)
+    queued, done, sent = count, 0, 0
+    latencies, errors, peak = [], 0, 0
+    with mock.patch('scrapy.extensions.throttle.time', lambda: now):
+        while done < count:
+            while queued and slot.free_transfer_slots() > 0 and now >= slot.lastseen + slot.delay:
+                request = Request(f'http://sim/{sent}', meta={'download_slot': 'sim'})
+                if throttle and mode == 'concurrency':
+                    throttle._request_reached_downloader(request, spider)
+                latency, status = website.respond(now, len(slot.transferring))
+                slot.transferring.add(request)
+                peak = max(peak, len(slot.transferring))
+                request.meta['download_latency'] = latency
+                heapq.heappush(events, (now + latency, sent, request, status))
+                slot.lastseen = now
+                queued -= 1
+                sent += 1
+                if slot.delay:
+                    break
+            wakeups = [events[0][0]] if events else []
+            if queued and slot.free_transfer_slots() > 0:
+                wakeups.append(slot.lastseen + slot.delay)
+            now = max(now, min(wakeups))
+            while events and events[0][0] <= now:
+                _, _, request, status = heapq.heappop(events)
+                slot.transferring.remove(request)
+                if status is None or status == 429:
+                    errors += 1
+                    queued += 1  # retried
+                else:
+                    done += 1
+                    latencies.append(request.meta['download_latency'])
+                if throttle and status is not None:
+                    throttle._response_downloaded(Response(request.url, status=status),
+                                                  request, spider)
+                if throttle and mode == 'concurrency':
+                    throttle._request_left_downloader(request, spider)
+    latencies.sort()
+    return {
+        'elapsed': now,
+        'mean': sum(latencies) / len(latencies),
+        'p99': latencies[int(len(latencies) * 0.99) - 1],
+        'errors': errors,
+        'peak': peak,
+    }
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"{count} requests per website; failed and 429 requests are retried")
+    for name, website in WEBSITES.items():
+        print(f"  {name}")
+        for label, mode in [('no AutoThrottle', None), ('delay mode', 'delay'),
+                            ('concurrency mode', 'concurrency')]:
+            r = simulate(website(), mode, count)
+            print(f"    {label:<18} {r['elapsed']:8.1f} s {count / r['elapsed']:7.1f} req/s"
+                  f"  latency mean {r['mean'] * 1e3:6.0f} ms p99 {r['p99'] * 1e3:6.0f} ms"
+                  f"  errors {r['errors']:5d}  peak concurrency {r['peak']:3d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Measure the cookies middleware with many cookie jars (one session per
+account), and the cost of clearing expired cookies from a large jar.
+
+The first part sends requests through CookiesMiddleware, each of them using
+one of many cookiejar keys, with all the jars in memory, with
+COOKIES_MAX_JARS and with COOKIES_MAX_JARS plus COOKIES_JARS_DIR, and reports
+the latency per request and the memory peak.
+
+The second part fills a single jar with cookies from many domains and times
+add_cookie_header, clearing the expired cookies with the expiry heap and with
+the full scan of the standard library cookie jar.
+
+usage:
+
+    python extras/cookies-bench.py [number of jars] [number of requests]
+
+"""
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from http.cookiejar import CookieJar as _CookieJar
+from time import perf_counter
+from unittest import mock
+
+from scrapy.downloadermiddlewares.cookies import CookiesMiddleware
+from scrapy.http import Request, Response
+from scrapy.http.cookies import CookieJar
+from scrapy.spiders import Spider
+
+
+def percentile(latencies, p):
+    latencies = sorted(latencies)
+    return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))]
+
+
+def bench_sessions(jars, requests, max_jars=0, spill=False):
+    spider = Spider('bench')
+    tmpdir = tempfile.mkdtemp() if spill else None
+    mw = CookiesMiddleware(max_jars=max_jars, spill_dir=tmpdir)
+    latencies = []
+    tracemalloc.start()
+    try:
+        for i in range(requests):
+            jar = i % jars
+            url = f'http://www{jar % 100}.example.com/account/{jar}'
+            request = Request(url, meta={'cookiejar': jar})
+            headers = {'Set-Cookie': [f'session={jar}; Path=/',
+                                      f'visit={i}; Max-Age=3600; Path=/']}
+            start = perf_counter()
+            mw.process_request(request, spider)
+            mw.process_response(request, Response(url, headers=headers, request=request), spider)
+            latencies.append(perf_counter() - start)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        mw.jars.close()
+        if tmpdir:
+            shutil.rmtree(tmpdir)
+    return latencies, peak
+
+
+def bench_expiry(cookies, requests, full_scan=False):
+    jar = CookieJar()
+    if full_scan:
+        jar.jar.clear_expired_cookies = types.MethodType(_CookieJar.clear_expired_cookies, jar.jar)
+    domains = max(1, cookies // 10)
+    for i in range(cookies):
+        url = f'http://www{i % domains}.example.com/'
+        response = Response(url, headers={'Set-Cookie': f'c{i}=1; Max-Age={60 + i * 7 % 86400}'})
+        jar.extract_cookies(response, Request(url))
+
+    latencies = []
+    now = time.time()
+    for i in range(requests):
+        request = Request(f'http://www{i % domains}.example.com/')
+        # time goes by one second every 10 requests, expiring cookies
+        with mock.patch('time.time', return_value=now + i / 10):
+            start = perf_counter()
+            jar.add_cookie_header(request)
+            latencies.append(perf_counter() - start)
+    return latencies, len(jar)
+
+
+def main():
+    jars = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 2 * jars
+
+    print(f"{requests} requests over {jars} cookie jars")
+    max_jars = max(1, jars // 10)
+    for name, kwargs in [
+        ('all jars in memory', {}),
+        (f'COOKIES_MAX_JARS={max_jars}', {'max_jars': max_jars}),
+        (f'COOKIES_MAX_JARS={max_jars} + COOKIES_JARS_DIR', {'max_jars': max_jars, 'spill': True}),
+    ]:
+        latencies, peak = bench_sessions(jars, requests, **kwargs)
+        print(f"  {name:<42} mean {sum(latencies) / len(latencies) * 1e6:7.1f} us"
+              f"  p99 {percentile(latencies, 99) * 1e6:7.1f} us"
+              f"  memory peak {peak / 2 ** 20:7.1f} MiB")
+
+    cookies, requests = jars, 50000
+    print(f"{requests} requests to a jar of {cookies} cookies, expiring over time")
+    for name, full_scan in [('full scan', True), ('expiry heap', False)]:
+        latencies, remaining = bench_expiry(cookies, requests, full_scan)
+        print(f"  {name:<42} mean {sum(latencies) / len(latencies) * 1e6:7.1f} us"
+              f"  max {max(latencies) * 1e3:7.1f} ms  {remaining} cookies left")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Measure the memory allocated to receive and decode gzip-encoded pages with
+the HTTP/1.1 download handler, compared with the previous body assembly
+(a BytesIO buffer copied out with getvalue(), decoded afterwards by
+HttpCompressionMiddleware with gunzip).
+
+For each page size, the peak of memory allocated (tracemalloc) and the number
+of bytes copied while assembling and decoding the body are reported, along
+with the time spent.
+
+usage:
+
+    python extras/decompress-bench.py [page size in KB ...]
+
+"""
+import gzip
+import random
+import sys
+import tracemalloc
+from io import BytesIO
+from time import perf_counter
+
+from twisted.internet import defer
+from twisted.python.failure import Failure
+from twisted.web.client import ResponseDone
+
+from scrapy.core.downloader.handlers.http11 import _ResponseReader
+from scrapy.http import Request
+from scrapy.utils.gz import IncrementalDecoder, gunzip
+from scrapy.utils.test import get_crawler
+
+CHUNK_SIZE = 16 * 1024
+WORDS = [b'<div class="item">', b'</div>', b'<a href="/page/', b'">', b'</a>',
+         b'scrapy', b'crawler', b'lorem', b'ipsum', b'dolor', b'sit', b'amet']
+
+
+def page(size):
+    rnd = random.Random(size)
+    parts, length = [], 0
+    while length < size:
+        word = rnd.choice(WORDS) + str(rnd.randrange(1000)).encode() + b' '
+        parts.append(word)
+        length += len(word)
+    return b''.join(parts)[:size]
+
+
+def chunks(data):
+    return [data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)]
+
+
+def previous(received):
+    # _ResponseReader.dataReceived / _finish_response
+    buf = BytesIO()
+    for chunk in received:
+        buf.write(chunk)
+    body = buf.getvalue()
+    del buf
+    # HttpCompressionMiddleware.process_response
+    return gunzip(body)
+
+
+def current(received, crawler):
+    result = []
+    finished = defer.Deferred()
+    finished.addCallback(result.append)
+    reader = _ResponseReader(finished, None, Request('http://example.com'), 0, 0, True,
+                             crawler, decoder=IncrementalDecoder(b'gzip'))
+    for chunk in received:
+        reader.dataReceived(chunk)
+    reader.connectionLost(Failure(ResponseDone()))
+    return result[0]['body']
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = perf_counter()
+    body = func(*args)
+    elapsed = perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return body, peak, elapsed
+
+
+def main():
+    crawler = get_crawler()
+    sizes = [int(size) for size in sys.argv[1:]] or [100, 500, 1000, 5000]
+    current(chunks(gzip.compress(b'warm up')), crawler)
+    for size in sizes:
+        data = page(size * 1024)
+        encoded = gzip.compress(data)
+        received = chunks(encoded)
+        body, old_peak, old_time = measure(previous, received)
+        assert body == data
+        body, new_peak, new_time = measure(current, received, crawler)
+        assert body == data
+        # previous: chunks copied into the BytesIO, getvalue(), and gunzip's
+        # read1() chunks joined; current: decoded chunks joined
+        old_copied = 2 * len(encoded) + 2 * len(data)
+        new_copied = 2 * len(data)
+        print("%5d KB page (%5d KB gzip): previous %7.0f KB peak, %7.0f KB copied, %6.2f ms;"
+              " current %7.0f KB peak, %7.0f KB copied, %6.2f ms"
+              % (size, len(encoded) // 1024, old_peak / 1024, old_copied / 1024, old_time * 1e3,
+                 new_peak / 1024, new_copied / 1024, new_time * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Compare the push and pop throughput of queuelib's FifoDiskQueue with
+BufferedFifoDiskQueue, used by Scrapy FIFO disk queues for JOBDIR crawls.
+
+usage:
+
+    python extras/diskqueue-bench.py [number of records] [record size]
+
+"""
+import shutil
+import sys
+import tempfile
+from time import perf_counter
+
+from queuelib.queue import BufferedFifoDiskQueue, FifoDiskQueue
+
+
+def bench(name, factory, n, record):
+    path = tempfile.mkdtemp()
+    try:
+        q = factory(path + '/q')
+        start = perf_counter()
+        for _ in range(n):
+            q.push(record)
+        push_time = perf_counter() - start
+        start = perf_counter()
+        while q.pop() is not None:
+            pass
+        pop_time = perf_counter() - start
+        q.close()
+    finally:
+        shutil.rmtree(path)
+    print("%-28s %10.0f pushes/s %10.0f pops/s" % (name, n / push_time, n / pop_time))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    record = b'x' * size
+    print("%d records of %d bytes" % (n, size))
+    bench('FifoDiskQueue', FifoDiskQueue, n, record)
+    bench('BufferedFifoDiskQueue', BufferedFifoDiskQueue, n, record)
+    bench('BufferedFifoDiskQueue (5s)',
+          lambda path: BufferedFifoDiskQueue(path, checkpoint_interval=5), n, record)
+    bench('BufferedFifoDiskQueue (1000)',
+          lambda path: BufferedFifoDiskQueue(path, checkpoint_count=1000), n, record)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Measure the time that downloads spend waiting for DNS lookups during a broad
+crawl, with and without the DnsPrefetch extension.
+
+Requests for pages of many host names are scheduled at once, like start
+requests, and downloaded by concurrent workers: each download resolves the
+host name of its request through the installed CachingThreadedResolver,
+then takes a fixed time. Host names are resolved by a fake system resolver
+with a fixed latency, in the reactor thread pool. Some host names do not
+resolve, and their failures are cached.
+
+usage:
+
+    python extras/dns-prefetch-bench.py [number of hosts] [DNS latency in ms]
+
+"""
+import socket
+import sys
+from time import perf_counter, sleep
+from unittest import mock
+
+from twisted.internet import defer, task
+from twisted.internet.error import DNSLookupError
+
+from scrapy.extensions.dnsprefetch import DnsPrefetch
+from scrapy.http import Request
+from scrapy.resolver import CachingThreadedResolver, dnscache
+from scrapy.spiders import Spider
+from scrapy.utils.test import get_crawler
+
+CONCURRENCY = 16
+DOWNLOAD_LATENCY = 0.3
+PAGES_PER_HOST = 3
+THREADS = 10
+LATENCY = 0.1
+
+
+def gethostbyname(name):
+    sleep(LATENCY)
+    if name.startswith('missing'):
+        raise socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+    return '127.0.0.1'
+
+
+def make_requests(hosts):
+    # pages of each host are spread over the crawl, like the downloader
+    # aware priority queue does
+    for page in range(PAGES_PER_HOST):
+        for i in range(hosts):
+            prefix = 'missing' if i % 20 == 0 else 'www'
+            yield Request(f'http://{prefix}{i}.example.com/page/{page}')
+
+
+@defer.inlineCallbacks
+def crawl(reactor, hosts, prefetch):
+    dnscache.clear()
+    crawler = get_crawler(Spider, {'DNS_PREFETCH_ENABLED': prefetch})
+    spider = crawler._create_spider('bench')
+    resolver = CachingThreadedResolver.from_crawler(
+        mock.Mock(settings=crawler.settings, crawlers=[crawler]), reactor)
+    resolver.install_on_reactor()
+    extension = DnsPrefetch.from_crawler(crawler) if prefetch else None
+    requests = list(make_requests(hosts))
+    if extension:
+        for request in requests:
+            extension.request_scheduled(request, spider)
+    waited = []
+    pending = iter(requests)
+
+    @defer.inlineCallbacks
+    def worker():
+        for request in pending:
+            start = perf_counter()
+            try:
+                yield reactor.resolve(request.url.split('/')[2])
+            except DNSLookupError:
+                continue
+            finally:
+                waited.append(perf_counter() - start)
+            yield task.deferLater(reactor, DOWNLOAD_LATENCY, lambda: None)
+
+    start = perf_counter()
+    yield defer.DeferredList([worker() for _ in range(CONCURRENCY)])
+    return perf_counter() - start, sum(waited), crawler.stats.get_stats()
+
+
+@defer.inlineCallbacks
+def main(reactor):
+    global LATENCY
+    hosts = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    LATENCY = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else LATENCY
+    reactor.getThreadPool().adjustPoolsize(maxthreads=THREADS)
+    print(f"{hosts} hosts, {PAGES_PER_HOST} pages per host, {CONCURRENCY} concurrent "
+          f"downloads of {DOWNLOAD_LATENCY * 1e3:.0f} ms, DNS latency {LATENCY * 1e3:.0f} ms")
+    with mock.patch('socket.gethostbyname', gethostbyname):
+        for prefetch in (False, True):
+            elapsed, waited, stats = yield crawl(reactor, hosts, prefetch)
+            label = 'with prefetch' if prefetch else 'without prefetch'
+            print(f"  {label:<17} {elapsed:6.2f} s  waiting for DNS {waited:6.2f} s"
+                  f"  hit rate {stats['dnscache/hit_rate']:5.1%}"
+                  f"  DNS queries {stats['dns/resolved'] + stats['dns/failed']:5d}")
+
+
+if __name__ == '__main__':
+    task.react(main)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Compare the memory usage, insertion speed and resume time of the default
+RFPDupeFilter fingerprint set (plus requests.seen file) with the compact
+fingerprint stores and with BloomDupeFilter. Memory-mapped files are not
+accounted for in the memory usage, and the in-memory store is not resumable.
+
+usage:
+
+    python extras/dupefilter-bench.py [number of fingerprints]
+
+"""
+import hashlib
+import shutil
+import sys
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+from scrapy.dupefilters import (
+    BloomDupeFilter,
+    DiskFingerprintStore,
+    MemoryFingerprintStore,
+    RFPDupeFilter,
+)
+
+
+class _FingerprintDupeFilter(RFPDupeFilter):
+    """Use the fingerprint itself as request, to leave request_fingerprint
+    out of the measures"""
+
+    def request_fingerprint(self, request):
+        return request
+
+
+class _FingerprintBloomDupeFilter(BloomDupeFilter):
+
+    def request_fingerprint(self, request):
+        return request
+
+
+def fingerprints(n):
+    for i in range(n):
+        yield hashlib.sha1(str(i).encode()).hexdigest()
+
+
+def measure(name, factory, n):
+    path = tempfile.mkdtemp()
+    try:
+        tracemalloc.start()
+        start = perf_counter()
+        df = factory(path)
+        for fp in fingerprints(n):
+            df.request_seen(fp)
+        insert_time = perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        df.close('finished')
+
+        start = perf_counter()
+        df = factory(path)
+        resume_time = perf_counter() - start
+        start = perf_counter()
+        for fp in fingerprints(n // 10):
+            df.request_seen(fp)
+        lookup_time = perf_counter() - start
+        df.close('finished')
+    finally:
+        shutil.rmtree(path)
+    print("%-12s %8.1f bytes/fp %8.2f us/insert %8.2f us/lookup %8.3f s resume"
+          % (name, memory / n, insert_time / n * 1e6,
+             lookup_time / (n // 10) * 1e6, resume_time))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print("%d fingerprints" % n)
+    measure('set+file', lambda path: _FingerprintDupeFilter(path), n)
+    measure('memory', lambda path: _FingerprintDupeFilter(
+        store=MemoryFingerprintStore()), n)
+    measure('disk', lambda path: _FingerprintDupeFilter(
+        store=DiskFingerprintStore(path)), n)
+    measure('bloom', lambda path: _FingerprintBloomDupeFilter(
+        path, capacity=n // 4, error_rate=0.001), n)
+
+
+if __name__ == '__main__':
+    main()
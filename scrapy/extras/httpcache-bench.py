@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Compare the store and retrieve throughput, number of files and disk usage of
+the HTTP cache storage backends.
+
+usage:
+
+    python extras/httpcache-bench.py [number of responses] [body size]
+
+"""
+import os
+import shutil
+import sys
+import tempfile
+from time import perf_counter
+
+from scrapy.http import HtmlResponse, Request
+from scrapy.settings import Settings
+from scrapy.spiders import Spider
+from scrapy.utils.misc import load_object
+
+
+def disk_usage(path):
+    files, size = 0, 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        files += len(filenames)
+        size += sum(os.path.getsize(os.path.join(dirpath, f)) for f in filenames)
+    return files, size
+
+
+def bench(storage_class, pairs):
+    path = tempfile.mkdtemp()
+    try:
+        settings = Settings({'HTTPCACHE_DIR': path})
+        spider = Spider('bench')
+        storage = load_object(storage_class)(settings)
+        storage.open_spider(spider)
+        start = perf_counter()
+        for request, response in pairs:
+            storage.store_response(spider, request, response)
+        store_time = perf_counter() - start
+        storage.close_spider(spider)
+
+        storage = load_object(storage_class)(settings)
+        start = perf_counter()
+        storage.open_spider(spider)
+        open_time = perf_counter() - start
+        start = perf_counter()
+        for request, _ in pairs:
+            storage.retrieve_response(spider, request)
+        retrieve_time = perf_counter() - start
+        storage.close_spider(spider)
+        files, size = disk_usage(path)
+    finally:
+        shutil.rmtree(path)
+    n = len(pairs)
+    print("%-24s %9.0f stores/s %9.0f retrieves/s %7.3f s open %8d files %8.1f MiB"
+          % (storage_class.rsplit('.', 1)[1], n / store_time, n / retrieve_time,
+             open_time, files, size / 2 ** 20))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    body_size = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    body = b'x' * body_size
+    pairs = []
+    for i in range(n):
+        request = Request('http://www.example.com/%d' % i)
+        response = HtmlResponse(request.url, body=body,
+                                headers={'Content-Type': 'text/html'})
+        pairs.append((request, response))
+    print("%d responses of %d bytes" % (n, body_size))
+    bench('scrapy.extensions.httpcache.FilesystemCacheStorage', pairs)
+    bench('scrapy.extensions.httpcache.DbmCacheStorage', pairs)
+    bench('scrapy.extensions.httpcache.SegmentCacheStorage', pairs)
+
+
+if __name__ == '__main__':
+    main()
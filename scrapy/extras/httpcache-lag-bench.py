@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+"""
+Measure the reactor lag caused by the HTTP cache during a cache-heavy crawl,
+with the cache storage used from the reactor thread (HTTPCACHE_THREADS=0)
+and from a thread pool.
+
+A filesystem cache storage (with HTTPCACHE_GZIP) is first filled through
+HttpCacheMiddleware.process_response, then replayed through process_request
+by concurrent workers, which let the reactor run between requests like
+downloads do. A timer scheduled every 10 ms measures the reactor lag. A
+latency can be added to every storage call to emulate a slow or network
+disk.
+
+usage:
+
+    python extras/httpcache-lag-bench.py [number of responses] [latency in ms]
+
+"""
+import shutil
+import sys
+import tempfile
+import time
+from time import perf_counter
+
+from twisted.internet import defer, task
+
+from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+from scrapy.extensions.httpcache import FilesystemCacheStorage
+from scrapy.http import Request, Response
+from scrapy.settings import Settings
+from scrapy.spiders import Spider
+from scrapy.statscollectors import MemoryStatsCollector
+from scrapy.utils.test import get_crawler
+
+CONCURRENCY = 16
+LATENCY = 0.0
+
+
+class SlowFilesystemCacheStorage(FilesystemCacheStorage):
+
+    def retrieve_response(self, spider, request):
+        time.sleep(LATENCY)
+        return super().retrieve_response(spider, request)
+
+    def store_response(self, spider, request, response):
+        time.sleep(LATENCY)
+        return super().store_response(spider, request, response)
+
+
+class LagMonitor:
+
+    interval = 0.01
+
+    def __init__(self, reactor):
+        self.reactor = reactor
+        self.lags = []
+
+    def start(self):
+        self._last = perf_counter()
+        self.task = task.LoopingCall(self._tick)
+        self.task.start(self.interval, now=False)
+
+    def _tick(self):
+        now = perf_counter()
+        self.lags.append(max(now - self._last - self.interval, 0.0))
+        self._last = now
+
+    def stop(self):
+        self.task.stop()
+        lags = sorted(self.lags) or [0.0]
+        return lags[int(len(lags) * 0.99) - 1 if len(lags) > 1 else 0], lags[-1]
+
+
+@defer.inlineCallbacks
+def run_workers(reactor, items, work):
+    items = iter(items)
+
+    @defer.inlineCallbacks
+    def worker():
+        for item in items:
+            yield defer.maybeDeferred(work, item)
+            # let the reactor run, as a download would
+            yield task.deferLater(reactor, 0, lambda: None)
+
+    yield defer.DeferredList([worker() for _ in range(CONCURRENCY)])
+
+
+@defer.inlineCallbacks
+def bench(reactor, threads, count, cachedir):
+    settings = Settings({
+        'HTTPCACHE_ENABLED': True,
+        'HTTPCACHE_DIR': cachedir,
+        'HTTPCACHE_GZIP': True,
+        'HTTPCACHE_STORAGE': f'{__name__}.SlowFilesystemCacheStorage',
+        'HTTPCACHE_THREADS': threads,
+    })
+    spider = Spider('bench')
+    stats = MemoryStatsCollector(get_crawler())
+    body = b'<html><body>' + b'<p>cached page content</p>' * 2000 + b'</body></html>'
+    requests = [Request(f'http://www{i % 100}.example.com/page/{i}') for i in range(count)]
+    results = {}
+
+    for phase in ('fill', 'replay'):
+        mw = HttpCacheMiddleware(settings, stats)
+        yield mw.spider_opened(spider)
+        if phase == 'fill':
+            def work(request):
+                response = Response(request.url, body=body, headers={'Content-Type': 'text/html'})
+                mw.process_response(request, response, spider)
+        else:
+            def work(request):
+                d = defer.maybeDeferred(mw.process_request, request.copy(), spider)
+                return d.addCallback(lambda r: assert_cached(r))
+        monitor = LagMonitor(reactor)
+        monitor.start()
+        start = perf_counter()
+        yield run_workers(reactor, requests, work)
+        yield mw.spider_closed(spider)
+        elapsed = perf_counter() - start
+        results[phase] = (elapsed,) + monitor.stop()
+    return results
+
+
+def assert_cached(response):
+    assert response is not None and 'cached' in response.flags
+
+
+@defer.inlineCallbacks
+def main(reactor):
+    global LATENCY
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    LATENCY = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0
+    print(f"{count} responses, {LATENCY * 1000:.1f} ms of added latency per storage call, "
+          f"{CONCURRENCY} concurrent requests")
+    for threads in (0, 4):
+        cachedir = tempfile.mkdtemp()
+        try:
+            results = yield bench(reactor, threads, count, cachedir)
+        finally:
+            shutil.rmtree(cachedir)
+        for phase, (elapsed, p99, max_lag) in results.items():
+            print(f"  HTTPCACHE_THREADS={threads} {phase:<7} {elapsed:7.2f} s"
+                  f"  reactor lag p99 {p99 * 1e3:7.1f} ms  max {max_lag * 1e3:7.1f} ms")
+
+
+if __name__ == '__main__':
+    task.react(main)
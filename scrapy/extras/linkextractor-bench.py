@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Measure the link extraction speed of LinkExtractor on large generated pages
+shaped like link-dense listing pages (navigation menus repeated in the header
+and the footer, products linked more than once, relative and absolute links,
+pagination, images, fragments and external links), using the single pass
+extraction and the generic one (an element walk followed by a separate
+filtering pass).
+
+usage:
+
+    python extras/linkextractor-bench.py [number of links per page ...]
+
+"""
+import random
+import sys
+from time import perf_counter
+
+from scrapy.http import HtmlResponse
+from scrapy.linkextractors import LinkExtractor
+
+
+def make_page(links):
+    menu = ''.join('<li><a href="/category/%d/">Category %d</a></li>' % (i, i) for i in range(50))
+    items = []
+    for i in range(links):
+        kind = random.random()
+        if kind < 0.6:
+            href = '/product/%d.html?ref=list&page=%d' % (random.randrange(links), i // 50)
+        elif kind < 0.75:
+            href = 'https://cdn%d.example.net/assets/%d.pdf' % (i % 4, i)
+        elif kind < 0.85:
+            href = '#review-%d' % i
+        else:
+            href = 'https://partner%d.example.org/offer/%d' % (i % 20, i)
+        # product pages are usually linked from both their picture and title
+        items.append(
+            '<div class="item"><a href="%s"><img src="/img/%d.jpg"></a>'
+            '<h2><a href="%s" rel="%s">Product <b>%d</b></a></h2><p>%s</p></div>'
+            % (href, i, href, 'nofollow' if kind > 0.9 else '', i, 'description ' * 10))
+    pager = ''.join('<a href="?page=%d">%d</a>' % (i, i) for i in range(1, 20))
+    body = ('<html><head><title>Listing</title></head><body>'
+            '<nav><ul>%s</ul></nav><main>%s</main><div class="pager">%s</div>'
+            '<footer><ul>%s</ul></footer></body></html>' % (menu, ''.join(items), pager, menu))
+    return HtmlResponse('http://www.example.com/listing/', body=body.encode(), encoding='utf-8')
+
+
+def bench(name, kwargs, response, repeat=5):
+    times = {}
+    for single_pass in (False, True):
+        lx = LinkExtractor(**kwargs)
+        lx._single_pass = single_pass
+        if not single_pass:
+            # walk every element as the previous implementation did
+            lx.link_extractor._scan_names = None
+        response.selector  # parse the page before timing
+        best = None
+        for _ in range(repeat):
+            start = perf_counter()
+            links = lx.extract_links(response)
+            elapsed = perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        times[single_pass] = (best, len(links))
+    print("%-20s generic %8.2f ms  single pass %8.2f ms  (%d links, x%.1f)"
+          % (name, times[False][0] * 1e3, times[True][0] * 1e3, times[True][1],
+             times[False][0] / times[True][0]))
+
+
+def main():
+    random.seed(0)
+    for n in map(int, sys.argv[1:] or [1000, 10000]):
+        response = make_page(n)
+        print("%d links per page, %d KiB" % (n, len(response.body) // 1024))
+        bench('default', {}, response)
+        bench('allow', {'allow': r'/product/'}, response)
+        bench('allow_domains', {'allow_domains': ['www.example.com']}, response)
+        bench('canonicalize', {'canonicalize': True}, response)
+        bench('restrict_text', {'restrict_text': 'Category'}, response)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""
+Measure the per-request overhead of a stack of 15 synchronous downloader
+middlewares and of a chain of 15 synchronous item pipelines, with the inline
+chain execution of DownloaderMiddlewareManager and process_chain, and with a
+copy of the previous implementations, which wrapped every middleware call in
+Deferred callbacks.
+
+usage:
+
+    python extras/middleware-bench.py [number of requests]
+
+"""
+import sys
+from time import perf_counter
+
+from twisted.internet import defer
+
+from scrapy.core.downloader.middleware import DownloaderMiddlewareManager
+from scrapy.http import Request, Response
+from scrapy.spiders import Spider
+from scrapy.utils.defer import deferred_from_coro, mustbe_deferred, process_chain
+
+MIDDLEWARES = 15
+
+
+class HeaderMiddleware:
+
+    def __init__(self, index):
+        self.header = f'X-Middleware-{index}'
+
+    def process_request(self, request, spider):
+        request.headers.setdefault(self.header, b'1')
+
+    def process_response(self, request, response, spider):
+        return response
+
+    def process_exception(self, request, exception, spider):
+        pass
+
+
+class Pipeline:
+
+    def process_item(self, item, spider):
+        item['seen'] += 1
+        return item
+
+
+class DeferredChainManager(DownloaderMiddlewareManager):
+    """DownloaderMiddlewareManager.download as it was before the inline
+    chain execution"""
+
+    def download(self, download_func, request, spider):
+        @defer.inlineCallbacks
+        def process_request(request):
+            for method in self.methods['process_request']:
+                response = yield deferred_from_coro(method(request=request, spider=spider))
+                if response:
+                    return response
+            return (yield download_func(request=request, spider=spider))
+
+        @defer.inlineCallbacks
+        def process_response(response):
+            if isinstance(response, Request):
+                return response
+            for method in self.methods['process_response']:
+                response = yield deferred_from_coro(method(request=request, response=response, spider=spider))
+                if isinstance(response, Request):
+                    return response
+            return response
+
+        @defer.inlineCallbacks
+        def process_exception(failure):
+            exception = failure.value
+            for method in self.methods['process_exception']:
+                response = yield deferred_from_coro(method(request=request, exception=exception, spider=spider))
+                if response:
+                    return response
+            return failure
+
+        deferred = mustbe_deferred(process_request, request)
+        deferred.addErrback(process_exception)
+        deferred.addCallback(process_response)
+        return deferred
+
+
+def deferred_process_chain(callbacks, input, *a, **kw):
+    """process_chain as it was before the inline chain execution"""
+    d = defer.Deferred()
+    for x in callbacks:
+        d.addCallback(x, *a, **kw)
+    d.callback(input)
+    return d
+
+
+def bench_download(mwman_cls, requests, spider):
+    mwman = mwman_cls(*[HeaderMiddleware(i) for i in range(MIDDLEWARES)])
+    results = []
+
+    def download_func(request, spider):
+        return defer.succeed(Response(request.url, request=request))
+
+    start = perf_counter()
+    for request in requests:
+        mwman.download(download_func, request, spider).addBoth(results.append)
+    elapsed = perf_counter() - start
+    assert len(results) == len(requests) and all(isinstance(r, Response) for r in results)
+    return elapsed
+
+
+def bench_chain(chain, count, spider):
+    methods = [Pipeline().process_item for _ in range(MIDDLEWARES)]
+    results = []
+    start = perf_counter()
+    for _ in range(count):
+        chain(methods, {'seen': 0}, spider).addBoth(results.append)
+    elapsed = perf_counter() - start
+    assert all(r['seen'] == MIDDLEWARES for r in results)
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    spider = Spider('bench')
+
+    def make_requests():
+        return [Request(f'http://www{i % 100}.example.com/page/{i}') for i in range(count)]
+
+    print(f"{count} requests through {MIDDLEWARES} downloader middlewares")
+    for name, mwman_cls in [('deferred chain', DeferredChainManager),
+                            ('inline chain', DownloaderMiddlewareManager)]:
+        elapsed = bench_download(mwman_cls, make_requests(), spider)
+        print(f"  {name:<16} {elapsed:8.3f} s {elapsed / count * 1e6:8.1f} us/request")
+
+    print(f"{count} items through {MIDDLEWARES} item pipelines")
+    for name, chain in [('deferred chain', deferred_process_chain),
+                        ('inline chain', process_chain)]:
+        elapsed = bench_chain(chain, count, spider)
+        print(f"  {name:<16} {elapsed:8.3f} s {elapsed / count * 1e6:8.1f} us/item")
+
+
+if __name__ == '__main__':
+    main()
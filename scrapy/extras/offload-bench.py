@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Measure the reactor loop lag and the crawl throughput of a spider with a
+CPU-heavy callback, crawling the local bench server (see ``scrapy bench``),
+with and without OFFLOAD_CALLBACKS.
+
+The lag is the delay with which a 10 ms timer is called by the reactor.
+
+usage:
+
+    python extras/offload-bench.py [callback parse iterations]
+
+"""
+import subprocess
+import sys
+import time
+
+from twisted.internet import task
+
+from scrapy import signals
+from scrapy.commands.bench import _BenchServer, _BenchSpider
+from scrapy.crawler import CrawlerProcess
+from scrapy.selector import Selector
+
+
+PAGE = '<html><body>%s</body></html>' % ''.join(
+    '<div class="item"><a href="/item/%d">item %d</a><p>%s</p></div>' % (i, i, 'text ' * 20)
+    for i in range(2000))
+
+
+class BenchSpider(_BenchSpider):
+    name = 'offload-bench'
+    iterations = 1
+
+    def parse(self, response):
+        for _ in range(int(self.iterations)):
+            Selector(text=PAGE).css('div.item a::attr(href)').getall()
+        yield from super().parse(response)
+
+
+class LagMonitor:
+
+    interval = 0.01
+
+    def __init__(self):
+        self.lags = []
+        self.last = None
+        self.call = task.LoopingCall(self.tick)
+
+    def start(self):
+        self.last = time.perf_counter()
+        self.call.start(self.interval, now=False)
+
+    def stop(self):
+        if self.call.running:
+            self.call.stop()
+
+    def tick(self):
+        now = time.perf_counter()
+        self.lags.append(now - self.last - self.interval)
+        self.last = now
+
+
+def run(offload, iterations):
+    process = CrawlerProcess({
+        'OFFLOAD_CALLBACKS': offload,
+        'CLOSESPIDER_TIMEOUT': 10,
+        'LOG_LEVEL': 'WARNING',
+    })
+    crawler = process.create_crawler(BenchSpider)
+    monitor = LagMonitor()
+    crawler.signals.connect(monitor.start, signals.spider_opened)
+    crawler.signals.connect(monitor.stop, signals.spider_closed)
+    process.crawl(crawler, total=100000, iterations=iterations)
+    process.start()
+    stats = crawler.stats.get_stats()
+    lags = sorted(monitor.lags)
+    print("%-12s %6.0f pages/s   lag: %6.1f ms mean %6.1f ms p99 %6.1f ms max"
+          % ('offload' if offload else 'no offload',
+             stats.get('response_received_count', 0) / stats['elapsed_time_seconds'],
+             sum(lags) / len(lags) * 1e3, lags[int(len(lags) * 0.99)] * 1e3, lags[-1] * 1e3))
+
+
+def main():
+    if sys.argv[1:2] == ['--run']:
+        run(sys.argv[2] == 'True', sys.argv[3])
+        return
+    iterations = sys.argv[1] if len(sys.argv) > 1 else '1'
+    with _BenchServer():
+        for offload in ('False', 'True'):
+            # the reactor can't be restarted, so each run needs a new process
+            subprocess.check_call([sys.executable, __file__, '--run', offload, iterations])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Compare the setup time and the request filtering speed of OffsiteMiddleware
+using the allowed domains regex (the previous implementation, still used when
+get_host_regex is overridden) and using a DomainMatcher, for growing numbers of
+allowed domains.
+
+usage:
+
+    python extras/offsite-bench.py [number of allowed domains ...]
+
+"""
+import random
+import sys
+from time import perf_counter
+
+from scrapy.http import Request, Response
+from scrapy.spidermiddlewares.offsite import OffsiteMiddleware
+from scrapy.spiders import Spider
+from scrapy.utils.test import get_crawler
+
+
+class RegexOffsiteMiddleware(OffsiteMiddleware):
+
+    def get_host_regex(self, spider):
+        return super().get_host_regex(spider)
+
+
+def bench(name, mwcls, domains, requests):
+    crawler = get_crawler(Spider)
+    spider = crawler._create_spider(name='bench', allowed_domains=domains)
+    mw = mwcls.from_crawler(crawler)
+    start = perf_counter()
+    mw.spider_opened(spider)
+    setup_time = perf_counter() - start
+    response = Response('http://example.com')
+    start = perf_counter()
+    allowed = sum(1 for _ in mw.process_spider_output(response, requests, spider))
+    filter_time = perf_counter() - start
+    print("%8d domains %-8s %8.3f s setup %8.2f us/request (%d allowed)"
+          % (len(domains), name, setup_time, filter_time / len(requests) * 1e6, allowed))
+
+
+def main():
+    random.seed(0)
+    for n in map(int, sys.argv[1:] or [100, 10000, 200000]):
+        domains = ['domain%d.example%d.com' % (i, i % 100) for i in range(n)]
+        hosts = ['www.domain%d.example%d.com' % (i, i % 100)
+                 for i in random.sample(range(n), min(n, 5000))]
+        hosts += ['www.other%d.example.org' % i for i in range(5000)]
+        requests = [Request('http://%s/page' % host) for host in hosts]
+        bench('regex', RegexOffsiteMiddleware, domains, requests)
+        bench('matcher', OffsiteMiddleware, domains, requests)
+
+
+if __name__ == '__main__':
+    main()
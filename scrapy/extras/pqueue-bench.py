@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Measure the time needed to dequeue a request from DownloaderAwarePriorityQueue
+as the number of downloader slots grows, compared with the time needed to scan
+the active downloads of every slot (the previous slot selection method).
+
+Requests are kept in memory; downloads are simulated by sending the
+request_reached_downloader and request_left_downloader signals, keeping up to
+CONCURRENT_REQUESTS downloads active.
+
+usage:
+
+    python extras/pqueue-bench.py [number of slots ...]
+
+"""
+import sys
+from collections import deque
+from time import perf_counter
+
+from scrapy import signals
+from scrapy.core.downloader import Downloader
+from scrapy.http import Request
+from scrapy.pqueues import DownloaderAwarePriorityQueue, DownloaderInterface
+from scrapy.squeues import FifoMemoryQueue
+from scrapy.utils.test import get_crawler
+
+
+class _Slot:
+
+    def __init__(self):
+        self.active = set()
+
+
+class _Downloader:
+
+    def __init__(self):
+        self.slots = {}
+
+    def _get_slot_key(self, request, spider):
+        return request.meta[Downloader.DOWNLOAD_SLOT]
+
+
+class _Engine:
+
+    def __init__(self):
+        self.downloader = _Downloader()
+
+
+def bench(nslots, requests_per_slot=2, concurrency=16):
+    crawler = get_crawler()
+    crawler.engine = _Engine()
+    slots = crawler.engine.downloader.slots
+    pq = DownloaderAwarePriorityQueue(crawler, FifoMemoryQueue, '')
+    for i in range(requests_per_slot):
+        for slot in range(nslots):
+            request = Request('http://example.com/%d' % i,
+                              meta={Downloader.DOWNLOAD_SLOT: str(slot)})
+            pq.push(request)
+
+    total = len(pq)
+    active = deque()
+    start = perf_counter()
+    while pq:
+        request = pq.pop()
+        slot = request.meta[Downloader.DOWNLOAD_SLOT]
+        slots.setdefault(slot, _Slot()).active.add(request)
+        crawler.signals.send_catch_log(signals.request_reached_downloader,
+                                       request=request, spider=None)
+        active.append(request)
+        if len(active) > concurrency:
+            request = active.popleft()
+            slots[request.meta[Downloader.DOWNLOAD_SLOT]].active.discard(request)
+            crawler.signals.send_catch_log(signals.request_left_downloader,
+                                           request=request, spider=None)
+    pop_time = (perf_counter() - start) / total
+
+    # previous slot selection: one scan of all the slots per pop
+    interface = DownloaderInterface(crawler)
+    possible_slots = [str(slot) for slot in range(nslots)]
+    start = perf_counter()
+    for _ in range(100):
+        min(interface.stats(possible_slots))
+    scan_time = (perf_counter() - start) / 100
+
+    print("%8d slots: %8.2f us/pop (including signals), %10.2f us/scan"
+          % (nslots, pop_time * 1e6, scan_time * 1e6))
+
+
+def main():
+    for nslots in map(int, sys.argv[1:] or [100, 1000, 10000, 50000]):
+        bench(nslots)
+
+
+if __name__ == '__main__':
+    main()
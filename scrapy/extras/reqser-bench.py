@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Compare the size of serialized requests and the push and pop throughput of
+the Scrapy disk queues that can be used as SCHEDULER_DISK_QUEUE.
+
+Requests are similar to those of a typical crawl: a callback, a few headers,
+some meta keys and cb_kwargs.
+
+usage:
+
+    python extras/reqser-bench.py [number of requests]
+
+"""
+import os
+import shutil
+import sys
+import tempfile
+from time import perf_counter
+
+from scrapy import Spider
+from scrapy.http import Request
+from scrapy.squeues import (
+    CompactFifoDiskQueue,
+    CompactLifoDiskQueue,
+    MarshalFifoDiskQueue,
+    MarshalLifoDiskQueue,
+    PickleFifoDiskQueue,
+    PickleLifoDiskQueue,
+)
+from scrapy.utils.test import get_crawler
+
+
+class BenchSpider(Spider):
+    name = 'bench'
+
+    def parse_product(self, response, category):
+        pass
+
+    def handle_error(self, failure):
+        pass
+
+
+def requests(spider, n):
+    for i in range(n):
+        yield Request(
+            'http://www.example.com/products/%d?page=%d' % (i, i % 50),
+            callback=spider.parse_product,
+            errback=spider.handle_error,
+            headers={'Referer': 'http://www.example.com/products/%d' % (i // 50),
+                     'Accept-Language': 'en'},
+            meta={'depth': i % 5, 'download_slot': 'www.example.com',
+                  'item_id': i},
+            cb_kwargs={'category': 'books'},
+            priority=-(i % 5),
+        )
+
+
+def directory_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    size = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        size += sum(os.path.getsize(os.path.join(dirpath, f)) for f in filenames)
+    return size
+
+
+def bench(name, queue_class, crawler, reqs):
+    path = tempfile.mkdtemp()
+    try:
+        key = os.path.join(path, 'q')
+        q = queue_class(crawler, key)
+        start = perf_counter()
+        for request in reqs:
+            q.push(request)
+        push_time = perf_counter() - start
+        q.close()
+        size = sum(directory_size(os.path.join(path, f)) for f in os.listdir(path))
+        q = queue_class(crawler, key)
+        start = perf_counter()
+        while q.pop() is not None:
+            pass
+        pop_time = perf_counter() - start
+        q.close()
+    finally:
+        shutil.rmtree(path)
+    n = len(reqs)
+    print("%-24s %8.1f bytes/request %10.0f pushes/s %10.0f pops/s"
+          % (name, size / n, n / push_time, n / pop_time))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    crawler = get_crawler(BenchSpider)
+    crawler.spider = crawler._create_spider()
+    reqs = list(requests(crawler.spider, n))
+    print("%d requests" % n)
+    bench('PickleLifoDiskQueue', PickleLifoDiskQueue, crawler, reqs)
+    bench('MarshalLifoDiskQueue', MarshalLifoDiskQueue, crawler, reqs)
+    bench('CompactLifoDiskQueue', CompactLifoDiskQueue, crawler, reqs)
+    bench('PickleFifoDiskQueue', PickleFifoDiskQueue, crawler, reqs)
+    bench('MarshalFifoDiskQueue', MarshalFifoDiskQueue, crawler, reqs)
+    bench('CompactFifoDiskQueue', CompactFifoDiskQueue, crawler, reqs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Measure the memory used per queued request by the scheduler memory queues:
+requests are created the way a crawl creates them (a URL and a callback, a
+depth in meta for most of them, some with headers, cookies or cb_kwargs)
+and pushed to a memory queue, and the memory they use is measured with
+tracemalloc.
+
+usage:
+
+    python extras/request-memory-bench.py [number of requests]
+
+"""
+import gc
+import sys
+import tracemalloc
+
+from scrapy.http import Request
+from scrapy.spiders import Spider
+from scrapy.squeues import FifoMemoryQueue
+from scrapy.utils.test import get_crawler
+
+try:
+    from scrapy.squeues import CompactFifoMemoryQueue
+except ImportError:
+    CompactFifoMemoryQueue = None
+
+
+class BenchSpider(Spider):
+    name = 'bench'
+
+    def parse(self, response):
+        pass
+
+    def parse_item(self, response, category):
+        pass
+
+
+def make_request(spider, i):
+    url = f'http://www{i % 100}.example.com/category/{i % 50}/page/{i}?sort=price'
+    if i % 10 == 0:
+        return Request(url, callback=spider.parse_item, cb_kwargs={'category': i % 50},
+                       headers={'Referer': 'http://www.example.com/'}, meta={'depth': 2})
+    if i % 10 == 1:
+        return Request(url, callback=spider.parse, cookies={'session': 'abc'})
+    return Request(url, callback=spider.parse, meta={'depth': 1})
+
+
+def measure(queue_cls, spider, count):
+    crawler = get_crawler(BenchSpider)
+    crawler.spider = spider
+    gc.collect()
+    tracemalloc.start()
+    queue = queue_cls.from_crawler(crawler, 'bench')
+    for i in range(count):
+        queue.push(make_request(spider, i))
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    popped = 0
+    while queue.pop() is not None:
+        popped += 1
+    assert popped == count
+    return used / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    spider = BenchSpider()
+    queues = [('FifoMemoryQueue', FifoMemoryQueue)]
+    if CompactFifoMemoryQueue is not None:
+        queues.append(('CompactFifoMemoryQueue', CompactFifoMemoryQueue))
+    print(f"{count} queued requests")
+    for name, queue_cls in queues:
+        print(f"  {name:<24} {measure(queue_cls, spider, count):8.0f} bytes/request")
+
+
+if __name__ == '__main__':
+    main()
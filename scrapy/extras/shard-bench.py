@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Measure the crawl throughput against the local bench server (see
+``scrapy bench``) for different values of CRAWL_PROCESSES.
+
+The links of the bench server are spread across 16 hosts (127.0.0.1 to
+127.0.0.16), so that requests can be distributed between processes.
+
+usage:
+
+    python extras/shard-bench.py [number of processes ...]
+
+"""
+import subprocess
+import sys
+import zlib
+
+import scrapy
+from scrapy.commands.bench import _BenchServer, _BenchSpider
+from scrapy.crawler import CrawlerProcess
+
+
+class BenchSpider(_BenchSpider):
+    name = 'shard-bench'
+    hosts = 16
+
+    def parse(self, response):
+        for link in self.link_extractor.extract_links(response):
+            host = '127.0.0.%d' % (zlib.crc32(link.url.encode()) % self.hosts + 1)
+            url = link.url.replace('localhost', host, 1)
+            yield scrapy.Request(url, callback=self.parse)
+
+
+def run(processes):
+    process = CrawlerProcess({
+        'CRAWL_PROCESSES': processes,
+        'CLOSESPIDER_TIMEOUT': 10,
+        'LOG_LEVEL': 'WARNING',
+    })
+    crawler = process.create_crawler(BenchSpider)
+    process.crawl(crawler, total=100000)
+    process.start()
+    stats = crawler.stats.get_stats()
+    pages = stats.get('response_received_count', 0)
+    print("%3d processes: %8d pages %8.0f pages/s"
+          % (processes, pages, pages / stats['elapsed_time_seconds']))
+
+
+def main():
+    if sys.argv[1:2] == ['--run']:
+        run(int(sys.argv[2]))
+        return
+    with _BenchServer():
+        for processes in sys.argv[1:] or ['1', '2', '4']:
+            # the reactor can't be restarted, so each run needs a new process
+            subprocess.check_call([sys.executable, __file__, '--run', processes])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+"""
+Measure the peak memory and the throughput of sitemap and XML feed parsing.
+
+A gzipped sitemap of the given number of URLs (with lastmod, changefreq and
+priority, and an image per URL) is parsed by SitemapSpider._parse_sitemap,
+which streams the decompression and the parsing, and by the same method
+with a copy of the previous Sitemap class, which parsed the whole gunzipped
+sitemap into a tree. An XML feed of as many items is parsed with xmliter
+and xmliter_lxml.
+
+Each measurement runs in a new process, and reports the growth of its peak
+resident memory (which includes the memory used by lxml, unlike
+tracemalloc) over the memory used once the response is loaded.
+
+usage:
+
+    python extras/sitemap-bench.py [number of URLs]
+
+"""
+import gzip
+import os
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+from unittest import mock
+
+import lxml.etree
+
+from scrapy.http import Response, XmlResponse
+from scrapy.spiders import SitemapSpider
+from scrapy.utils.gz import gunzip
+from scrapy.utils.iterators import xmliter, xmliter_lxml
+
+
+class PreviousSitemap:
+    """scrapy.utils.sitemap.Sitemap as it was before incremental parsing"""
+
+    def __init__(self, xmltext):
+        xmlp = lxml.etree.XMLParser(recover=True, remove_comments=True, resolve_entities=False)
+        self._root = lxml.etree.fromstring(xmltext, parser=xmlp)
+        rt = self._root.tag
+        self.type = self._root.tag.split('}', 1)[1] if '}' in rt else rt
+
+    def __iter__(self):
+        for elem in self._root.getchildren():
+            d = {}
+            for el in elem.getchildren():
+                tag = el.tag
+                name = tag.split('}', 1)[1] if '}' in tag else tag
+                if name == 'link':
+                    if 'href' in el.attrib:
+                        d.setdefault('alternate', []).append(el.get('href'))
+                else:
+                    d[name] = el.text.strip() if el.text else ''
+            if 'loc' in d:
+                yield d
+
+
+class BenchSpider(SitemapSpider):
+    name = 'bench'
+
+    def parse(self, response):
+        pass
+
+
+class PreviousBenchSpider(BenchSpider):
+
+    def _get_sitemap_body(self, response):
+        return gunzip(response.body)
+
+
+def make_sitemap(count):
+    yield (b'<?xml version="1.0" encoding="UTF-8"?>\n'
+           b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+           b'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">\n')
+    for i in range(count):
+        yield (b'<url><loc>http://www.example.com/category/%d/product-%d.html</loc>'
+               b'<lastmod>2020-11-%02dT10:00:00+00:00</lastmod><changefreq>daily</changefreq>'
+               b'<priority>0.8</priority><image:image><image:loc>http://img.example.com/%d.jpg'
+               b'</image:loc></image:image></url>\n' % (i % 100, i, i % 28 + 1, i))
+    yield b'</urlset>\n'
+
+
+def make_feed(count):
+    yield b'<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0"><channel>\n'
+    for i in range(count):
+        yield (b'<item><title>Product %d</title><link>http://www.example.com/product-%d.html'
+               b'</link><description>The description of product %d</description></item>\n'
+               % (i, i, i))
+    yield b'</channel></rss>\n'
+
+
+def previous_parse_sitemap(response):
+    with mock.patch('scrapy.spiders.sitemap.Sitemap', PreviousSitemap):
+        return sum(1 for _ in PreviousBenchSpider()._parse_sitemap(response))
+
+
+def parse_sitemap(response):
+    return sum(1 for _ in BenchSpider()._parse_sitemap(response))
+
+
+def parse_xmliter(response):
+    return sum(1 for _ in xmliter(response, 'item'))
+
+
+def parse_xmliter_lxml(response):
+    return sum(1 for _ in xmliter_lxml(response, 'item'))
+
+
+BENCHMARKS = {
+    'sitemap, previous': (previous_parse_sitemap, 'sitemap'),
+    'sitemap, SitemapSpider': (parse_sitemap, 'sitemap'),
+    'feed, xmliter': (parse_xmliter, 'feed'),
+    'feed, xmliter_lxml': (parse_xmliter_lxml, 'feed'),
+}
+
+
+def memory(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1]) * 1024
+
+
+def run(name, path):
+    func, kind = BENCHMARKS[name]
+    with open(path, 'rb') as f:
+        body = f.read()
+    if kind == 'sitemap':
+        response = Response('http://www.example.com/sitemap.xml.gz', body=body)
+    else:
+        response = XmlResponse('http://www.example.com/feed.xml', body=body)
+    # reset the peak resident memory
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+    before = memory('VmRSS')
+    start = perf_counter()
+    count = func(response)
+    elapsed = perf_counter() - start
+    print(count, elapsed, memory('VmHWM') - before)
+
+
+def main():
+    if sys.argv[1:2] == ['--run']:
+        return run(sys.argv[2], sys.argv[3])
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    tmpdir = tempfile.mkdtemp()
+    try:
+        sitemap = b''.join(make_sitemap(count))
+        files = {'sitemap': os.path.join(tmpdir, 'sitemap.xml.gz'),
+                 'feed': os.path.join(tmpdir, 'feed.xml')}
+        with open(files['sitemap'], 'wb') as f:
+            f.write(gzip.compress(sitemap))
+        with open(files['feed'], 'wb') as f:
+            f.write(b''.join(make_feed(count)))
+        print(f"{count} URLs: gzipped sitemap of {len(sitemap) / 2 ** 20:.1f} MiB "
+              f"({os.path.getsize(files['sitemap']) / 2 ** 20:.1f} MiB gzipped), "
+              f"XML feed of {os.path.getsize(files['feed']) / 2 ** 20:.1f} MiB")
+        for name, (_, kind) in BENCHMARKS.items():
+            out = subprocess.check_output([sys.executable, __file__, '--run', name, files[kind]])
+            parsed, elapsed, peak = out.split()
+            print(f"  {name:<24} {int(parsed) / float(elapsed):9.0f} entries/s"
+                  f"  peak memory +{int(peak) / 2 ** 20:7.1f} MiB")
+    finally:
+        for path in os.listdir(tmpdir):
+            os.remove(os.path.join(tmpdir, path))
+        os.rmdir(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
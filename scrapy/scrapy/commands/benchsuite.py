@@ -0,0 +1,79 @@
+import json
+import sys
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+from scrapy.utils.benchmark import compare_results, run_benchmarks, select_benchmarks
+
+
+class Command(ScrapyCommand):
+
+    default_settings = {'LOG_ENABLED': False}
+
+    def syntax(self):
+        return "[options] [benchmark ...]"
+
+    def short_desc(self):
+        return "Run component benchmarks"
+
+    def long_desc(self):
+        return ("Run benchmarks of individual Scrapy components (scheduler, "
+                "dupefilter, downloader middlewares, link extractor, item "
+                "exporters and HTTP cache storages), optionally comparing "
+                "their results with a baseline saved with --output.")
+
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        parser.add_option("-l", "--list", dest="list", action="store_true",
+                          help="only list available benchmarks")
+        parser.add_option("-o", "--output", metavar="FILE",
+                          help="save the results as JSON to FILE (use - for stdout)")
+        parser.add_option("-b", "--baseline", metavar="FILE",
+                          help="compare the results with the JSON results in FILE")
+        parser.add_option("--threshold", type="float", default=10.0, metavar="PERCENT",
+                          help="slowdown from the baseline reported as a "
+                               "regression (default: %default)")
+        parser.add_option("-n", "--size", type="int", default=10000,
+                          help="number of operations per benchmark (default: %default)")
+        parser.add_option("-r", "--repeat", type="int", default=3,
+                          help="number of runs of each benchmark, the fastest "
+                               "one is kept (default: %default)")
+
+    def run(self, args, opts):
+        try:
+            names = select_benchmarks(args)
+        except KeyError as e:
+            raise UsageError(f"Unknown benchmark: {e.args[0]}", print_help=False)
+        if opts.list:
+            for name in names:
+                print(name)
+            return
+
+        baseline = None
+        if opts.baseline:
+            with open(opts.baseline) as f:
+                baseline = json.load(f)
+
+        # keep stdout clean when writing the results to it
+        out = sys.stderr if opts.output == '-' else sys.stdout
+        results = run_benchmarks(names, self.settings, opts.size, opts.repeat)
+        for name, result in results['benchmarks'].items():
+            print(f"{name:<28} {result['rate']:>12.0f} ops/s", file=out)
+
+        if opts.output == '-':
+            json.dump(results, sys.stdout, indent=2)
+            print()
+        elif opts.output:
+            with open(opts.output, 'w') as f:
+                json.dump(results, f, indent=2)
+
+        if baseline is not None:
+            comparison, regressions = compare_results(results, baseline, opts.threshold)
+            print(f"\nComparison with {opts.baseline}:", file=out)
+            for name, rate, base_rate, change in comparison:
+                line = f"{name:<28} {base_rate:>12.0f} -> {rate:>12.0f} ops/s {change:>+7.1f}%"
+                if name in regressions:
+                    line += " REGRESSION"
+                print(line, file=out)
+            if regressions:
+                self.exitcode = 1
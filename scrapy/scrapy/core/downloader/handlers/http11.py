@@ -2,18 +2,29 @@
 
 import ipaddress
 import logging
+import mmap
 import re
+import tempfile
 import warnings
+import zlib
 from contextlib import suppress
-from io import BytesIO
 from time import time
 from urllib.parse import urldefrag
 
 from twisted.internet import defer, protocol, ssl
 from twisted.internet.endpoints import TCP4ClientEndpoint
 from twisted.internet.error import TimeoutError
+from twisted.internet.interfaces import IHandshakeListener
 from twisted.python.failure import Failure
-from twisted.web.client import Agent, HTTPConnectionPool, ResponseDone, ResponseFailed, URI
+from twisted.web._newclient import HTTP11ClientProtocol
+from twisted.web.client import (
+    _HTTP11ClientFactory,
+    Agent,
+    HTTPConnectionPool,
+    ResponseDone,
+    ResponseFailed,
+    URI,
+)
 from twisted.web.http import _DataLoss, PotentialDataLoss
 from twisted.web.http_headers import Headers as TxHeaders
 from twisted.web.iweb import IBodyProducer, UNKNOWN_LENGTH
@@ -23,8 +34,9 @@ from scrapy import signals
 from scrapy.core.downloader.tls import openssl_methods
 from scrapy.core.downloader.webclient import _parse
 from scrapy.exceptions import ScrapyDeprecationWarning, StopDownload
-from scrapy.http import Headers
+from scrapy.http import Headers, TextResponse
 from scrapy.responsetypes import responsetypes
+from scrapy.utils.gz import IncrementalDecoder
 from scrapy.utils.misc import create_instance, load_object
 from scrapy.utils.python import to_bytes, to_unicode
 
@@ -39,8 +51,14 @@ class HTTP11DownloadHandler:
         self._crawler = crawler
 
         from twisted.internet import reactor
-        self._pool = HTTPConnectionPool(reactor, persistent=True)
+        self._pool = ScrapyHTTPConnectionPool(
+            reactor,
+            persistent=True,
+            stats=crawler.stats if crawler else None,
+            slot_stats=settings.getbool('DOWNLOADER_POOL_SLOT_STATS'),
+        )
         self._pool.maxPersistentPerHost = settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN')
+        self._pool.cachedConnectionTimeout = settings.getfloat('DOWNLOADER_POOL_IDLE_TIMEOUT')
         self._pool._factory.noisy = False
 
         self._sslMethod = openssl_methods[settings.get('DOWNLOADER_CLIENT_TLS_METHOD')]
@@ -68,6 +86,7 @@ class HTTP11DownloadHandler:
             warnings.warn(msg)
         self._default_maxsize = settings.getint('DOWNLOAD_MAXSIZE')
         self._default_warnsize = settings.getint('DOWNLOAD_WARNSIZE')
+        self._default_spillsize = settings.getint('DOWNLOAD_SPILLSIZE')
         self._fail_on_dataloss = settings.getbool('DOWNLOAD_FAIL_ON_DATALOSS')
         self._disconnect_timeout = 1
 
@@ -84,8 +103,26 @@ class HTTP11DownloadHandler:
             warnsize=getattr(spider, 'download_warnsize', self._default_warnsize),
             fail_on_dataloss=self._fail_on_dataloss,
             crawler=self._crawler,
+            spillsize=getattr(spider, 'download_spillsize', self._default_spillsize),
         )
-        return agent.download_request(request)
+        # agent.request() gets its connection from the pool synchronously
+        self._pool.next_slot = self._get_slot(request)
+        try:
+            return agent.download_request(request)
+        finally:
+            self._pool.next_slot = None
+
+    def _get_slot(self, request):
+        """Return the downloader slot key of the request and the number of
+        persistent connections to keep for it"""
+        key = request.meta.get('download_slot')
+        if key is None:
+            return None
+        try:
+            slot = self._crawler.engine.downloader.slots.get(key)
+        except AttributeError:
+            slot = None
+        return key, slot.concurrency if slot else self._pool.maxPersistentPerHost
 
     def close(self):
         from twisted.internet import reactor
@@ -109,6 +146,119 @@ class HTTP11DownloadHandler:
         return d
 
 
+@implementer(IHandshakeListener)
+class _ScrapyHTTP11ClientProtocol(HTTP11ClientProtocol):
+    """HTTP11ClientProtocol reporting TLS handshakes and disconnections to
+    its factory"""
+
+    _connected_at = None
+
+    def __init__(self, quiescentCallback, factory):
+        super().__init__(quiescentCallback)
+        self._factory = factory
+
+    def connectionMade(self):
+        self._connected_at = time()
+        super().connectionMade()
+
+    def handshakeCompleted(self):
+        self._factory.eventCallback('tls_handshake', time() - self._connected_at)
+
+    def connectionLost(self, reason):
+        self._factory.eventCallback('closed', None)
+        super().connectionLost(reason)
+
+
+class _ScrapyHTTP11ClientFactory(_HTTP11ClientFactory):
+
+    def __init__(self, quiescentCallback, metadata, eventCallback=None):
+        super().__init__(quiescentCallback, metadata)
+        self.eventCallback = eventCallback or (lambda event, value: None)
+
+    def buildProtocol(self, addr):
+        return _ScrapyHTTP11ClientProtocol(self._quiescentCallback, self)
+
+
+class ScrapyHTTPConnectionPool(HTTPConnectionPool):
+    """HTTPConnectionPool keeping up to as many persistent connections for
+    each downloader slot as its concurrency, and counting opened, reused and
+    closed connections and TLS handshake times in the stats.
+
+    The slot of the connections requested next, as ``(slot key, maximum
+    number of persistent connections)``, is set in :attr:`next_slot`. Each
+    connection keeps the slot it was opened for.
+    """
+
+    _factory = _ScrapyHTTP11ClientFactory
+
+    def __init__(self, reactor, persistent=True, stats=None, slot_stats=False):
+        super().__init__(reactor, persistent)
+        self.stats = stats
+        self.slot_stats = slot_stats
+        self.next_slot = None
+        self._opened = False
+
+    def getConnection(self, key, endpoint):
+        self._opened = False
+        d = super().getConnection(key, endpoint)
+        if key in self._connections and not self._connections[key]:
+            del self._connections[key]
+        if not self._opened:
+            self._inc_stats(self.next_slot, 'reused')
+        return d
+
+    def _newConnection(self, key, endpoint):
+        self._opened = True
+        slot = self.next_slot
+        self._inc_stats(slot, 'opened')
+
+        def quiescentCallback(protocol):
+            self._putConnection(key, protocol, slot)
+
+        def eventCallback(event, value):
+            if event == 'tls_handshake':
+                self._inc_stats(slot, 'tls_handshakes')
+                self._inc_stats(slot, 'tls_handshake_time', value)
+                if self.stats:
+                    self.stats.max_value('downloader/connections/tls_handshake_time_max', value)
+            else:
+                self._inc_stats(slot, event)
+
+        factory = self._factory(quiescentCallback, repr(endpoint), eventCallback)
+        return endpoint.connect(factory)
+
+    def _putConnection(self, key, connection, slot=None):
+        if connection.state != "QUIESCENT":
+            super()._putConnection(key, connection)
+            return
+        limit = slot[1] if slot else self.maxPersistentPerHost
+        connections = self._connections.setdefault(key, [])
+        while connections and len(connections) >= limit:
+            dropped = connections.pop(0)
+            dropped.transport.loseConnection()
+            self._timeouts.pop(dropped).cancel()
+        if limit <= 0:
+            if not connections:
+                del self._connections[key]
+            connection.transport.loseConnection()
+            return
+        connections.append(connection)
+        self._timeouts[connection] = self._reactor.callLater(
+            self.cachedConnectionTimeout, self._removeConnection, key, connection)
+
+    def _removeConnection(self, key, connection):
+        super()._removeConnection(key, connection)
+        if not self._connections[key]:
+            del self._connections[key]
+
+    def _inc_stats(self, slot, name, value=1):
+        if not self.stats:
+            return
+        self.stats.inc_value(f'downloader/connections/{name}', value)
+        if self.slot_stats and slot:
+            self.stats.inc_value(f'downloader/slot/{slot[0]}/connections/{name}', value)
+
+
 class TunnelError(Exception):
     """An HTTP CONNECT tunnel could not be established by the proxy."""
 
@@ -282,7 +432,7 @@ class ScrapyAgent:
     _TunnelingAgent = TunnelingAgent
 
     def __init__(self, contextFactory=None, connectTimeout=10, bindAddress=None, pool=None,
-                 maxsize=0, warnsize=0, fail_on_dataloss=True, crawler=None):
+                 maxsize=0, warnsize=0, fail_on_dataloss=True, crawler=None, spillsize=0):
         self._contextFactory = contextFactory
         self._connectTimeout = connectTimeout
         self._bindAddress = bindAddress
@@ -292,6 +442,7 @@ class ScrapyAgent:
         self._fail_on_dataloss = fail_on_dataloss
         self._txresponse = None
         self._crawler = crawler
+        self._spillsize = spillsize
 
     def _get_agent(self, request, timeout):
         from twisted.internet import reactor
@@ -391,6 +542,7 @@ class ScrapyAgent:
 
         maxsize = request.meta.get('download_maxsize', self._maxsize)
         warnsize = request.meta.get('download_warnsize', self._warnsize)
+        spillsize = request.meta.get('download_spillsize', self._spillsize)
         expected_size = txresponse.length if txresponse.length != UNKNOWN_LENGTH else -1
         fail_on_dataloss = request.meta.get('download_fail_on_dataloss', self._fail_on_dataloss)
 
@@ -409,6 +561,14 @@ class ScrapyAgent:
                            "download warn size (%(warnsize)s) in request %(request)s.",
                            {'size': expected_size, 'warnsize': warnsize, 'request': request})
 
+        decoder = None
+        if request.meta.get('_decompress_body') and request.method != 'HEAD':
+            content_encoding = txresponse.headers.getRawHeaders(b'Content-Encoding') or []
+            if len(content_encoding) == 1:
+                encoding = content_encoding[0].strip().lower()
+                if encoding in IncrementalDecoder.encodings:
+                    decoder = IncrementalDecoder(encoding)
+
         def _cancel(_):
             # Abort connection immediately.
             txresponse._transport._producer.abortConnection()
@@ -423,6 +583,8 @@ class ScrapyAgent:
                 warnsize=warnsize,
                 fail_on_dataloss=fail_on_dataloss,
                 crawler=self._crawler,
+                spillsize=spillsize,
+                decoder=decoder,
             )
         )
 
@@ -433,12 +595,19 @@ class ScrapyAgent:
 
     def _cb_bodydone(self, result, request, url):
         headers = Headers(result["txresponse"].headers.getAllRawHeaders())
-        respcls = responsetypes.from_args(headers=headers, url=url, body=result["body"])
+        if result.get("decoded"):
+            del headers[b'Content-Encoding']
+        body = result["body"]
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        if isinstance(body, mmap.mmap) and issubclass(respcls, TextResponse):
+            # text responses are decoded in memory anyway
+            data, body = body, body[:]
+            data.close()
         response = respcls(
             url=url,
             status=int(result["txresponse"].code),
             headers=headers,
-            body=result["body"],
+            body=body,
             flags=result["flags"],
             certificate=result["certificate"],
             ip_address=result["ip_address"],
@@ -469,13 +638,19 @@ class _RequestBodyProducer:
 
 class _ResponseReader(protocol.Protocol):
 
-    def __init__(self, finished, txresponse, request, maxsize, warnsize, fail_on_dataloss, crawler):
+    def __init__(self, finished, txresponse, request, maxsize, warnsize, fail_on_dataloss, crawler,
+                 spillsize=0, decoder=None):
         self._finished = finished
         self._txresponse = txresponse
         self._request = request
-        self._bodybuf = BytesIO()
+        # body chunks, joined once the body is complete
+        self._bodybuf = []
+        self._bodysize = 0
+        self._bodyfile = None
+        self._decoder = decoder
         self._maxsize = maxsize
         self._warnsize = warnsize
+        self._spillsize = spillsize
         self._fail_on_dataloss = fail_on_dataloss
         self._fail_on_dataloss_warned = False
         self._reached_warnsize = False
@@ -484,10 +659,44 @@ class _ResponseReader(protocol.Protocol):
         self._ip_address = None
         self._crawler = crawler
 
+    def _write(self, data):
+        if not data:
+            return
+        if self._bodyfile is not None:
+            self._bodyfile.write(data)
+            return
+        self._bodybuf.append(data)
+        self._bodysize += len(data)
+        if self._spillsize and self._bodysize > self._spillsize:
+            # move the body to a temporary file, where the rest of the body
+            # will be written
+            self._bodyfile = tempfile.TemporaryFile()
+            self._bodyfile.writelines(self._bodybuf)
+            self._bodybuf = []
+
+    def _getbody(self):
+        if self._decoder is not None:
+            self._write(self._decoder.flush())
+        if self._bodyfile is None:
+            body = b''.join(self._bodybuf)
+            self._bodybuf = []
+            return body
+        with self._bodyfile as bodyfile:
+            bodyfile.flush()
+            if not bodyfile.tell():
+                return b''
+            return mmap.mmap(bodyfile.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _discard_body(self):
+        self._bodybuf = []
+        if self._bodyfile is not None:
+            self._bodyfile.close()
+
     def _finish_response(self, flags=None, failure=None):
         self._finished.callback({
             "txresponse": self._txresponse,
-            "body": self._bodybuf.getvalue(),
+            "body": self._getbody(),
+            "decoded": self._decoder is not None,
             "flags": flags,
             "certificate": self._certificate,
             "ip_address": self._ip_address,
@@ -507,8 +716,17 @@ class _ResponseReader(protocol.Protocol):
         if self._finished.called:
             return
 
-        self._bodybuf.write(bodyBytes)
         self._bytes_received += len(bodyBytes)
+        if self._decoder is None:
+            self._write(bodyBytes)
+        else:
+            try:
+                self._write(self._decoder.decode(bodyBytes))
+            except zlib.error:
+                # not decodable, leave it to HttpCompressionMiddleware
+                for data in self._decoder.received:
+                    self._write(data)
+                self._decoder = None
 
         bytes_received_result = self._crawler.signals.send_catch_log(
             signal=signals.bytes_received,
@@ -531,7 +749,7 @@ class _ResponseReader(protocol.Protocol):
                             'maxsize': self._maxsize,
                             'request': self._request})
             # Clear buffer earlier to avoid keeping data in memory for a long time.
-            self._bodybuf.truncate(0)
+            self._discard_body()
             self._finished.cancel()
 
         if self._warnsize and self._bytes_received > self._warnsize and not self._reached_warnsize:
@@ -565,4 +783,5 @@ class _ResponseReader(protocol.Protocol):
                                self._txresponse.request.absoluteURI.decode())
                 self._fail_on_dataloss_warned = True
 
+        self._discard_body()
         self._finished.errback(reason)
@@ -8,7 +8,7 @@ from twisted.internet import defer
 from scrapy.exceptions import _InvalidOutput
 from scrapy.http import Request, Response
 from scrapy.middleware import MiddlewareManager
-from scrapy.utils.defer import mustbe_deferred, deferred_from_coro
+from scrapy.utils.defer import _is_async, deferred_from_coro
 from scrapy.utils.conf import build_component_list
 
 
@@ -30,55 +30,99 @@ class DownloaderMiddlewareManager(MiddlewareManager):
             self.methods['process_exception'].appendleft(mw.process_exception)
 
     def download(self, download_func, request, spider):
-        @defer.inlineCallbacks
-        def process_request(request):
-            for method in self.methods['process_request']:
-                response = yield deferred_from_coro(method(request=request, spider=spider))
-                if response is not None and not isinstance(response, (Response, Request)):
-                    raise _InvalidOutput(
-                        f"Middleware {method.__self__.__class__.__name__}"
-                        ".process_request must return None, Response or "
-                        f"Request, got {response.__class__.__name__}"
-                    )
-                if response:
+        # Middleware methods are called right away as long as they return
+        # synchronously, which most do; when one returns a Deferred or a
+        # coroutine, the rest of the chain is resumed once it fires.
+
+        def process_request(request, start=0):
+            methods = self.methods['process_request']
+            for index in range(start, len(methods)):
+                method = methods[index]
+                response = method(request=request, spider=spider)
+                if _is_async(response):
+                    return deferred_from_coro(response).addCallback(
+                        resume_request, request, method, index)
+                if _check_request_output(method, response):
                     return response
-            return (yield download_func(request=request, spider=spider))
+            return download_func(request=request, spider=spider)
+
+        def resume_request(response, request, method, index):
+            if _check_request_output(method, response):
+                return response
+            return process_request(request, index + 1)
 
-        @defer.inlineCallbacks
-        def process_response(response):
+        def process_response(response, start=0):
             if response is None:
                 raise TypeError("Received None in process_response")
             elif isinstance(response, Request):
                 return response
 
-            for method in self.methods['process_response']:
-                response = yield deferred_from_coro(method(request=request, response=response, spider=spider))
-                if not isinstance(response, (Response, Request)):
-                    raise _InvalidOutput(
-                        f"Middleware {method.__self__.__class__.__name__}"
-                        ".process_response must return Response or Request, "
-                        f"got {type(response)}"
-                    )
+            methods = self.methods['process_response']
+            for index in range(start, len(methods)):
+                method = methods[index]
+                response = method(request=request, response=response, spider=spider)
+                if _is_async(response):
+                    return deferred_from_coro(response).addCallback(
+                        resume_response, method, index)
+                _check_response_output(method, response)
                 if isinstance(response, Request):
                     return response
             return response
 
-        @defer.inlineCallbacks
-        def process_exception(failure):
+        def resume_response(response, method, index):
+            _check_response_output(method, response)
+            if isinstance(response, Request):
+                return response
+            return process_response(response, index + 1)
+
+        def process_exception(failure, start=0):
             exception = failure.value
-            for method in self.methods['process_exception']:
-                response = yield deferred_from_coro(method(request=request, exception=exception, spider=spider))
-                if response is not None and not isinstance(response, (Response, Request)):
-                    raise _InvalidOutput(
-                        f"Middleware {method.__self__.__class__.__name__}"
-                        ".process_exception must return None, Response or "
-                        f"Request, got {type(response)}"
-                    )
-                if response:
+            methods = self.methods['process_exception']
+            for index in range(start, len(methods)):
+                method = methods[index]
+                response = method(request=request, exception=exception, spider=spider)
+                if _is_async(response):
+                    return deferred_from_coro(response).addCallback(
+                        resume_exception, failure, method, index)
+                if _check_exception_output(method, response):
                     return response
             return failure
 
-        deferred = mustbe_deferred(process_request, request)
+        def resume_exception(response, failure, method, index):
+            if _check_exception_output(method, response):
+                return response
+            return process_exception(failure, index + 1)
+
+        deferred = defer.maybeDeferred(process_request, request)
         deferred.addErrback(process_exception)
         deferred.addCallback(process_response)
         return deferred
+
+
+def _check_request_output(method, response):
+    if response is not None and not isinstance(response, (Response, Request)):
+        raise _InvalidOutput(
+            f"Middleware {method.__self__.__class__.__name__}"
+            ".process_request must return None, Response or "
+            f"Request, got {response.__class__.__name__}"
+        )
+    return response
+
+
+def _check_response_output(method, response):
+    if not isinstance(response, (Response, Request)):
+        raise _InvalidOutput(
+            f"Middleware {method.__self__.__class__.__name__}"
+            ".process_response must return Response or Request, "
+            f"got {type(response)}"
+        )
+
+
+def _check_exception_output(method, response):
+    if response is not None and not isinstance(response, (Response, Request)):
+        raise _InvalidOutput(
+            f"Middleware {method.__self__.__class__.__name__}"
+            ".process_exception must return None, Response or "
+            f"Request, got {type(response)}"
+        )
+    return response
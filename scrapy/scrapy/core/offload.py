@@ -0,0 +1,169 @@
+"""
+Process pool used by the Scraper to run CPU-heavy spider callbacks outside of
+the reactor thread (see :setting:`OFFLOAD_CALLBACKS`).
+"""
+import inspect
+import logging
+import multiprocessing
+import os
+import pickle
+import traceback
+
+from twisted.internet import defer
+
+from scrapy.http import Request, TextResponse
+from scrapy.utils.log import configure_logging
+from scrapy.utils.misc import load_object
+from scrapy.utils.reqser import request_from_dict, request_to_dict
+from scrapy.utils.spider import iterate_spider_output
+
+
+logger = logging.getLogger(__name__)
+
+# spider copy used by the callbacks run in a worker process
+_spider = None
+
+
+class RemoteTraceback(Exception):
+    """Traceback of an exception raised by an offloaded callback, set as the
+    cause of the exception re-raised in the crawl process"""
+
+    def __init__(self, tb):
+        super().__init__(tb)
+        self.tb = tb
+
+    def __str__(self):
+        return self.tb
+
+
+class CallbackPool:
+    """
+    Pool of worker processes that run spider callbacks.
+
+    The callbacks run on a copy of the spider, made when the pool is started,
+    which holds the spider attributes that can be pickled. Responses are sent
+    to the workers as their class, URL, status, headers and body, along with
+    their request, and the items and requests returned by the callbacks are
+    sent back.
+
+    While a callback runs in a worker its response is still counted by the
+    Scraper slot, so :setting:`SCRAPER_SLOT_MAX_ACTIVE_SIZE` still limits the
+    responses being processed.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.offload_all = settings.getbool('OFFLOAD_CALLBACKS')
+        self.processes = settings.getint('OFFLOAD_PROCESSES') or os.cpu_count()
+        self.stats = crawler.stats
+        self.logunser = True
+        self._pool = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def wants(self, request, spider):
+        """Return ``True`` if the callback of ``request`` should be run in the
+        pool"""
+        callback = request.callback or spider.parse
+        offload = request.meta.get('offload', getattr(callback, 'offload', self.offload_all))
+        if not offload:
+            return False
+        return not (inspect.iscoroutinefunction(callback)
+                    or inspect.isasyncgenfunction(callback))
+
+    def call(self, callback, response, spider):
+        """Run ``callback`` in the pool and return a deferred that fires with
+        its output, or ``None`` if the response or the callback can't be sent
+        to the pool"""
+        try:
+            task = pickle.dumps((_response_to_dict(response),
+                                 request_to_dict(response.request, spider)),
+                                protocol=4)
+        except (ValueError, pickle.PicklingError, AttributeError, TypeError) as e:
+            if self.logunser:
+                msg = ("Unable to offload callback for: %(request)s - reason:"
+                       " %(reason)s - no more unserializable callbacks will be"
+                       " logged (stats being collected)")
+                logger.warning(msg, {'request': response.request, 'reason': e},
+                               exc_info=True, extra={'spider': spider})
+                self.logunser = False
+            self.stats.inc_value('offload/unserializable', spider=spider)
+            return None
+        if self._pool is None:
+            self._pool = self._start(spider)
+        from twisted.internet import reactor
+        d = defer.Deferred()
+        self._pool.apply_async(
+            _run_callback, (task,),
+            callback=lambda result: reactor.callFromThread(d.callback, result),
+            error_callback=lambda exc: reactor.callFromThread(d.errback, exc),
+        )
+        self.stats.inc_value('offload/callbacks', spider=spider)
+        d.addCallback(self._output, spider)
+        return d
+
+    def _start(self, spider):
+        state = {}
+        for name, value in vars(spider).items():
+            if name == 'crawler':
+                continue
+            try:
+                pickle.dumps(value, protocol=4)
+            except Exception:
+                continue
+            state[name] = value
+        context = multiprocessing.get_context('spawn')
+        return context.Pool(self.processes, _init_worker, (type(spider), state))
+
+    def _output(self, result, spider):
+        output, exc, tb = result
+        for kind, value in output:
+            yield request_from_dict(value, spider) if kind == 'request' else value
+        if exc is not None:
+            raise exc from RemoteTraceback(tb)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+
+def _response_to_dict(response):
+    d = {
+        '_class': response.__module__ + '.' + response.__class__.__name__,
+        'url': response.url,
+        'status': response.status,
+        'headers': dict(response.headers),
+        'body': bytes(response.body),
+        'flags': response.flags,
+    }
+    if isinstance(response, TextResponse):
+        d['encoding'] = response._encoding
+    return d
+
+
+def _init_worker(spidercls, state):
+    global _spider
+    _spider = spidercls.__new__(spidercls)
+    _spider.__dict__.update(state)
+    if 'settings' in state:
+        configure_logging(state['settings'])
+
+
+def _run_callback(task):
+    response, request = pickle.loads(task)
+    request = request_from_dict(request, _spider)
+    response = load_object(response.pop('_class'))(request=request, **response)
+    output, exc, tb = [], None, None
+    try:
+        callback = request.callback or _spider._parse
+        for value in iterate_spider_output(callback(response, **request.cb_kwargs)):
+            if isinstance(value, Request):
+                output.append(('request', request_to_dict(value, _spider)))
+            else:
+                output.append(('item', value))
+    except Exception as e:
+        exc, tb = e, traceback.format_exc()
+    return output, exc, tb
@@ -1,10 +1,21 @@
 import os
 import json
 import logging
+import pickle
+from heapq import heappop, heappush
+from itertools import count
 from os.path import join, exists
+from time import time
 
+from twisted.internet import task
+
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+from scrapy.pqueues import DelayedPriorityQueue
 from scrapy.utils.misc import load_object, create_instance
 from scrapy.utils.job import job_dir
+from scrapy.utils.reqser import request_from_dict, request_to_dict
+from scrapy.utils.shard import shard_for_key
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +46,14 @@ class Scheduler:
     Overall, Scheduler is an object which holds several PriorityQueue instances
     (in-memory and on-disk) and implements fallback logic for them.
     Also, it handles dupefilters.
+
+    Requests whose ``not_before`` meta key is a time in the future are kept
+    in a delayed tier until that time: a heap in memory and, when
+    :setting:`JOBDIR` is set, a :class:`~scrapy.pqueues.DelayedPriorityQueue`
+    on disk, which keeps them in buckets ordered by time. Due requests are
+    moved to the regular queues, and a timer wakes the engine up when the
+    next delayed request is due, so delayed requests don't hold a download
+    slot while they wait.
     """
 
     def __init__(self, dupefilter, jobdir=None, dqclass=None, mqclass=None,
@@ -48,6 +67,10 @@ class Scheduler:
         self.logunser = logunser  # 是否记录日志请求
         self.stats = stats  #
         self.crawler = crawler
+        self.delayed = []  # heap of (not_before, sequence, request)
+        self._delayed_seq = count()
+        self.dds = None
+        self._wakeup = None
 
     @classmethod
     def from_crawler(cls, crawler):
@@ -99,6 +122,7 @@ class Scheduler:
         # 磁盘队列实例，如果在启动时候设置了JOBDIR，则激活磁盘队列实例，否则设置None,
         # 只靠mqs内存优先队列进行队列管理，这也是大多数时候单机版本scrapy的内存管理方式
         self.dqs = self._dq() if self.dqdir else None
+        self.dds = self._dd() if self.dqdir else None
         # 链接去重器
         return self.df.open()
 
@@ -111,9 +135,18 @@ class Scheduler:
         Returns: url去重器是否关闭成功
 
         """
+        if self._wakeup is not None and self._wakeup.active():
+            self._wakeup.cancel()
         if self.dqs:
             state = self.dqs.close()
             self._write_dqs_state(self.dqdir, state)
+        if self.dds is not None:
+            # delayed requests kept in memory are saved with the others
+            while self.delayed:
+                _, _, request = heappop(self.delayed)
+                self._ddpush(request)
+            state = self.dds.close()
+            self._write_dqs_state(self._dddir(), state)
         return self.df.close(reason)
 
     def enqueue_request(self, request):
@@ -130,18 +163,29 @@ class Scheduler:
         if not request.dont_filter and self.df.request_seen(request):
             self.df.log(request, self.spider)
             return False
-        # 磁盘优先队列去重
-        dqok = self._dqpush(request)
-        if dqok:
+        not_before = request.meta.get('not_before')
+        if not_before and not_before > time():
+            self._delay(request, not_before)
+            self.stats.inc_value('scheduler/enqueued/delayed', spider=self.spider)
+            self.stats.inc_value('scheduler/enqueued', spider=self.spider)
+            return True
+        if self._push(request):
             # 记录日志
             self.stats.inc_value('scheduler/enqueued/disk', spider=self.spider)
         else:
-            # 用内存优先队列去重
-            self._mqpush(request)
             self.stats.inc_value('scheduler/enqueued/memory', spider=self.spider)
         self.stats.inc_value('scheduler/enqueued', spider=self.spider)
         return True
 
+    def _push(self, request):
+        """Push the request to the disk queue, or to the memory queue if it
+        cannot be serialized. Return ``True`` if it went to the disk queue."""
+        # 磁盘优先队列去重
+        if self._dqpush(request):
+            return True
+        # 用内存优先队列去重
+        self._mqpush(request)
+        return False
 
     def next_request(self):
         """
@@ -149,6 +193,8 @@ class Scheduler:
         Returns: 请求
 
         """
+        if self.delayed or self.dds:
+            self._release_delayed()
         # 从内存优先队列取
         request = self.mqs.pop()
         if request:
@@ -164,7 +210,59 @@ class Scheduler:
         return request
 
     def __len__(self):
-        return len(self.dqs) + len(self.mqs) if self.dqs else len(self.mqs)
+        length = len(self.mqs) + len(self.delayed)
+        if self.dqs:
+            length += len(self.dqs)
+        if self.dds:
+            length += len(self.dds)
+        return length
+
+    def _delay(self, request, not_before):
+        if self.dds is not None and self._ddpush(request):
+            self._schedule_wakeup(self.dds.next_due)
+        else:
+            heappush(self.delayed, (not_before, next(self._delayed_seq), request))
+            self._schedule_wakeup(self.delayed[0][0])
+
+    def _ddpush(self, request):
+        try:
+            self.dds.push(request)
+        except ValueError:  # non serializable request
+            self.stats.inc_value('scheduler/unserializable', spider=self.spider)
+            return False
+        return True
+
+    def _release_delayed(self):
+        """Move the delayed requests which are due to the regular queues"""
+        now = time()
+        if self.dds is not None:
+            request = self.dds.pop_due(now)
+            while request is not None:
+                heappush(self.delayed, (request.meta['not_before'],
+                                        next(self._delayed_seq), request))
+                request = self.dds.pop_due(now)
+        while self.delayed and self.delayed[0][0] <= now:
+            _, _, request = heappop(self.delayed)
+            self._push(request)
+            self.stats.inc_value('scheduler/delayed/released', spider=self.spider)
+        if self.delayed:
+            self._schedule_wakeup(self.delayed[0][0])
+        elif self.dds:
+            self._schedule_wakeup(self.dds.next_due)
+
+    def _schedule_wakeup(self, when):
+        """Make sure the engine asks for a request again at ``when``"""
+        from twisted.internet import reactor
+        if self._wakeup is not None and self._wakeup.active():
+            if self._wakeup.getTime() <= reactor.seconds() + (when - time()):
+                return
+            self._wakeup.cancel()
+        self._wakeup = reactor.callLater(max(0, when - time()), self._wake_engine)
+
+    def _wake_engine(self):
+        engine = getattr(self.crawler, 'engine', None)
+        if getattr(engine, 'slot', None) is not None:
+            engine.slot.nextcall.schedule()
 
     def _dqpush(self, request):
         """
@@ -230,6 +328,18 @@ class Scheduler:
                         {'queuesize': len(q)}, extra={'spider': self.spider})
         return q
 
+    def _dd(self):
+        """ Create the on-disk queue of the delayed requests """
+        return DelayedPriorityQueue.from_crawler(self.crawler, self.dqclass,
+                                                 self._dddir(),
+                                                 self._read_dqs_state(self._dddir()))
+
+    def _dddir(self):
+        dddir = join(os.path.dirname(self.dqdir), 'requests.delayed')
+        if not exists(dddir):
+            os.makedirs(dddir)
+        return dddir
+
     def _dqdir(self, jobdir):
         """ Return a folder name to keep disk queue state at """
         if jobdir:
@@ -248,3 +358,92 @@ class Scheduler:
     def _write_dqs_state(self, dqdir, state):
         with open(join(dqdir, 'active.json'), 'w') as f:
             json.dump(state, f)
+
+
+class ShardedScheduler(Scheduler):
+    """
+    Scheduler used by the worker processes of a sharded crawl (see
+    :setting:`CRAWL_PROCESSES`).
+
+    Each downloader slot is owned by one of the workers: requests for slots
+    owned by other workers are serialized and sent to them instead of being
+    enqueued, so that concurrency limits and download delays still apply to
+    whole slots. Requests that can't be serialized are enqueued locally.
+
+    Outside of a sharded crawl it behaves like :class:`Scheduler`.
+    """
+
+    #: interval (in seconds) at which the inbox of the worker is checked
+    poll_interval = 0.1
+
+    def __init__(self, dupefilter, channel=None, **kwargs):
+        super().__init__(dupefilter, **kwargs)
+        self.channel = channel
+        self._poll = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        scheduler = super().from_crawler(crawler)
+        scheduler.channel = getattr(crawler, 'shard_channel', None)
+        return scheduler
+
+    def open(self, spider):
+        result = super().open(spider)
+        if self.channel is not None:
+            if self.channel.index:
+                # start requests are only sent by the first worker
+                self.crawler.engine.slot.start_requests = None
+            self.crawler.signals.connect(self._spider_idle, signals.spider_idle)
+            self._poll = task.LoopingCall(self._receive)
+            self._poll.start(self.poll_interval, now=False)
+        return result
+
+    def close(self, reason):
+        if self.channel is not None:
+            if self._poll.running:
+                self._poll.stop()
+            self.crawler.signals.disconnect(self._spider_idle, signals.spider_idle)
+            self.channel.close()
+        return super().close(reason)
+
+    def enqueue_request(self, request):
+        if self.channel is not None:
+            key = self.crawler.engine.downloader._get_slot_key(request, self.spider)
+            index = shard_for_key(key, self.channel.shards)
+            if index != self.channel.index and self._send(index, request):
+                return True
+            self.channel.set_busy()
+        return super().enqueue_request(request)
+
+    def _send(self, index, request):
+        try:
+            message = pickle.dumps(request_to_dict(request, self.spider), protocol=4)
+        except (ValueError, pickle.PicklingError, AttributeError, TypeError) as e:
+            if self.logunser:
+                msg = ("Unable to serialize request: %(request)s - reason:"
+                       " %(reason)s - no more unserializable requests will be"
+                       " logged (stats being collected)")
+                logger.warning(msg, {'request': request, 'reason': e},
+                               exc_info=True, extra={'spider': self.spider})
+                self.logunser = False
+            self.stats.inc_value('shard/unserializable', spider=self.spider)
+            return False
+        if self.channel.send(index, message):
+            self.stats.inc_value('shard/requests_sent', spider=self.spider)
+        else:
+            self.stats.inc_value('shard/requests_dropped', spider=self.spider)
+        return True
+
+    def _receive(self):
+        messages = self.channel.receive()
+        for message in messages:
+            request = request_from_dict(pickle.loads(message), self.spider)
+            super().enqueue_request(request)
+            self.stats.inc_value('shard/requests_received', spider=self.spider)
+        if messages or self.channel.finished:
+            self.crawler.engine.slot.nextcall.schedule()
+        return len(messages)
+
+    def _spider_idle(self, spider):
+        if self._receive() or not self.channel.set_idle():
+            raise DontCloseSpider
@@ -2,6 +2,7 @@
 extracts information from them"""
 
 import logging
+import mmap
 from collections import deque
 
 from itemadapter import is_item
@@ -9,6 +10,7 @@ from twisted.internet import defer
 from twisted.python.failure import Failure
 
 from scrapy import signals
+from scrapy.core.offload import CallbackPool
 from scrapy.core.spidermw import SpiderMiddlewareManager
 from scrapy.exceptions import CloseSpider, DropItem, IgnoreRequest
 from scrapy.http import Request, Response
@@ -37,10 +39,7 @@ class Slot:
     def add_response_request(self, response, request):
         deferred = defer.Deferred()
         self.queue.append((response, request, deferred))
-        if isinstance(response, Response):
-            self.active_size += max(len(response.body), self.MIN_RESPONSE_SIZE)
-        else:
-            self.active_size += self.MIN_RESPONSE_SIZE
+        self.active_size += self._response_size(response)
         return deferred
 
     def next_response_request_deferred(self):
@@ -50,10 +49,13 @@ class Slot:
 
     def finish_response(self, response, request):
         self.active.remove(request)
-        if isinstance(response, Response):
-            self.active_size -= max(len(response.body), self.MIN_RESPONSE_SIZE)
-        else:
-            self.active_size -= self.MIN_RESPONSE_SIZE
+        self.active_size -= self._response_size(response)
+
+    def _response_size(self, response):
+        # memory-mapped bodies are not kept in memory
+        if isinstance(response, Response) and not isinstance(response.body, mmap.mmap):
+            return max(len(response.body), self.MIN_RESPONSE_SIZE)
+        return self.MIN_RESPONSE_SIZE
 
     def is_idle(self):
         return not (self.queue or self.active)
@@ -70,6 +72,8 @@ class Scraper:
         itemproc_cls = load_object(crawler.settings['ITEM_PROCESSOR'])
         self.itemproc = itemproc_cls.from_crawler(crawler)
         self.concurrent_items = crawler.settings.getint('CONCURRENT_ITEMS')
+        self.callback_pool = CallbackPool.from_crawler(crawler)
+        self.profiler = crawler.profiler
         self.crawler = crawler
         self.signals = crawler.signals
         self.logformatter = crawler.logformatter
@@ -84,10 +88,15 @@ class Scraper:
         """Close a spider being scraped and release its resources"""
         slot = self.slot
         slot.closing = defer.Deferred()
+        slot.closing.addCallback(self._close_callback_pool)
         slot.closing.addCallback(self.itemproc.close_spider)
         self._check_if_closing(spider, slot)
         return slot.closing
 
+    def _close_callback_pool(self, spider):
+        self.callback_pool.close()
+        return spider
+
     def is_idle(self):
         """Return True if there isn't any more spiders to process"""
         return not self.slot
@@ -147,13 +156,22 @@ class Scraper:
                 result.request = request
             callback = result.request.callback or spider._parse
             warn_on_generator_with_return_value(spider, callback)
-            dfd = defer_succeed(result)
-            dfd.addCallback(callback, **result.request.cb_kwargs)
+            dfd = None
+            if self.callback_pool.wants(result.request, spider):
+                dfd = self.callback_pool.call(callback, result, spider)
+            if dfd is None:
+                if self.profiler is not None:
+                    callback = self.profiler.profile_callback(callback)
+                dfd = defer_succeed(result)
+                dfd.addCallback(callback, **result.request.cb_kwargs)
         else:  # result is a Failure
             result.request = request
             warn_on_generator_with_return_value(spider, request.errback)
+            errback = request.errback
+            if self.profiler is not None and errback is not None:
+                errback = self.profiler.profile_callback(errback)
             dfd = defer_fail(result)
-            dfd.addErrback(request.errback)
+            dfd.addErrback(errback)
         return dfd.addCallback(iterate_spider_output)
 
     def handle_spider_error(self, _failure, request, response, spider):
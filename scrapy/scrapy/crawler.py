@@ -1,9 +1,13 @@
 import logging
+import multiprocessing
+import os
+import pickle
 import pprint
 import signal
 import warnings
+from queue import Empty
 
-from twisted.internet import defer
+from twisted.internet import defer, task
 from zope.interface.exceptions import DoesNotImplement
 
 try:
@@ -31,6 +35,7 @@ from scrapy.utils.log import (
 from scrapy.utils.misc import create_instance, load_object
 from scrapy.utils.ossignal import install_shutdown_handlers, signal_names
 from scrapy.utils.reactor import install_reactor, verify_installed_reactor
+from scrapy.utils.shard import merge_stats, ShardChannel
 
 
 logger = logging.getLogger(__name__)
@@ -69,6 +74,8 @@ class Crawler:
 
         lf_cls = load_object(self.settings['LOG_FORMATTER'])
         self.logformatter = lf_cls.from_crawler(self)
+        # set by the Profiler extension when enabled
+        self.profiler = None
         self.extensions = ExtensionManager.from_crawler(self)
 
         self.settings.freeze()
@@ -109,6 +116,173 @@ class Crawler:
             yield defer.maybeDeferred(self.engine.stop)
 
 
+class ShardedCrawler(Crawler):
+    """
+    A crawler that runs its spider in :setting:`CRAWL_PROCESSES` worker
+    processes, each one with its own engine.
+
+    Requests are routed between the workers by downloader slot, using
+    :class:`~scrapy.core.scheduler.ShardedScheduler`. Items scraped by the
+    workers are sent to this process, where the :ref:`feed exports
+    <topics-feed-exports>` are written, and the stats of the workers are merged
+    into :attr:`stats` once they are finished. Other extensions run in the
+    workers.
+
+    Worker processes are started with the ``spawn`` method, so the spider class
+    must be importable, and its arguments and the settings must be picklable.
+    """
+
+    #: interval (in seconds) at which the results of the workers are read
+    poll_interval = 0.1
+
+    def __init__(self, spidercls, settings=None):
+        if isinstance(settings, dict) or settings is None:
+            settings = Settings(settings)
+        self.shard_settings = settings.copy()
+        self.shard_settings.set('CRAWL_PROCESSES', 1, priority='cmdline')
+        self.shard_settings.set('SCHEDULER', 'scrapy.core.scheduler.ShardedScheduler',
+                                priority='cmdline')
+        self.shard_settings.set('FEEDS', {}, priority='cmdline')
+        self.shard_settings.set('FEED_URI', None, priority='cmdline')
+        self.shard_settings.set('STATS_DUMP', False, priority='cmdline')
+        self.processes = settings.getint('CRAWL_PROCESSES')
+        settings = settings.copy()
+        settings.set('EXTENSIONS_BASE', {'scrapy.extensions.feedexport.FeedExporter': 0},
+                     priority='cmdline')
+        settings.set('EXTENSIONS', {}, priority='cmdline')
+        super().__init__(spidercls, settings)
+        self.export_items = bool(self.settings.getdict('FEEDS') or self.settings['FEED_URI'])
+        self._workers = []
+        self._stopping = False
+        self._stopped = []
+
+    @defer.inlineCallbacks
+    def crawl(self, *args, **kwargs):
+        if self.crawling:
+            raise RuntimeError("Crawling already taking place")
+        self.crawling = True
+
+        try:
+            self.spider = self._create_spider(*args, **kwargs)
+            context = multiprocessing.get_context('spawn')
+            channel = ShardChannel(self.processes, context)
+            self._workers = [
+                context.Process(target=_run_shard, name='shard-%d' % index, args=(
+                    channel, index, self.spidercls, self.shard_settings,
+                    self.export_items, args, kwargs))
+                for index in range(self.processes)
+            ]
+            for worker in self._workers:
+                worker.start()
+        except Exception:
+            self.crawling = False
+            raise
+
+        logger.info("Started %(processes)d crawl processes",
+                    {'processes': self.processes}, extra={'spider': self.spider})
+        self.stats.open_spider(self.spider)
+        yield self.signals.send_catch_log_deferred(signals.spider_opened, spider=self.spider)
+        results = yield self._collect(channel)
+        stats = merge_stats(results)
+        reasons = [r['finish_reason'] for r in results if 'finish_reason' in r]
+        reason = next((r for r in reasons if r != 'finished'), 'finished')
+        if len(reasons) < len(results):
+            reason = 'shard_failed'
+        stats['finish_reason'] = reason
+        self.stats.set_stats(stats, spider=self.spider)
+        yield self.signals.send_catch_log_deferred(signals.spider_closed,
+                                                   spider=self.spider, reason=reason)
+        self.stats.close_spider(self.spider, reason=reason)
+        self.crawling = False
+        stopped, self._stopped = self._stopped, []
+        for d in stopped:
+            d.callback(None)
+
+    def _collect(self, channel):
+        """Forward the items received from the workers and return a deferred
+        that fires with the list of their stats once they are all finished"""
+        results = {}
+        finished = defer.Deferred()
+
+        def poll():
+            # checked before reading the queue, so that results sent by the
+            # workers before exiting are always read
+            exited = all(worker.exitcode is not None for worker in self._workers)
+            while True:
+                try:
+                    message = channel.results.get_nowait()
+                except Empty:
+                    break
+                if message[0] == 'item':
+                    self.signals.send_catch_log(signals.item_scraped, item=pickle.loads(message[1]),
+                                                response=None, spider=self.spider)
+                else:
+                    results[message[1]] = message[2]
+            if exited:
+                for index, worker in enumerate(self._workers):
+                    if index not in results:
+                        logger.error("Crawl process %(name)s failed (exit code %(exitcode)s)",
+                                     {'name': worker.name, 'exitcode': worker.exitcode},
+                                     extra={'spider': self.spider})
+                        results[index] = {}
+                poller.stop()
+                finished.callback([results[i] for i in range(len(self._workers))])
+
+        poller = task.LoopingCall(poll)
+        poller.start(self.poll_interval)
+        return finished
+
+    def stop(self):
+        """Starts a graceful stop of the worker processes (or kills them, if it
+        has already been started) and returns a deferred that is fired when the
+        crawler is stopped."""
+        if not self.crawling:
+            return defer.succeed(None)
+        for worker in self._workers:
+            if worker.exitcode is None:
+                if self._stopping:
+                    worker.kill()
+                else:
+                    worker.terminate()
+        self._stopping = True
+        d = defer.Deferred()
+        self._stopped.append(d)
+        return d
+
+
+def _run_shard(channel, index, spidercls, settings, export_items, args, kwargs):
+    """Run a worker process of a :class:`ShardedCrawler`"""
+    channel.index = index
+    if settings.get('JOBDIR'):
+        settings.set('JOBDIR', os.path.join(settings['JOBDIR'], 'shard-%d' % index),
+                     priority=settings.getpriority('JOBDIR'))
+    stats = {}
+    try:
+        process = CrawlerProcess(settings)
+        # the main process stops the workers on shutdown signals
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        crawler = process.create_crawler(spidercls)
+        crawler.shard_channel = channel
+        if export_items:
+            def item_scraped(item):
+                try:
+                    message = pickle.dumps(item, protocol=4)
+                except (pickle.PicklingError, AttributeError, TypeError) as e:
+                    logger.error("Unable to serialize item for the feed exports:"
+                                 " %(item)s - reason: %(reason)s",
+                                 {'item': item, 'reason': e}, extra={'spider': crawler.spider})
+                    crawler.stats.inc_value('shard/items_unserializable', spider=crawler.spider)
+                else:
+                    channel.results.put(('item', message))
+            crawler.signals.connect(item_scraped, signals.item_scraped, weak=False)
+        process.crawl(crawler, *args, **kwargs)
+        process.start()
+        stats = crawler.stats.get_stats()
+    finally:
+        channel.close()
+        channel.results.put(('stats', index, stats))
+
+
 class CrawlerRunner:
     """
     这是一个方便的辅助类，它跟踪、管理和运行一个已经设置好的 :mod:`~twisted.internet.reactor` 中的爬虫。
@@ -231,6 +405,8 @@ class CrawlerRunner:
     def _create_crawler(self, spidercls):
         if isinstance(spidercls, str):
             spidercls = self.spider_loader.load(spidercls)
+        if self.settings.getint('CRAWL_PROCESSES') > 1:
+            return ShardedCrawler(spidercls, self.settings)
         return Crawler(spidercls, self.settings)
 
     def stop(self):
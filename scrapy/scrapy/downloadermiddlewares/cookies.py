@@ -1,9 +1,16 @@
+import dbm
 import logging
-from collections import defaultdict
+import os
+import pickle
+import shutil
+import tempfile
+from collections import OrderedDict
 
+from scrapy import signals
 from scrapy.exceptions import NotConfigured
 from scrapy.http import Response
 from scrapy.http.cookies import CookieJar
+from scrapy.utils.project import data_path
 from scrapy.utils.python import to_unicode
 
 
@@ -13,15 +20,25 @@ logger = logging.getLogger(__name__)
 class CookiesMiddleware:
     """This middleware enables working with sites that need cookies"""
 
-    def __init__(self, debug=False):
-        self.jars = defaultdict(CookieJar)
+    def __init__(self, debug=False, max_jars=0, spill_dir=None, stats=None):
+        self.jars = _CookieJars(max_jars, spill_dir, stats)
         self.debug = debug
 
     @classmethod
     def from_crawler(cls, crawler):
-        if not crawler.settings.getbool('COOKIES_ENABLED'):
+        settings = crawler.settings
+        if not settings.getbool('COOKIES_ENABLED'):
             raise NotConfigured
-        return cls(crawler.settings.getbool('COOKIES_DEBUG'))
+        spill_dir = None
+        if settings.get('COOKIES_JARS_DIR'):
+            spill_dir = data_path(settings['COOKIES_JARS_DIR'], createdir=True)
+        o = cls(settings.getbool('COOKIES_DEBUG'), settings.getint('COOKIES_MAX_JARS'),
+                spill_dir, crawler.stats)
+        crawler.signals.connect(o.spider_closed, signal=signals.spider_closed)
+        return o
+
+    def spider_closed(self, spider):
+        self.jars.close()
 
     def process_request(self, request, spider):
         if request.meta.get('dont_merge_cookies', False):
@@ -108,3 +125,84 @@ class CookiesMiddleware:
         formatted = filter(None, (self._format_cookie(c, request) for c in cookies))
         response = Response(request.url, headers={"Set-Cookie": formatted})
         return jar.make_cookies(response, request)
+
+
+class _CookieJars:
+    """Cookie jars by :reqmeta:`cookiejar` key, created on first use.
+
+    If ``max_jars`` is not zero, only the ``max_jars`` most recently used
+    jars are kept in memory. The least recently used one is discarded when
+    a new one is created or, if ``spill_dir`` is set, its cookies are moved
+    to a DBM database in that directory, from which they are restored the
+    next time the jar is used.
+    """
+
+    def __init__(self, max_jars=0, spill_dir=None, stats=None):
+        self.max_jars = max_jars
+        self.stats = stats
+        self._jars = OrderedDict()
+        # keys of the jars in the database; entries of restored jars are not
+        # deleted, as some DBM implementations rewrite their index to do so
+        self._spilled = set()
+        self._spill_dir = self._spill = None
+        if spill_dir:
+            # jars spilled by previous runs are stale, start from scratch
+            self._spill_dir = tempfile.mkdtemp(prefix='cookiejars-', dir=spill_dir)
+            self._spill = dbm.open(os.path.join(self._spill_dir, 'cookiejars'), 'n')
+
+    def __getitem__(self, key):
+        jar = self._jars.get(key)
+        if jar is not None:
+            if self.max_jars:
+                self._jars.move_to_end(key)
+            return jar
+        jar = self._jars[key] = self._restore(key) or CookieJar()
+        if self.max_jars and len(self._jars) > self.max_jars:
+            self._evict()
+        return jar
+
+    def __contains__(self, key):
+        return key in self._jars
+
+    def __len__(self):
+        return len(self._jars)
+
+    def __iter__(self):
+        return iter(self._jars)
+
+    def _evict(self):
+        key, jar = self._jars.popitem(last=False)
+        cookies = list(jar)
+        if not cookies:
+            return
+        if self._spill is not None:
+            dbkey = pickle.dumps(key)
+            self._spill[dbkey] = pickle.dumps(cookies, protocol=4)
+            self._spilled.add(dbkey)
+            self._inc_stats('cookies/jars/spilled')
+        else:
+            self._inc_stats('cookies/jars/evicted')
+
+    def _restore(self, key):
+        if not self._spilled:
+            return None
+        dbkey = pickle.dumps(key)
+        if dbkey not in self._spilled:
+            return None
+        self._spilled.remove(dbkey)
+        jar = CookieJar()
+        for cookie in pickle.loads(self._spill[dbkey]):
+            jar.set_cookie(cookie)
+        self._inc_stats('cookies/jars/restored')
+        return jar
+
+    def _inc_stats(self, key):
+        if self.stats is not None:
+            self.stats.inc_value(key)
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+            self._spilled.clear()
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
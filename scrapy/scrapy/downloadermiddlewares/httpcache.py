@@ -1,5 +1,6 @@
 from email.utils import formatdate
-from typing import Optional, Type, TypeVar
+import logging
+from typing import Optional, Type, TypeVar, Union
 
 from twisted.internet import defer
 from twisted.internet.error import (
@@ -16,14 +17,18 @@ from twisted.web.client import ResponseFailed
 from scrapy import signals
 from scrapy.crawler import Crawler
 from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.extensions.httpcache import ThreadedCacheStorage
 from scrapy.http.request import Request
 from scrapy.http.response import Response
 from scrapy.settings import Settings
 from scrapy.spiders import Spider
 from scrapy.statscollectors import StatsCollector
+from scrapy.utils.log import failure_to_exc_info
 from scrapy.utils.misc import load_object
 
 
+logger = logging.getLogger(__name__)
+
 HttpCacheMiddlewareTV = TypeVar("HttpCacheMiddlewareTV", bound="HttpCacheMiddleware")
 
 
@@ -39,6 +44,9 @@ class HttpCacheMiddleware:
             raise NotConfigured
         self.policy = load_object(settings['HTTPCACHE_POLICY'])(settings)
         self.storage = load_object(settings['HTTPCACHE_STORAGE'])(settings)
+        if settings.getint('HTTPCACHE_THREADS'):
+            self.storage = ThreadedCacheStorage(self.storage, settings.getint('HTTPCACHE_THREADS'),
+                                                settings.getint('HTTPCACHE_WRITE_BATCH_SIZE'))
         self.ignore_missing = settings.getbool('HTTPCACHE_IGNORE_MISSING')
         self.stats = stats
 
@@ -49,13 +57,17 @@ class HttpCacheMiddleware:
         crawler.signals.connect(o.spider_closed, signal=signals.spider_closed)
         return o
 
-    def spider_opened(self, spider: Spider) -> None:
-        self.storage.open_spider(spider)
+    # storage methods may return deferreds
+
+    def spider_opened(self, spider: Spider) -> Optional[defer.Deferred]:
+        return self.storage.open_spider(spider)
 
-    def spider_closed(self, spider: Spider) -> None:
-        self.storage.close_spider(spider)
+    def spider_closed(self, spider: Spider) -> Optional[defer.Deferred]:
+        return self.storage.close_spider(spider)
 
-    def process_request(self, request: Request, spider: Spider) -> Optional[Response]:
+    def process_request(
+        self, request: Request, spider: Spider
+    ) -> Union[Optional[Response], defer.Deferred]:
         if request.meta.get('dont_cache', False):
             return None
 
@@ -66,6 +78,13 @@ class HttpCacheMiddleware:
 
         # Look for cached response and check if expired
         cachedresponse = self.storage.retrieve_response(spider, request)
+        if isinstance(cachedresponse, defer.Deferred):
+            return cachedresponse.addCallback(self._process_cached_response, request, spider)
+        return self._process_cached_response(cachedresponse, request, spider)
+
+    def _process_cached_response(
+        self, cachedresponse: Optional[Response], request: Request, spider: Spider
+    ) -> Optional[Response]:
         if cachedresponse is None:
             self.stats.inc_value('httpcache/miss', spider=spider)
             if self.ignore_missing:
@@ -128,6 +147,13 @@ class HttpCacheMiddleware:
     ) -> None:
         if self.policy.should_cache_response(response, request):
             self.stats.inc_value('httpcache/store', spider=spider)
-            self.storage.store_response(spider, request, response)
+            d = self.storage.store_response(spider, request, response)
+            if isinstance(d, defer.Deferred):
+                # the response is not held back until it is stored
+                d.addErrback(self._log_store_error, request, spider)
         else:
             self.stats.inc_value('httpcache/uncacheable', spider=spider)
+
+    def _log_store_error(self, failure, request: Request, spider: Spider) -> None:
+        logger.error("Error storing %(request)s in the HTTP cache", {'request': request},
+                     exc_info=failure_to_exc_info(failure), extra={'spider': spider})
@@ -25,18 +25,25 @@ except ImportError:
 class HttpCompressionMiddleware:
     """This middleware allows compressed (gzip, deflate) traffic to be
     sent/received from web sites"""
+    def __init__(self, streaming=False):
+        self.streaming = streaming
+
     @classmethod
     def from_crawler(cls, crawler):
         if not crawler.settings.getbool('COMPRESSION_ENABLED'):
             raise NotConfigured
-        return cls()
+        return cls(crawler.settings.getbool('COMPRESSION_STREAMING'))
 
     def process_request(self, request, spider):
         request.headers.setdefault('Accept-Encoding',
                                    b", ".join(ACCEPTED_ENCODINGS))
+        if self.streaming:
+            # let download handlers decode gzip and deflate bodies as they are
+            # received, see scrapy.core.downloader.handlers.http11
+            request.meta['_decompress_body'] = True
 
     def process_response(self, request, response, spider):
-
+        request.meta.pop('_decompress_body', None)
         if request.method == 'HEAD':
             return response
         if isinstance(response, Response):
@@ -58,6 +65,9 @@ class HttpCompressionMiddleware:
 
         return response
 
+    def process_exception(self, request, exception, spider):
+        request.meta.pop('_decompress_body', None)
+
     def _decode(self, body, encoding):
         if encoding == b'gzip' or encoding == b'x-gzip':
             body = gunzip(body)
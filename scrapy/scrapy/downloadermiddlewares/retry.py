@@ -5,11 +5,14 @@ problems such as a connection timeout or HTTP 500 error.
 You can change the behaviour of this middleware by modifing the scraping settings:
 RETRY_TIMES - how many times to retry a failed page
 RETRY_HTTP_CODES - which HTTP response codes to retry
+RETRY_BACKOFF_BASE - delay before the first retry, doubled on every retry
+RETRY_BACKOFF_MAX - maximum delay before a retry
 
 Failed pages are collected on the scraping process and rescheduled at the end,
 once the spider has finished crawling all regular (non failed) pages.
 """
 import logging
+from time import time
 
 from twisted.internet import defer
 from twisted.internet.error import (
@@ -46,6 +49,8 @@ class RetryMiddleware:
         self.max_retry_times = settings.getint('RETRY_TIMES')
         self.retry_http_codes = set(int(x) for x in settings.getlist('RETRY_HTTP_CODES'))
         self.priority_adjust = settings.getint('RETRY_PRIORITY_ADJUST')
+        self.backoff_base = settings.getfloat('RETRY_BACKOFF_BASE')
+        self.backoff_max = settings.getfloat('RETRY_BACKOFF_MAX')
 
     @classmethod
     def from_crawler(cls, crawler):
@@ -56,7 +61,7 @@ class RetryMiddleware:
             return response
         if response.status in self.retry_http_codes:
             reason = response_status_message(response.status)
-            return self._retry(request, reason, spider) or response
+            return self._retry(request, reason, spider, response) or response
         return response
 
     def process_exception(self, request, exception, spider):
@@ -66,7 +71,17 @@ class RetryMiddleware:
         ):
             return self._retry(request, exception, spider)
 
-    def _retry(self, request, reason, spider):
+    def _backoff(self, retries, response=None):
+        """Return the delay, in seconds, before the retry number ``retries``"""
+        delay = self.backoff_base * 2 ** (retries - 1)
+        if response is not None and b'Retry-After' in response.headers:
+            try:
+                delay = max(delay, float(response.headers[b'Retry-After']))
+            except ValueError:  # an HTTP date, not supported
+                pass
+        return min(delay, self.backoff_max)
+
+    def _retry(self, request, reason, spider, response=None):
         retries = request.meta.get('retry_times', 0) + 1
 
         retry_times = self.max_retry_times
@@ -83,6 +98,10 @@ class RetryMiddleware:
             retryreq.meta['retry_times'] = retries
             retryreq.dont_filter = True
             retryreq.priority = request.priority + self.priority_adjust
+            if self.backoff_base > 0:
+                # the scheduler keeps the request until then, without
+                # holding a download slot
+                retryreq.meta['not_before'] = time() + self._backoff(retries, response)
 
             if isinstance(reason, Exception):
                 reason = global_object_name(reason.__class__)
@@ -4,14 +4,21 @@ enable this middleware and enable the ROBOTSTXT_OBEY setting.
 
 """
 
+import dbm
 import logging
+import os
+import pickle
+from collections import OrderedDict
+from time import time
 
 from twisted.internet.defer import Deferred, maybeDeferred
+from scrapy import signals
 from scrapy.exceptions import NotConfigured, IgnoreRequest
 from scrapy.http import Request
 from scrapy.utils.httpobj import urlparse_cached
 from scrapy.utils.log import failure_to_exc_info
 from scrapy.utils.misc import load_object
+from scrapy.utils.project import data_path
 
 logger = logging.getLogger(__name__)
 
@@ -25,12 +32,24 @@ class RobotsTxtMiddleware:
         self._default_useragent = crawler.settings.get('USER_AGENT', 'Scrapy')
         self._robotstxt_useragent = crawler.settings.get('ROBOTSTXT_USER_AGENT', None)
         self.crawler = crawler
-        self._parsers = {}
+        # parsers (or None, if robots.txt could not be downloaded) by netloc,
+        # least recently used first
+        self._parsers = OrderedDict()
+        # deferreds of the robots.txt files being downloaded, by netloc
+        self._pending = {}
+        self._cache_size = crawler.settings.getint('ROBOTSTXT_CACHE_SIZE')
+        self._expiration_secs = crawler.settings.getint('ROBOTSTXT_CACHE_EXPIRATION_SECS')
         self._parserimpl = load_object(crawler.settings.get('ROBOTSTXT_PARSER'))
 
         # check if parser dependencies are met, this should throw an error otherwise.
         self._parserimpl.from_crawler(self.crawler, b'')
 
+        self._store = None
+        if crawler.settings.get('ROBOTSTXT_CACHE_DIR'):
+            cachedir = data_path(crawler.settings['ROBOTSTXT_CACHE_DIR'], createdir=True)
+            self._store = dbm.open(os.path.join(cachedir, 'robotstxt.db'), 'c')
+            crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+
     @classmethod
     def from_crawler(cls, crawler):
         return cls(crawler)
@@ -59,8 +78,22 @@ class RobotsTxtMiddleware:
         url = urlparse_cached(request)
         netloc = url.netloc
 
-        if netloc not in self._parsers:
-            self._parsers[netloc] = Deferred()
+        if netloc in self._parsers:
+            self.crawler.stats.inc_value('robotstxt/cache/hit')
+            self._parsers.move_to_end(netloc)
+            return self._parsers[netloc]
+
+        if netloc in self._pending:
+            self.crawler.stats.inc_value('robotstxt/cache/hit')
+        else:
+            self.crawler.stats.inc_value('robotstxt/cache/miss')
+            body = self._load(netloc)
+            if body is not None:
+                self.crawler.stats.inc_value('robotstxt/cache/store_hit')
+                rp = self._parserimpl.from_crawler(self.crawler, body)
+                self._cache(netloc, rp)
+                return rp
+            self._pending[netloc] = Deferred()
             robotsurl = f"{url.scheme}://{url.netloc}/robots.txt"
             robotsreq = Request(
                 robotsurl,
@@ -73,16 +106,40 @@ class RobotsTxtMiddleware:
             dfd.addErrback(self._robots_error, netloc)
             self.crawler.stats.inc_value('robotstxt/request_count')
 
-        if isinstance(self._parsers[netloc], Deferred):
+        if netloc in self._pending:
             d = Deferred()
 
             def cb(result):
                 d.callback(result)
                 return result
-            self._parsers[netloc].addCallback(cb)
+            self._pending[netloc].addCallback(cb)
             return d
         else:
-            return self._parsers[netloc]
+            return self._parsers.get(netloc)
+
+    def _cache(self, netloc, rp):
+        self._parsers[netloc] = rp
+        if self._cache_size and len(self._parsers) > self._cache_size:
+            self._parsers.popitem(last=False)
+            self.crawler.stats.inc_value('robotstxt/cache/eviction')
+
+    def _load(self, netloc):
+        """Return the stored robots.txt body of netloc, or None if it is not
+        stored or has expired"""
+        if self._store is None:
+            return None
+        data = self._store.get(netloc)
+        if data is None:
+            return None
+        timestamp, body = pickle.loads(data)
+        if 0 < self._expiration_secs < time() - timestamp:
+            return None
+        return body
+
+    def _save(self, netloc, response):
+        # server errors are temporary, and not worth keeping between runs
+        if self._store is not None and response.status < 500:
+            self._store[netloc] = pickle.dumps((time(), bytes(response.body)), protocol=4)
 
     def _logerror(self, failure, request, spider):
         if failure.type is not IgnoreRequest:
@@ -96,14 +153,16 @@ class RobotsTxtMiddleware:
         self.crawler.stats.inc_value('robotstxt/response_count')
         self.crawler.stats.inc_value(f'robotstxt/response_status_count/{response.status}')
         rp = self._parserimpl.from_crawler(self.crawler, response.body)
-        rp_dfd = self._parsers[netloc]
-        self._parsers[netloc] = rp
-        rp_dfd.callback(rp)
+        self._save(netloc, response)
+        self._cache(netloc, rp)
+        self._pending.pop(netloc).callback(rp)
 
     def _robots_error(self, failure, netloc):
         if failure.type is not IgnoreRequest:
             key = f'robotstxt/exception_count/{failure.type}'
             self.crawler.stats.inc_value(key)
-        rp_dfd = self._parsers[netloc]
-        self._parsers[netloc] = None
-        rp_dfd.callback(None)
+        self._cache(netloc, None)
+        self._pending.pop(netloc).callback(None)
+
+    def spider_closed(self, spider):
+        self._store.close()
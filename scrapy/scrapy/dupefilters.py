@@ -1,10 +1,240 @@
 import os
 import logging
+import mmap
+from collections import defaultdict
 
+from scrapy.utils.bloom import ScalableBloomFilter
 from scrapy.utils.job import job_dir
+from scrapy.utils.misc import load_object
 from scrapy.utils.request import referer_str, request_fingerprint
 
 
+def _to_digest(fp):
+    """Return the raw digest bytes of a fingerprint given either as raw bytes
+    or as a hexadecimal string (as returned by ``request_fingerprint``)"""
+    if isinstance(fp, str):
+        return bytes.fromhex(fp)
+    return bytes(fp)
+
+
+def _bisect_records(data, record, size, lo=0):
+    """Return the index where ``record`` would be inserted in ``data``, a sorted
+    buffer of fixed-size records, to keep it sorted"""
+    hi = len(data) // size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if data[mid * size:(mid + 1) * size] < record:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class MemoryFingerprintStore:
+    """Compact, exact fingerprint store.
+
+    Fingerprints are kept as raw digests (20 bytes for SHA1) in sorted
+    buffers, partitioned by the first byte of the digest. Recently added
+    fingerprints are kept in a small per-partition set which is merged into
+    the sorted buffer once it grows over ``1 / merge_ratio`` of the partition
+    size (and at least ``min_pending`` entries), so that memory usage stays
+    close to the size of the raw digests while insertions remain amortized
+    cheap.
+    """
+
+    partitions = 256
+
+    def __init__(self, digest_size=20, min_pending=1024, merge_ratio=8):
+        self.digest_size = digest_size
+        self.min_pending = min_pending
+        self.merge_ratio = merge_ratio
+        self.buckets = [b''] * self.partitions
+        self.pending = defaultdict(set)
+        self._len = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(min_pending=settings.getint('DUPEFILTER_STORAGE_MIN_PENDING'),
+                   merge_ratio=settings.getint('DUPEFILTER_STORAGE_MERGE_RATIO'))
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, fp):
+        return self._contains(_to_digest(fp))
+
+    def _contains(self, digest):
+        index = digest[0]
+        if digest in self.pending[index]:
+            return True
+        data = self.buckets[index]
+        pos = _bisect_records(data, digest, self.digest_size) * self.digest_size
+        return data[pos:pos + self.digest_size] == digest
+
+    def add(self, fp):
+        """Add a fingerprint to the store. Return ``True`` if it was not
+        already present."""
+        digest = _to_digest(fp)
+        if self._contains(digest):
+            return False
+        self._add(digest)
+        return True
+
+    def _add(self, digest):
+        index = digest[0]
+        pending = self.pending[index]
+        pending.add(digest)
+        self._len += 1
+        threshold = len(self.buckets[index]) // self.digest_size // self.merge_ratio
+        if len(pending) >= max(self.min_pending, threshold):
+            self._merge(index)
+
+    def contains_many(self, fps):
+        """Return a list of booleans telling, for each of the given
+        fingerprints, whether it is present in the store.
+
+        Lookups are grouped by partition and performed in sorted order, so
+        that each binary search narrows down the next one."""
+        digests = [_to_digest(fp) for fp in fps]
+        result = [False] * len(digests)
+        order = sorted(range(len(digests)), key=digests.__getitem__)
+        size = self.digest_size
+        lo, last_index = 0, None
+        for i in order:
+            digest = digests[i]
+            index = digest[0]
+            if index != last_index:
+                lo, last_index = 0, index
+            if digest in self.pending[index]:
+                result[i] = True
+                continue
+            data = self.buckets[index]
+            lo = _bisect_records(data, digest, size, lo)
+            result[i] = data[lo * size:(lo + 1) * size] == digest
+        return result
+
+    def update(self, fps):
+        """Add all the given fingerprints. Return the number of fingerprints
+        that were not already present."""
+        added = 0
+        for fp in fps:
+            added += self.add(fp)
+        return added
+
+    def _merged_parts(self, index):
+        """Yield the chunks of the partition ``index`` with its pending
+        fingerprints merged in, in sorted order"""
+        data = self.buckets[index]
+        size = self.digest_size
+        prev = lo = 0
+        for digest in sorted(self.pending[index]):
+            lo = _bisect_records(data, digest, size, lo)
+            yield data[prev * size:lo * size]
+            yield digest
+            prev = lo
+        yield data[prev * size:]
+
+    def _merge(self, index):
+        self.buckets[index] = b''.join(self._merged_parts(index))
+        self.pending[index].clear()
+
+    def close(self):
+        pass
+
+
+class DiskFingerprintStore(MemoryFingerprintStore):
+    """Fingerprint store persisted in a directory (usually inside
+    :setting:`JOBDIR`).
+
+    Each partition is stored in its own file of sorted raw digests, which is
+    memory-mapped, so opening the store does not depend on the number of
+    fingerprints it holds. Fingerprints not yet merged into their partition
+    file are appended to a journal as they are added, which is only replayed
+    if the store was not closed properly.
+    """
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._pending_count = 0
+        if not os.path.exists(path):
+            os.makedirs(path)
+        self._mmaps = {}
+        for index in range(self.partitions):
+            self._load(index)
+        # unbuffered, so that every added fingerprint survives a crash
+        self.journal = open(os.path.join(path, 'journal'), 'a+b', buffering=0)
+        self.journal.seek(0)
+        data = self.journal.readall()
+        size = self.digest_size
+        for offset in range(0, len(data) - size + 1, size):
+            digest = data[offset:offset + size]
+            if not self._contains(digest):
+                self._pending_count += 1
+                MemoryFingerprintStore._add(self, digest)
+        self.journal.seek(0, os.SEEK_END)
+
+    @classmethod
+    def from_settings(cls, settings):
+        path = job_dir(settings)
+        if not path:
+            return MemoryFingerprintStore.from_settings(settings)
+        return cls(os.path.join(path, 'fingerprints'),
+                   min_pending=settings.getint('DUPEFILTER_STORAGE_MIN_PENDING'),
+                   merge_ratio=settings.getint('DUPEFILTER_STORAGE_MERGE_RATIO'))
+
+    def _partition_path(self, index):
+        return os.path.join(self.path, '%02x' % index)
+
+    def _load(self, index):
+        path = self._partition_path(index)
+        if not os.path.exists(path) or not os.path.getsize(path):
+            return
+        with open(path, 'rb') as f:
+            self._mmaps[index] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buckets[index] = self._mmaps[index]
+        self._len += len(self._mmaps[index]) // self.digest_size
+
+    def _add(self, digest):
+        self.journal.write(digest)
+        self._pending_count += 1
+        super()._add(digest)
+
+    def _merge(self, index):
+        path = self._partition_path(index)
+        with open(path + '.tmp', 'wb') as f:
+            for part in self._merged_parts(index):
+                f.write(part)
+        self._len -= len(self.buckets[index]) // self.digest_size + len(self.pending[index])
+        self._pending_count -= len(self.pending[index])
+        self.pending[index].clear()
+        self.buckets[index] = b''
+        old = self._mmaps.pop(index, None)
+        if old is not None:
+            old.close()
+        os.replace(path + '.tmp', path)
+        self._load(index)
+        if self.journal.tell() > 4 * self.digest_size * (self._pending_count + self.min_pending):
+            self._rewrite_journal()
+
+    def _rewrite_journal(self):
+        """Drop from the journal the fingerprints already merged into their
+        partition files"""
+        self.journal.seek(0)
+        self.journal.truncate()
+        self.journal.write(b''.join(b''.join(pending) for pending in self.pending.values()))
+
+    def close(self):
+        for index in range(self.partitions):
+            if self.pending[index]:
+                self._merge(index)
+        self.journal.truncate(0)
+        self.journal.close()
+        for m in self._mmaps.values():
+            m.close()
+        self._mmaps.clear()
+
+
 class BaseDupeFilter:
 
     @classmethod
@@ -27,12 +257,16 @@ class BaseDupeFilter:
 class RFPDupeFilter(BaseDupeFilter):
     """Request Fingerprint duplicates filter"""
 
-    def __init__(self, path=None, debug=False):
+    def __init__(self, path=None, debug=False, store=None):
         self.file = None
-        self.fingerprints = set()
+        self.store = store
         self.logdupes = True
         self.debug = debug
         self.logger = logging.getLogger(__name__)
+        if store is not None:
+            self.fingerprints = store
+            return
+        self.fingerprints = set()
         if path:
             self.file = open(os.path.join(path, 'requests.seen'), 'a+')
             self.file.seek(0)
@@ -41,7 +275,11 @@ class RFPDupeFilter(BaseDupeFilter):
     @classmethod
     def from_settings(cls, settings):
         debug = settings.getbool('DUPEFILTER_DEBUG')
-        return cls(job_dir(settings), debug)
+        store = None
+        if settings.get('DUPEFILTER_STORAGE'):
+            storecls = load_object(settings['DUPEFILTER_STORAGE'])
+            store = storecls.from_settings(settings)
+        return cls(job_dir(settings), debug, store=store)
 
     def request_seen(self, request):
         fp = self.request_fingerprint(request)
@@ -57,6 +295,8 @@ class RFPDupeFilter(BaseDupeFilter):
     def close(self, reason):
         if self.file:
             self.file.close()
+        if self.store is not None:
+            self.store.close()
 
     def log(self, request, spider):
         if self.debug:
@@ -71,3 +311,59 @@ class RFPDupeFilter(BaseDupeFilter):
             self.logdupes = False
 
         spider.crawler.stats.inc_value('dupefilter/filtered', spider=spider)
+
+
+class BloomDupeFilter(RFPDupeFilter):
+    """Request Fingerprint duplicates filter backed by a scalable Bloom filter.
+
+    It uses a fixed amount of memory for a given number of requests, at the
+    cost of wrongly filtering a small, configurable, fraction of new requests
+    (see :setting:`DUPEFILTER_BLOOM_ERROR_RATE`). If :setting:`JOBDIR` is set,
+    the bit arrays are memory-mapped from a ``requests.bloom`` directory inside
+    it.
+    """
+
+    stats_interval = 1000
+
+    def __init__(self, path=None, debug=False, capacity=1000000,
+                 error_rate=0.001, scalable=True, stats=None):
+        if path:
+            path = os.path.join(path, 'requests.bloom')
+        store = ScalableBloomFilter(capacity, error_rate, path, scalable)
+        super().__init__(debug=debug, store=store)
+        self.stats = stats
+
+    @classmethod
+    def from_settings(cls, settings, stats=None):
+        return cls(job_dir(settings),
+                   debug=settings.getbool('DUPEFILTER_DEBUG'),
+                   capacity=settings.getint('DUPEFILTER_BLOOM_CAPACITY'),
+                   error_rate=settings.getfloat('DUPEFILTER_BLOOM_ERROR_RATE'),
+                   scalable=settings.getbool('DUPEFILTER_BLOOM_SCALABLE'),
+                   stats=stats)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls.from_settings(crawler.settings, stats=crawler.stats)
+
+    def request_seen(self, request):
+        fp = self.request_fingerprint(request)
+        if not self.fingerprints.add(fp):
+            return True
+        if len(self.fingerprints) % self.stats_interval == 0:
+            self._update_stats()
+
+    def _update_stats(self):
+        if self.stats is None:
+            return
+        bloom = self.fingerprints
+        self.stats.set_value('dupefilter/bloom/count', len(bloom))
+        self.stats.set_value('dupefilter/bloom/filters', len(bloom.filters))
+        self.stats.set_value('dupefilter/bloom/bytes', bloom.nbytes)
+        self.stats.set_value('dupefilter/bloom/fill_ratio', bloom.fill_ratio)
+        self.stats.set_value('dupefilter/bloom/estimated_error_rate',
+                             bloom.estimated_error_rate)
+
+    def close(self, reason):
+        self._update_stats()
+        super().close(reason)
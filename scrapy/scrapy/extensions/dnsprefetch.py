@@ -0,0 +1,73 @@
+"""
+DnsPrefetch extension
+
+Resolves the hostnames of scheduled requests before they are downloaded.
+
+See documentation in docs/topics/extensions.rst
+"""
+import ipaddress
+from collections import deque
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.resolver import CachingThreadedResolver, dnscache
+from scrapy.utils.httpobj import urlparse_cached
+
+
+class DnsPrefetch:
+
+    def __init__(self, crawler):
+        if not crawler.settings.getbool('DNS_PREFETCH_ENABLED') or \
+                not crawler.settings.getbool('DNSCACHE_ENABLED'):
+            raise NotConfigured
+        self.concurrency = crawler.settings.getint('DNS_PREFETCH_CONCURRENCY')
+        # prefetching more names than the cache holds would evict them
+        self.max_queued = crawler.settings.getint('DNSCACHE_SIZE')
+        self.queue = deque()
+        self.queued = set()
+        self.active = 0
+        crawler.signals.connect(self.request_scheduled, signal=signals.request_scheduled)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def request_scheduled(self, request, spider):
+        if 'proxy' in request.meta:
+            return
+        hostname = urlparse_cached(request).hostname
+        if not hostname or hostname in self.queued or hostname in dnscache:
+            return
+        if len(self.queued) >= self.max_queued or _is_ip_address(hostname):
+            return
+        self.queue.append(hostname)
+        self.queued.add(hostname)
+        self._prefetch()
+
+    def _prefetch(self):
+        from twisted.internet import reactor
+        resolver = reactor.resolver
+        if not isinstance(resolver, CachingThreadedResolver):
+            self.queue.clear()
+            self.queued.clear()
+            return
+        while self.queue and self.active < self.concurrency:
+            hostname = self.queue.popleft()
+            self.queued.discard(hostname)
+            d = resolver.prefetch(hostname)
+            if d is not None:
+                self.active += 1
+                d.addBoth(self._prefetched)
+
+    def _prefetched(self, result):
+        # lookup errors are cached by the resolver, and ignored here
+        self.active -= 1
+        self._prefetch()
+
+
+def _is_ip_address(hostname):
+    try:
+        ipaddress.ip_address(hostname)
+    except ValueError:
+        return False
+    return True
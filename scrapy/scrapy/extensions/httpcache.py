@@ -1,12 +1,18 @@
 import gzip
 import logging
+import mmap
 import os
 import pickle
+import struct
+import threading
+from collections import OrderedDict
 from email.utils import mktime_tz, parsedate_tz
 from importlib import import_module
 from time import time
 from weakref import WeakKeyDictionary
 
+from twisted.internet import defer, threads
+from twisted.python.threadpool import ThreadPool
 from w3lib.http import headers_raw_to_dict, headers_dict_to_raw
 
 from scrapy.http import Headers, Response
@@ -249,7 +255,7 @@ class DbmCacheStorage:
             'status': response.status,
             'url': response.url,
             'headers': dict(response.headers),
-            'body': response.body,
+            'body': bytes(response.body),  # may be an mmap, see DOWNLOAD_SPILLSIZE
         }
         self.db[f'{key}_data'] = pickle.dumps(data, protocol=4)
         self.db[f'{key}_time'] = str(time())
@@ -273,6 +279,9 @@ class DbmCacheStorage:
 
 class FilesystemCacheStorage:
 
+    # each response is stored in its own directory
+    thread_safe = True
+
     def __init__(self, settings):
         self.cachedir = data_path(settings['HTTPCACHE_DIR'])
         self.expiration_secs = settings.getint('HTTPCACHE_EXPIRATION_SECS')
@@ -306,8 +315,7 @@ class FilesystemCacheStorage:
     def store_response(self, spider, request, response):
         """Store the given response in the cache."""
         rpath = self._get_request_path(spider, request)
-        if not os.path.exists(rpath):
-            os.makedirs(rpath)
+        os.makedirs(rpath, exist_ok=True)
         metadata = {
             'url': request.url,
             'method': request.method,
@@ -344,6 +352,224 @@ class FilesystemCacheStorage:
             return pickle.load(f)
 
 
+class SegmentCacheStorage:
+    """Log-structured storage: responses are appended to large segment files,
+    and an in-memory index maps request fingerprints to the location of their
+    latest record. Segment files are memory-mapped for reading. Stale records
+    (overwritten or expired) are removed by :meth:`compact`.
+    """
+
+    # fingerprint, timestamp, status, url length, headers length, body length
+    record_header = struct.Struct('>20sdHIII')
+    # active segment, indexed size of the active segment
+    index_header = struct.Struct('>II')
+    # fingerprint, segment, offset, record size
+    index_entry = struct.Struct('>20sIII')
+    max_open_segments = 64
+
+    def __init__(self, settings):
+        self.cachedir = data_path(settings['HTTPCACHE_DIR'], createdir=True)
+        self.expiration_secs = settings.getint('HTTPCACHE_EXPIRATION_SECS')
+        self.segment_size = settings.getint('HTTPCACHE_SEGMENT_SIZE')
+        if not 0 < self.segment_size < 2 ** 32:
+            raise ValueError(f"Invalid HTTPCACHE_SEGMENT_SIZE: {self.segment_size}")
+        self.compact_ratio = settings.getfloat('HTTPCACHE_SEGMENT_COMPACT_RATIO')
+        self.path = None
+
+    def open_spider(self, spider):
+        self.path = os.path.join(self.cachedir, spider.name)
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        # fingerprint -> segment << 64 | offset << 32 | record size
+        self.index = {}
+        self.live_bytes = {}  # segment -> size of its indexed records
+        self.segment_sizes = {}  # segment -> file size
+        self._maps = OrderedDict()  # segment -> (mapped size, mmap)
+        self._segment = None
+        self._writer = None
+        self._dirty = False
+        self._load()
+        logger.debug("Using segment cache storage in %(cachepath)s" % {'cachepath': self.path},
+                     extra={'spider': spider})
+
+    def close_spider(self, spider):
+        total = sum(self.segment_sizes.values())
+        if total and self.compact_ratio and \
+                1 - sum(self.live_bytes.values()) / total >= self.compact_ratio:
+            self.compact()
+        self._close_segments()
+        self._write_index()
+
+    def retrieve_response(self, spider, request):
+        """Return response if present in cache, or None otherwise."""
+        key = bytes.fromhex(request_fingerprint(request))
+        location = self.index.get(key)
+        if location is None:
+            return  # not cached
+        segment, offset, size = location >> 64, (location >> 32) & 0xffffffff, location & 0xffffffff
+        data = self._map(segment, offset + size)
+        _, timestamp, status, url_len, headers_len, body_len = \
+            self.record_header.unpack_from(data, offset)
+        if 0 < self.expiration_secs < time() - timestamp:
+            self._discard(key)
+            return  # expired
+        start = offset + self.record_header.size
+        url = to_unicode(data[start:start + url_len])
+        start += url_len
+        headers = Headers(headers_raw_to_dict(data[start:start + headers_len]))
+        start += headers_len
+        body = data[start:start + body_len]
+        respcls = responsetypes.from_args(headers=headers, url=url)
+        return respcls(url=url, headers=headers, status=status, body=body)
+
+    def store_response(self, spider, request, response):
+        """Store the given response in the cache."""
+        key = bytes.fromhex(request_fingerprint(request))
+        url = to_bytes(response.url)
+        headers = headers_dict_to_raw(response.headers)
+        body = response.body
+        header = self.record_header.pack(key, time(), response.status,
+                                         len(url), len(headers), len(body))
+        self._append(key, b''.join((header, url, headers, body)))
+
+    def compact(self):
+        """Rewrite the live records of all segments into new segments,
+        dropping overwritten and expired records."""
+        old_segments = sorted(self.segment_sizes)
+        self._open_segment(old_segments[-1] + 1 if old_segments else 0)
+        by_segment = {}
+        for key, location in self.index.items():
+            by_segment.setdefault(location >> 64, []).append((location, key))
+        now = time()
+        for segment in old_segments:
+            for location, key in sorted(by_segment.get(segment, ())):
+                offset, size = (location >> 32) & 0xffffffff, location & 0xffffffff
+                data = self._map(segment, offset + size)
+                timestamp = self.record_header.unpack_from(data, offset)[1]
+                if 0 < self.expiration_secs < now - timestamp:
+                    self._discard(key)
+                else:
+                    self._append(key, data[offset:offset + size])
+        # new records must be on disk before the old segments are removed
+        self._writer.flush()
+        os.fsync(self._writer.fileno())
+        self._write_index()
+        for segment in old_segments:
+            self._unmap(segment)
+            os.remove(self._segment_path(segment))
+            del self.segment_sizes[segment]
+            self.live_bytes.pop(segment, None)
+
+    def _segment_path(self, segment):
+        return os.path.join(self.path, f'segment-{segment:06d}')
+
+    def _load(self):
+        segments = sorted(int(name[len('segment-'):]) for name in os.listdir(self.path)
+                          if name.startswith('segment-'))
+        for segment in segments:
+            self.segment_sizes[segment] = os.path.getsize(self._segment_path(segment))
+        active, indexed_size = -1, 0
+        index_path = os.path.join(self.path, 'index')
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as f:
+                data = f.read()
+            active, indexed_size = self.index_header.unpack_from(data)
+            for key, segment, offset, size in self.index_entry.iter_unpack(
+                    memoryview(data)[self.index_header.size:]):
+                if segment in self.segment_sizes:
+                    self._set_location(key, segment, offset, size)
+        # records appended after the index was saved
+        for segment in segments:
+            if segment >= active:
+                self._scan(segment, indexed_size if segment == active else 0)
+        self._open_segment(segments[-1] if segments else 0)
+
+    def _scan(self, segment, offset):
+        end = self.segment_sizes[segment]
+        data = self._map(segment, end) if end else b''
+        header_size = self.record_header.size
+        while offset + header_size <= end:
+            key, _, _, url_len, headers_len, body_len = \
+                self.record_header.unpack_from(data, offset)
+            size = header_size + url_len + headers_len + body_len
+            if offset + size > end:
+                break
+            self._set_location(key, segment, offset, size)
+            offset += size
+        if offset < end:  # incomplete record
+            self._unmap(segment)
+            os.truncate(self._segment_path(segment), offset)
+            self.segment_sizes[segment] = offset
+
+    def _write_index(self):
+        index_path = os.path.join(self.path, 'index')
+        entry = self.index_entry
+        with open(index_path + '.tmp', 'wb') as f:
+            f.write(self.index_header.pack(self._segment, self.segment_sizes[self._segment]))
+            f.write(b''.join(
+                entry.pack(key, location >> 64, (location >> 32) & 0xffffffff,
+                           location & 0xffffffff)
+                for key, location in self.index.items()))
+        os.replace(index_path + '.tmp', index_path)
+
+    def _set_location(self, key, segment, offset, size):
+        self._discard(key)
+        self.index[key] = segment << 64 | offset << 32 | size
+        self.live_bytes[segment] = self.live_bytes.get(segment, 0) + size
+
+    def _discard(self, key):
+        location = self.index.pop(key, None)
+        if location is not None:
+            self.live_bytes[location >> 64] -= location & 0xffffffff
+
+    def _open_segment(self, segment):
+        if self._writer is not None:
+            self._writer.close()
+        self._segment = segment
+        self._writer = open(self._segment_path(segment), 'ab')
+        self.segment_sizes.setdefault(segment, 0)
+        self._dirty = False
+
+    def _append(self, key, record):
+        offset = self.segment_sizes[self._segment]
+        if offset and offset + len(record) > self.segment_size:
+            self._open_segment(self._segment + 1)
+            offset = 0
+        self._writer.write(record)
+        self._dirty = True
+        self.segment_sizes[self._segment] = offset + len(record)
+        self._set_location(key, self._segment, offset, len(record))
+
+    def _map(self, segment, size):
+        """Return a memory map of ``segment`` covering at least ``size``
+        bytes."""
+        if segment == self._segment and self._dirty:
+            self._writer.flush()
+            self._dirty = False
+        mapped = self._maps.get(segment)
+        if mapped is not None and mapped[0] >= size:
+            self._maps.move_to_end(segment)
+            return mapped[1]
+        self._unmap(segment)
+        file_size = self.segment_sizes[segment]
+        with open(self._segment_path(segment), 'rb') as f:
+            data = mmap.mmap(f.fileno(), file_size, access=mmap.ACCESS_READ)
+        self._maps[segment] = (file_size, data)
+        if len(self._maps) > self.max_open_segments:
+            self._unmap(next(iter(self._maps)))
+        return data
+
+    def _unmap(self, segment):
+        mapped = self._maps.pop(segment, None)
+        if mapped is not None:
+            mapped[1].close()
+
+    def _close_segments(self):
+        for segment in list(self._maps):
+            self._unmap(segment)
+        self._writer.close()
+
+
 def parse_cachecontrol(header):
     """Parse Cache-Control header
 
@@ -370,3 +596,115 @@ def rfc1123_to_epoch(date_str):
         return mktime_tz(parsedate_tz(date_str))
     except Exception:
         return None
+
+
+class ThreadedCacheStorage:
+    """Wrapper running the methods of another cache storage in a thread pool,
+    so that cache I/O does not block the reactor thread.
+
+    :meth:`retrieve_response` returns a deferred, and lookups run in
+    parallel when the wrapped storage has a true ``thread_safe`` attribute;
+    otherwise calls to the wrapped storage are serialized by a lock, but
+    still run out of the reactor thread.
+
+    Stored responses are written behind: :meth:`store_response` returns right
+    away, and the responses stored during a reactor iteration are written by
+    a single thread pool job, or by several jobs of ``batch_size``
+    responses. Until they are written, they are returned by
+    :meth:`retrieve_response` from memory.
+    """
+
+    def __init__(self, storage, threads=4, batch_size=100):
+        from twisted.internet import reactor
+        self.reactor = reactor
+        self.storage = storage
+        self.batch_size = batch_size
+        self.threadpool = ThreadPool(minthreads=0, maxthreads=threads,
+                                     name='HttpCacheStorage')
+        self._lock = None if getattr(storage, 'thread_safe', False) else threading.Lock()
+        # fingerprint -> (request, response) of the responses to write
+        self._pending = OrderedDict()
+        # fingerprint -> response of the responses being written
+        self._writing = {}
+        self._flush_call = None
+        self._jobs = set()
+        self._shutdown_trigger = None
+
+    def _call(self, func, *args):
+        if self._lock is None:
+            return func(*args)
+        with self._lock:
+            return func(*args)
+
+    def _defer(self, func, *args):
+        d = threads.deferToThreadPool(self.reactor, self.threadpool, self._call, func, *args)
+        self._jobs.add(d)
+
+        def done(result):
+            self._jobs.discard(d)
+            return result
+        return d.addBoth(done)
+
+    def open_spider(self, spider):
+        self.threadpool.start()
+        self._shutdown_trigger = self.reactor.addSystemEventTrigger(
+            'during', 'shutdown', self.threadpool.stop)
+        return self._defer(self.storage.open_spider, spider)
+
+    @defer.inlineCallbacks
+    def close_spider(self, spider):
+        self._flush(spider)
+        while self._jobs:
+            yield defer.DeferredList(list(self._jobs))
+        try:
+            yield self._defer(self.storage.close_spider, spider)
+        finally:
+            self.reactor.removeSystemEventTrigger(self._shutdown_trigger)
+            self.threadpool.stop()
+
+    def retrieve_response(self, spider, request):
+        # computed here, as the fingerprint cache is not thread safe
+        key = request_fingerprint(request)
+        entry = self._pending.get(key)
+        if entry is not None:
+            return defer.succeed(entry[1].replace())
+        response = self._writing.get(key)
+        if response is not None:
+            return defer.succeed(response.replace())
+        return self._defer(self.storage.retrieve_response, spider, request)
+
+    def store_response(self, spider, request, response):
+        key = request_fingerprint(request)
+        self._pending.pop(key, None)
+        self._pending[key] = (request, response)
+        if len(self._pending) >= self.batch_size:
+            self._flush(spider)
+        elif self._flush_call is None:
+            self._flush_call = self.reactor.callLater(0, self._flush, spider)
+
+    def _flush(self, spider):
+        if self._flush_call is not None:
+            if self._flush_call.active():
+                self._flush_call.cancel()
+            self._flush_call = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, OrderedDict()
+        for key, (request, response) in batch.items():
+            self._writing[key] = response
+        d = self._defer(self._write, spider, list(batch.values()))
+        d.addBoth(self._written, batch)
+
+    def _write(self, spider, batch):
+        for request, response in batch:
+            try:
+                self.storage.store_response(spider, request, response)
+            except Exception:
+                logger.error("Error storing %(request)s in the HTTP cache",
+                             {'request': request}, exc_info=True,
+                             extra={'spider': spider})
+
+    def _written(self, _, batch):
+        for key, (request, response) in batch.items():
+            if self._writing.get(key) is response:
+                del self._writing[key]
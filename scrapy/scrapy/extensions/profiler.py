@@ -0,0 +1,292 @@
+"""
+Profiler extension
+
+Measures the reactor loop lag and the time spent in spider callbacks,
+middlewares and item pipelines.
+
+See documentation in docs/topics/extensions.rst
+"""
+import inspect
+import logging
+from bisect import bisect_left
+from time import perf_counter, thread_time
+
+from twisted.internet import defer, task
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.extensions.telnet import update_telnet_vars
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Histogram of durations, in seconds, with exponential buckets from
+    10 microseconds to about 3 minutes"""
+
+    bounds = [1e-5 * 2 ** i for i in range(25)]
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        """Return an upper bound of the ``p`` percentile (0 to 100)"""
+        if not self.count:
+            return 0.0
+        rank = self.count * p / 100
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                if index == len(self.bounds):
+                    return self.max
+                return min(self.bounds[index], self.max)
+        return self.max
+
+
+class _ProfiledMethod:
+    """Middleware method wrapper recording its duration; it keeps the
+    ``__self__`` and ``__func__`` attributes of the wrapped bound method,
+    used by middleware managers in their error messages"""
+
+    def __init__(self, profiler, method, histogram, component):
+        self.profiler = profiler
+        self.method = method
+        self.histogram = histogram
+        self.component = component
+        bound = inspect.unwrap(method)
+        self.__self__ = bound.__self__
+        self.__func__ = bound.__func__
+        self.__name__ = bound.__name__
+
+    def __call__(self, *args, **kwargs):
+        return self.profiler._call(self.method, args, kwargs, self.histogram,
+                                   total=self.component)
+
+
+class Profiler:
+    """
+    Measure the reactor loop lag and the time spent in spider callbacks,
+    middleware methods and item pipelines.
+
+    The reactor lag is the delay with which a timer scheduled every
+    :setting:`PROFILER_LAG_INTERVAL` seconds is called: a lag that is high
+    compared to the network latency means that the reactor is blocked by CPU
+    work.
+
+    The time spent in a callback, or in a middleware method, includes the
+    iteration of the iterable it returns (which is where the work of
+    generator callbacks happens), and excludes the time spent in other
+    profiled callbacks and methods called from it. When a method returns a
+    deferred, the time until the deferred fires is recorded instead, so that
+    asynchronous item pipelines are measured too.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool('PROFILER_ENABLED'):
+            raise NotConfigured
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.lag_interval = settings.getfloat('PROFILER_LAG_INTERVAL')
+        self.log_interval = settings.getfloat('PROFILER_LOG_INTERVAL')
+        self.histograms = {}
+        self.reactor_lag = self.histogram('reactor_lag')
+        # component -> time spent in it by the reactor thread, for the
+        # periodic log message
+        self.totals = {}
+        self._window_lag = Histogram()
+        self._last_totals = {}
+        # duration of the profiled calls made within the current one
+        self._nested_wall = 0.0
+        self._nested_cpu = 0.0
+        self._last_tick = None
+        self.lag_task = None
+        self.log_task = None
+        crawler.profiler = self
+        crawler.signals.connect(self.engine_started, signal=signals.engine_started)
+        crawler.signals.connect(self.engine_stopped, signal=signals.engine_stopped)
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(self._update_telnet_vars, signal=update_telnet_vars)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def histogram(self, name):
+        try:
+            return self.histograms[name]
+        except KeyError:
+            histogram = self.histograms[name] = Histogram()
+            return histogram
+
+    def engine_started(self):
+        self._last_tick = perf_counter()
+        self.lag_task = task.LoopingCall(self._tick)
+        self.lag_task.start(self.lag_interval, now=False)
+        if self.log_interval:
+            self.log_task = task.LoopingCall(self.log)
+            self.log_task.start(self.log_interval, now=False)
+
+    def engine_stopped(self):
+        for tsk in (self.lag_task, self.log_task):
+            if tsk and tsk.running:
+                tsk.stop()
+
+    def spider_closed(self, spider):
+        self.update_stats(spider)
+
+    def _tick(self):
+        now = perf_counter()
+        lag = max(now - self._last_tick - self.lag_interval, 0.0)
+        self._last_tick = now
+        self.reactor_lag.add(lag)
+        self._window_lag.add(lag)
+
+    # instrumentation
+
+    def profile_callback(self, callback):
+        """Return a wrapper of the spider ``callback`` (or errback) recording
+        its wall and CPU time"""
+        if hasattr(callback, '__self__'):
+            name = f'{callback.__self__.__class__.__name__}.{callback.__name__}'
+        else:
+            name = getattr(callback, '__qualname__', None) or repr(callback)
+        wall = self.histogram(f'callback/{name}/wall')
+        cpu = self.histogram(f'callback/{name}/cpu')
+
+        def profiled_callback(*args, **kwargs):
+            return self._call(callback, args, kwargs, wall, cpu, total='callbacks')
+        return profiled_callback
+
+    def profile_middlewares(self, mwman):
+        """Replace the methods of the middleware manager ``mwman`` by wrappers
+        recording their duration"""
+        component = mwman.component_name.replace(' ', '_')
+        for methods in mwman.methods.values():
+            for index, method in enumerate(methods):
+                # item pipeline methods are wrapped by deferred_f_from_coro_f
+                bound = inspect.unwrap(method) if method is not None else None
+                if not hasattr(bound, '__self__'):
+                    continue
+                histogram = self.histogram(
+                    f'{component}/{bound.__self__.__class__.__name__}.{bound.__name__}')
+                methods[index] = _ProfiledMethod(self, method, histogram, component)
+
+    def _call(self, func, args, kwargs, wall, cpu=None, total=None):
+        started = self._enter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            elapsed_wall, elapsed_cpu = self._exit(started)
+        if isinstance(result, defer.Deferred):
+            start = perf_counter()
+
+            def fired(value):
+                wall.add(elapsed_wall + perf_counter() - start)
+                self._record(elapsed_wall, elapsed_cpu, None, cpu, total)
+                return value
+            return result.addBoth(fired)
+        if hasattr(result, '__next__') and hasattr(result, '__iter__'):
+            return self._iterate(result, elapsed_wall, elapsed_cpu, wall, cpu, total)
+        self._record(elapsed_wall, elapsed_cpu, wall, cpu, total)
+        return result
+
+    def _iterate(self, iterator, elapsed_wall, elapsed_cpu, wall, cpu, total):
+        try:
+            while True:
+                started = self._enter()
+                try:
+                    value = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    step_wall, step_cpu = self._exit(started)
+                    elapsed_wall += step_wall
+                    elapsed_cpu += step_cpu
+                yield value
+        finally:
+            self._record(elapsed_wall, elapsed_cpu, wall, cpu, total)
+
+    def _enter(self):
+        started = (perf_counter(), thread_time(), self._nested_wall, self._nested_cpu)
+        self._nested_wall = self._nested_cpu = 0.0
+        return started
+
+    def _exit(self, started):
+        """Return the time elapsed since :meth:`_enter` returned ``started``,
+        minus the time spent in the profiled calls made meanwhile"""
+        start_wall, start_cpu, nested_wall, nested_cpu = started
+        elapsed_wall = perf_counter() - start_wall
+        elapsed_cpu = thread_time() - start_cpu
+        own_wall = elapsed_wall - self._nested_wall
+        own_cpu = elapsed_cpu - self._nested_cpu
+        self._nested_wall = nested_wall + elapsed_wall
+        self._nested_cpu = nested_cpu + elapsed_cpu
+        return own_wall, own_cpu
+
+    def _record(self, elapsed_wall, elapsed_cpu, wall, cpu, total):
+        if wall is not None:
+            wall.add(elapsed_wall)
+        if cpu is not None:
+            cpu.add(elapsed_cpu)
+        if total:
+            self.totals[total] = self.totals.get(total, 0.0) + elapsed_wall
+
+    # reporting
+
+    def update_stats(self, spider=None):
+        for name, histogram in self.histograms.items():
+            if not histogram.count:
+                continue
+            prefix = f'profiler/{name}'
+            self.stats.set_value(f'{prefix}/count', histogram.count, spider=spider)
+            self.stats.set_value(f'{prefix}/total', round(histogram.total, 6), spider=spider)
+            self.stats.set_value(f'{prefix}/p50', round(histogram.percentile(50), 6), spider=spider)
+            self.stats.set_value(f'{prefix}/p99', round(histogram.percentile(99), 6), spider=spider)
+            self.stats.set_value(f'{prefix}/max', round(histogram.max, 6), spider=spider)
+
+    def log(self):
+        lag, self._window_lag = self._window_lag, Histogram()
+        busy = []
+        for name in sorted(self.totals):
+            spent = self.totals[name] - self._last_totals.get(name, 0.0)
+            busy.append(f"{name} {spent / self.log_interval:.1%}")
+        self._last_totals = dict(self.totals)
+        msg = ("Reactor lag: mean %(mean).1f ms, p99 %(p99).1f ms, max %(max).1f ms; "
+               "time spent in %(busy)s")
+        log_args = {'mean': lag.mean * 1e3, 'p99': lag.percentile(99) * 1e3,
+                    'max': lag.max * 1e3, 'busy': ', '.join(busy) or 'nothing'}
+        logger.info(msg, log_args, extra={'crawler': self.crawler})
+        self.update_stats(self.crawler.spider)
+
+    def report(self, top=20):
+        """Return a table of the profiled callbacks and methods that took the
+        most time in total"""
+        lines = [f"{'name':<60} {'count':>9} {'total':>10} {'p50 ms':>9} "
+                 f"{'p99 ms':>9} {'max ms':>9}"]
+        histograms = sorted(self.histograms.items(), key=lambda i: i[1].total, reverse=True)
+        for name, h in histograms[:top]:
+            if h.count:
+                lines.append(f"{name:<60} {h.count:>9} {h.total:>10.3f} "
+                             f"{h.percentile(50) * 1e3:>9.2f} {h.percentile(99) * 1e3:>9.2f} "
+                             f"{h.max * 1e3:>9.2f}")
+        return '\n'.join(lines)
+
+    def _update_telnet_vars(self, telnet_vars):
+        telnet_vars['profiler'] = self
+        telnet_vars['prof'] = lambda: print(self.report())
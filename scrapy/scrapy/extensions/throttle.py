@@ -1,4 +1,7 @@
 import logging
+from collections import deque
+from time import time
+from weakref import WeakKeyDictionary
 
 from scrapy.exceptions import NotConfigured
 from scrapy import signals
@@ -6,8 +9,35 @@ from scrapy import signals
 logger = logging.getLogger(__name__)
 
 
+class _SlotState:
+    """Concurrency controller state of a downloader slot"""
+
+    def __init__(self, history_size):
+        self.latencies = deque(maxlen=history_size)
+        self.failures = deque(maxlen=history_size)  # 1 for failed downloads
+        self.latency = None  # moving average
+        self.responses = 0  # responses received since the last adjustment
+        self.slow_start = True
+        self.last_backoff = 0.0
+
+
 class AutoThrottle:
 
+    #: response codes which make the concurrency controller back off
+    BACKOFF_HTTP_CODES = {429, 503}
+
+    #: the concurrency controller backs off when the average latency of a
+    #: slot exceeds its lowest recent latency by this factor
+    latency_tolerance = 2.0
+
+    #: the concurrency controller backs off on failed downloads when they are
+    #: more than this fraction of the recent downloads of a slot
+    error_rate_tolerance = 0.1
+
+    #: minimum number of responses between two increases after a back off,
+    #: to probe websites which limit their request rate cautiously
+    increase_window = 10
+
     def __init__(self, crawler):
         self.crawler = crawler
         if not crawler.settings.getbool('AUTOTHROTTLE_ENABLED'):
@@ -15,8 +45,21 @@ class AutoThrottle:
 
         self.debug = crawler.settings.getbool("AUTOTHROTTLE_DEBUG")
         self.target_concurrency = crawler.settings.getfloat("AUTOTHROTTLE_TARGET_CONCURRENCY")
+        self.mode = crawler.settings.get('AUTOTHROTTLE_MODE')
+        if self.mode not in ('delay', 'concurrency'):
+            raise ValueError(f"Unknown AUTOTHROTTLE_MODE: {self.mode!r}")
         crawler.signals.connect(self._spider_opened, signal=signals.spider_opened)
         crawler.signals.connect(self._response_downloaded, signal=signals.response_downloaded)
+        if self.mode == 'concurrency':
+            self.max_concurrency = crawler.settings.getint('AUTOTHROTTLE_MAX_CONCURRENCY')
+            self.history_size = crawler.settings.getint('AUTOTHROTTLE_HISTORY_SIZE')
+            self.states = WeakKeyDictionary()  # downloader slot -> _SlotState
+            # requests being downloaded which got a response
+            self._responded = set()
+            crawler.signals.connect(self._request_reached_downloader,
+                                    signal=signals.request_reached_downloader)
+            crawler.signals.connect(self._request_left_downloader,
+                                    signal=signals.request_left_downloader)
 
     @classmethod
     def from_crawler(cls, crawler):
@@ -35,32 +78,62 @@ class AutoThrottle:
         return self.crawler.settings.getfloat('AUTOTHROTTLE_MAX_DELAY')
 
     def _start_delay(self, spider):
+        if self.mode == 'concurrency':
+            return self.mindelay
         return max(self.mindelay, self.crawler.settings.getfloat('AUTOTHROTTLE_START_DELAY'))
 
     def _response_downloaded(self, response, request, spider):
         key, slot = self._get_slot(request, spider)
         latency = request.meta.get('download_latency')
-        if latency is None or slot is None:
+        if self.mode == 'concurrency':
+            self._responded.add(request)
+        if slot is None:
             return
 
         olddelay = slot.delay
-        self._adjust_delay(slot, latency, response)
-        if self.debug:
+        if self.mode == 'concurrency':
+            # some download handlers do not measure the latency, their
+            # responses still count
+            self._adjust_concurrency(slot, latency, response)
+        elif latency is not None:
+            self._adjust_delay(slot, latency, response)
+        if self.debug and latency is not None:
             diff = slot.delay - olddelay
             size = len(response.body)
             conc = len(slot.transferring)
             logger.info(
-                "slot: %(slot)s | conc:%(concurrency)2d | "
+                "slot: %(slot)s | conc:%(concurrency)2d/%(limit)2d | "
                 "delay:%(delay)5d ms (%(delaydiff)+d) | "
                 "latency:%(latency)5d ms | size:%(size)6d bytes",
                 {
-                    'slot': key, 'concurrency': conc,
+                    'slot': key, 'concurrency': conc, 'limit': slot.concurrency,
                     'delay': slot.delay * 1000, 'delaydiff': diff * 1000,
                     'latency': latency * 1000, 'size': size
                 },
                 extra={'spider': spider}
             )
 
+    def _request_reached_downloader(self, request, spider):
+        key, slot = self._get_slot(request, spider)
+        if slot is not None and slot not in self.states:
+            # new slots start with a single request at a time
+            self.states[slot] = _SlotState(self.history_size)
+            slot.concurrency = 1
+            slot.delay = self.mindelay
+
+    def _request_left_downloader(self, request, spider):
+        if request in self._responded:
+            self._responded.remove(request)
+            return
+        # the download failed (timeout, connection error...)
+        key, slot = self._get_slot(request, spider)
+        state = self.states.get(slot) if slot is not None else None
+        if state is None:
+            return
+        state.failures.append(1)
+        if sum(state.failures) > len(state.failures) * self.error_rate_tolerance:
+            self._back_off(slot, state)
+
     def _get_slot(self, request, spider):
         key = request.meta.get('download_slot')
         return key, self.crawler.engine.downloader.slots.get(key)
@@ -91,3 +164,67 @@ class AutoThrottle:
             return
 
         slot.delay = new_delay
+
+    def _adjust_concurrency(self, slot, latency, response):
+        """Adjust the concurrency, and the delay, of a slot with an AIMD
+        (additive increase, multiplicative decrease) policy"""
+        state = self.states.get(slot)
+        if state is None:
+            state = self.states[slot] = _SlotState(self.history_size)
+
+        state.failures.append(0)
+        # latencies of error pages and redirections are not representative
+        if response.status == 200 and latency is not None:
+            state.latencies.append(latency)
+            if state.latency is None:
+                state.latency = latency
+            else:
+                state.latency = 0.8 * state.latency + 0.2 * latency
+
+        if (
+            response.status in self.BACKOFF_HTTP_CODES
+            or (state.latencies
+                and state.latency > min(state.latencies) * self.latency_tolerance)
+        ):
+            self._back_off(slot, state, sent=time() - (latency or 0))
+            return
+
+        # increase once per window of responses as large as the concurrency
+        state.responses += 1
+        if state.responses < slot.concurrency:
+            return
+        if slot.delay > self.mindelay:
+            # recover from a back off at the lowest concurrency
+            state.responses = 0
+            delay = slot.delay / 2
+            slot.delay = delay if delay > max(self.mindelay, 0.01) else self.mindelay
+            return
+        if not state.slow_start and state.responses < self.increase_window:
+            return
+        state.responses = 0
+        if slot.concurrency < self.max_concurrency:
+            if state.slow_start:
+                slot.concurrency = min(slot.concurrency * 2, self.max_concurrency)
+            else:
+                slot.concurrency += 1
+
+    def _back_off(self, slot, state, sent=None):
+        """Back off after a congestion signal from a request sent at
+        ``sent``, or from a failed download if ``sent`` is ``None``"""
+        now = time()
+        # the requests sent before the last back off were not affected by it;
+        # the send time of failed downloads is unknown, they are assumed to
+        # be sent an average latency before
+        if sent is None:
+            sent = now - (state.latency or 0)
+        if sent < state.last_backoff:
+            return
+        state.last_backoff = now
+        state.slow_start = False
+        state.responses = 0
+        if slot.concurrency > 1:
+            slot.concurrency = max(1, slot.concurrency // 2)
+        else:
+            delay = max(slot.delay * 2, state.latency or 1.0)
+            slot.delay = min(max(self.mindelay, delay), self.maxdelay)
+        self.crawler.stats.inc_value('autothrottle/backoff')
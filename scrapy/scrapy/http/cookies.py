@@ -1,5 +1,7 @@
 import time
+from heapq import heapify, heappop, heappush
 from http.cookiejar import CookieJar as _CookieJar, DefaultCookiePolicy, IPV4_RE
+from itertools import count
 
 from scrapy.utils.httpobj import urlparse_cached
 from scrapy.utils.python import to_unicode
@@ -8,8 +10,7 @@ from scrapy.utils.python import to_unicode
 class CookieJar:
     def __init__(self, policy=None, check_expired_frequency=10000):
         self.policy = policy or DefaultCookiePolicy()
-        self.jar = _CookieJar(self.policy)
-        self.jar._cookies_lock = _DummyLock()
+        self.jar = _ExpiringCookieJar(self.policy)
         self.check_expired_frequency = check_expired_frequency
         self.processed = 0
 
@@ -47,7 +48,6 @@ class CookieJar:
 
         self.processed += 1
         if self.processed % self.check_expired_frequency == 0:
-            # This is still quite inefficient for large number of cookies
             self.jar.clear_expired_cookies()
 
     @property
@@ -81,6 +81,59 @@ class CookieJar:
         self.jar.set_cookie_if_ok(cookie, WrappedRequest(request))
 
 
+class _ExpiringCookieJar(_CookieJar):
+    """Cookie jar keeping its cookies with an expiration date in a heap, so
+    that clearing the expired cookies only visits those, instead of every
+    cookie of every domain"""
+
+    def __init__(self, policy=None):
+        super().__init__(policy)
+        self._cookies_lock = _DummyLock()
+        # (expires, sequence, cookie) tuples; entries of cookies that have
+        # been replaced or removed since are skipped when popped
+        self._expiry = []
+        self._sequence = count()
+        self._compact_size = 1024
+
+    def set_cookie(self, cookie):
+        super().set_cookie(cookie)
+        if cookie.expires is not None:
+            heappush(self._expiry, (cookie.expires, next(self._sequence), cookie))
+            if len(self._expiry) > self._compact_size:
+                self._compact()
+
+    def clear_expired_cookies(self):
+        now = time.time()
+        expiry = self._expiry
+        while expiry and expiry[0][0] <= now:
+            cookie = heappop(expiry)[2]
+            if self._is_stored(cookie):
+                self._remove(cookie)
+
+    def _is_stored(self, cookie):
+        try:
+            return self._cookies[cookie.domain][cookie.path][cookie.name] is cookie
+        except KeyError:
+            return False
+
+    def _remove(self, cookie):
+        # unlike clear(), also drop the path and domain dicts left empty
+        paths = self._cookies[cookie.domain]
+        names = paths[cookie.path]
+        del names[cookie.name]
+        if not names:
+            del paths[cookie.path]
+            if not paths:
+                del self._cookies[cookie.domain]
+
+    def _compact(self):
+        """Drop the heap entries of cookies replaced or removed since they
+        were pushed, which cookies refreshed on every response accumulate"""
+        self._expiry = [entry for entry in self._expiry if self._is_stored(entry[2])]
+        heapify(self._expiry)
+        self._compact_size = max(1024, 2 * len(self._expiry))
+
+
 def potential_domain_matches(domain):
     """Potential domain matches for a cookie
 
@@ -16,6 +16,15 @@ from scrapy.utils.curl import curl_to_request_kwargs
 
 class Request(object_ref):
 
+    # headers, cookies, meta, flags and cb_kwargs are only allocated when
+    # used, and attributes of subclasses or set by users go to __dict__,
+    # which is not allocated otherwise, to save memory on deep frontiers
+    __slots__ = (
+        '_encoding', 'method', '_url', '_body', 'priority', 'callback',
+        'errback', '_cookies', '_headers', 'dont_filter', '_meta',
+        '_cb_kwargs', '_flags', '__dict__', '__weakref__',
+    )
+
     def __init__(self, url, callback=None, method='GET', headers=None, body=None,
                  cookies=None, meta=None, encoding='utf-8', priority=0,
                  dont_filter=False, errback=None, flags=None, cb_kwargs=None):
@@ -35,13 +44,13 @@ class Request(object_ref):
         self.callback = callback
         self.errback = errback
 
-        self.cookies = cookies or {}
-        self.headers = Headers(headers or {}, encoding=encoding)
+        self._cookies = cookies or None
+        self._headers = Headers(headers, encoding=encoding) if headers else None
         self.dont_filter = dont_filter
 
         self._meta = dict(meta) if meta else None
         self._cb_kwargs = dict(cb_kwargs) if cb_kwargs else None
-        self.flags = [] if flags is None else list(flags)
+        self._flags = list(flags) if flags else None
 
     @property
     def cb_kwargs(self):
@@ -55,6 +64,36 @@ class Request(object_ref):
             self._meta = {}
         return self._meta
 
+    @property
+    def headers(self):
+        if self._headers is None:
+            self._headers = Headers(encoding=self._encoding)
+        return self._headers
+
+    @headers.setter
+    def headers(self, value):
+        self._headers = value
+
+    @property
+    def cookies(self):
+        if self._cookies is None:
+            self._cookies = {}
+        return self._cookies
+
+    @cookies.setter
+    def cookies(self, value):
+        self._cookies = value
+
+    @property
+    def flags(self):
+        if self._flags is None:
+            self._flags = []
+        return self._flags
+
+    @flags.setter
+    def flags(self, value):
+        self._flags = value
+
     def _get_url(self):
         return self._url
 
@@ -102,9 +141,12 @@ class Request(object_ref):
         """Create a new Request with the same attributes except for those
         given new values.
         """
-        for x in ['url', 'method', 'headers', 'body', 'cookies', 'meta', 'flags',
-                  'encoding', 'priority', 'dont_filter', 'callback', 'errback', 'cb_kwargs']:
+        for x in ['url', 'method', 'body', 'encoding', 'priority', 'dont_filter',
+                  'callback', 'errback']:
             kwargs.setdefault(x, getattr(self, x))
+        # do not allocate the attributes that have not been used
+        for x in ['headers', 'cookies', 'meta', 'flags', 'cb_kwargs']:
+            kwargs.setdefault(x, getattr(self, '_' + x))
         cls = kwargs.pop('cls', self.__class__)
         return cls(*args, **kwargs)
 
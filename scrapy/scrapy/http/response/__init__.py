@@ -4,6 +4,7 @@ responses in Scrapy.
 
 See documentation in docs/topics/request-response.rst
 """
+import mmap
 from typing import Generator
 from urllib.parse import urljoin
 
@@ -66,7 +67,8 @@ class Response(object_ref):
     def _set_body(self, body):
         if body is None:
             self._body = b''
-        elif not isinstance(body, bytes):
+        # bodies of large downloads may be memory-mapped temporary files
+        elif not isinstance(body, (bytes, mmap.mmap)):
             raise TypeError(
                 "Response body must be bytes. "
                 "If you want to pass unicode body use TextResponse "
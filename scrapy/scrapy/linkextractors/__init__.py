@@ -92,21 +92,26 @@ class FilteringLinkExtractor:
                               for x in arg_to_iter(restrict_text)]
 
     def _link_allowed(self, link):
-        if not _is_valid_url(link.url):
+        if not self._url_allowed(link.url):
             return False
-        if self.allow_res and not _matches(link.url, self.allow_res):
+        if self.restrict_text and not _matches(link.text, self.restrict_text):
+            return False
+        return True
+
+    def _url_allowed(self, url):
+        if not _is_valid_url(url):
             return False
-        if self.deny_res and _matches(link.url, self.deny_res):
+        if self.allow_res and not _matches(url, self.allow_res):
             return False
-        parsed_url = urlparse(link.url)
+        if self.deny_res and _matches(url, self.deny_res):
+            return False
+        parsed_url = urlparse(url)
         if self.allow_domains and not url_is_from_any_domain(parsed_url, self.allow_domains):
             return False
         if self.deny_domains and url_is_from_any_domain(parsed_url, self.deny_domains):
             return False
         if self.deny_extensions and url_has_any_extension(parsed_url, self.deny_extensions):
             return False
-        if self.restrict_text and not _matches(link.text, self.restrict_text):
-            return False
         return True
 
     def matches(self, url):
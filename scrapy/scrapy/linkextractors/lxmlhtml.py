@@ -2,7 +2,7 @@
 Link extractor based on lxml.html
 """
 import operator
-from functools import partial
+from functools import lru_cache, partial
 from urllib.parse import urljoin
 
 import lxml.etree as etree
@@ -10,7 +10,7 @@ from w3lib.html import strip_html5_whitespace
 from w3lib.url import canonicalize_url, safe_url_string
 
 from scrapy.link import Link
-from scrapy.linkextractors import FilteringLinkExtractor
+from scrapy.linkextractors import _matches, FilteringLinkExtractor
 from scrapy.utils.misc import arg_to_iter, rel_has_nofollow
 from scrapy.utils.python import unique as unique_list
 from scrapy.utils.response import get_base_url
@@ -37,18 +37,70 @@ def _canonicalize_link_url(link):
     return canonicalize_url(link.url, keep_fragments=True)
 
 
+def _scan_names(names):
+    if isinstance(names, str):
+        return (names,)
+    if isinstance(names, (set, frozenset, list, tuple)):
+        return tuple(sorted(names))
+    return None
+
+
+def _xpath_literal(name):
+    if "'" not in name:
+        return f"'{name}'"
+    if '"' not in name:
+        return f'"{name}"'
+    return None
+
+
+@lru_cache(maxsize=32)
+def _links_xpath(tags, attrs):
+    """Return an XPath selecting in one pass the attributes ``attrs`` of the
+    elements ``tags`` (with no namespace or in the XHTML namespace), or
+    ``None`` if some name can't be expressed in XPath"""
+    tag_literals = [_xpath_literal(tag) for tag in tags]
+    attr_literals = [_xpath_literal(attr) for attr in attrs]
+    literals = tag_literals + attr_literals
+    if not literals or None in literals or any(name.startswith('{') for name in tags + attrs):
+        return None
+    tag_test = ' or '.join(f'name()={lit}' for lit in tag_literals)
+    xhtml_tag_test = ' or '.join(f'local-name()={lit}' for lit in tag_literals)
+    attr_test = ' or '.join(f'name()={lit}' for lit in attr_literals)
+    return etree.XPath(
+        f"descendant-or-self::*[(namespace-uri()='' and ({tag_test}))"
+        f" or (namespace-uri()='{XHTML_NAMESPACE}' and ({xhtml_tag_test}))]"
+        f"/@*[namespace-uri()='' and ({attr_test})]"
+    )
+
+
 class LxmlParserLinkExtractor:
     def __init__(
         self, tag="a", attr="href", process=None, unique=False, strip=True, canonicalized=False
     ):
-        self.scan_tag = tag if callable(tag) else partial(operator.eq, tag)
-        self.scan_attr = attr if callable(attr) else partial(operator.eq, attr)
+        self.scan_tag = tag if callable(tag) else self._scan_func(tag)
+        self.scan_attr = attr if callable(attr) else self._scan_func(attr)
         self.process_attr = process if callable(process) else _identity
         self.unique = unique
         self.strip = strip
         self.link_key = operator.attrgetter("url") if canonicalized else _canonicalize_link_url
+        # tag and attribute names looked up with a single XPath, when they
+        # are not given as predicates
+        tags = None if callable(tag) else _scan_names(tag)
+        attrs = None if callable(attr) else _scan_names(attr)
+        self._scan_names = (tags, attrs) if tags and attrs else None
+
+    @staticmethod
+    def _scan_func(names):
+        if isinstance(names, (set, frozenset, list, tuple)):
+            return partial(operator.contains, set(names))
+        return partial(operator.eq, names)
 
     def _iter_links(self, document):
+        xpath = _links_xpath(*self._scan_names) if self._scan_names else None
+        if xpath is not None and etree.iselement(document):
+            for value in xpath(document):
+                yield (value.getparent(), value.attrname, str(value))
+            return
         for el in document.iter(etree.Element):
             if not self.scan_tag(_nons(el.tag)):
                 continue
@@ -58,24 +110,42 @@ class LxmlParserLinkExtractor:
                     continue
                 yield (el, attrib, attribs[attrib])
 
+    def _link_urls(self, document, response_url, response_encoding, base_url):
+        """Return the elements of ``document`` holding links along with their
+        absolute URL, normalizing all the URLs in one batch. URLs repeated
+        within the document are joined and normalized only once."""
+        link_urls = []
+        joined_urls = {}
+        safe_urls = {}
+        for el, attr, attr_val in self._iter_links(document):
+            try:
+                joined = joined_urls[attr_val]
+            except KeyError:
+                # pseudo lxml.html.HtmlElement.make_links_absolute(base_url)
+                try:
+                    joined = strip_html5_whitespace(attr_val) if self.strip else attr_val
+                    joined = urljoin(base_url, joined)
+                except ValueError:
+                    joined = None  # skipping bogus links
+                joined_urls[attr_val] = joined
+            if joined is None:
+                continue
+            url = self.process_attr(joined)
+            if url is None:
+                continue
+            try:
+                safe_url = safe_urls[url]
+            except KeyError:
+                safe_url = safe_url_string(url, encoding=response_encoding)
+                # to fix relative links after process_value
+                safe_url = safe_urls[url] = urljoin(response_url, safe_url)
+            link_urls.append((el, safe_url))
+        return link_urls
+
     def _extract_links(self, selector, response_url, response_encoding, base_url):
         links = []
         # hacky way to get the underlying lxml parsed document
-        for el, attr, attr_val in self._iter_links(selector.root):
-            # pseudo lxml.html.HtmlElement.make_links_absolute(base_url)
-            try:
-                if self.strip:
-                    attr_val = strip_html5_whitespace(attr_val)
-                attr_val = urljoin(base_url, attr_val)
-            except ValueError:
-                continue  # skipping bogus links
-            else:
-                url = self.process_attr(attr_val)
-                if url is None:
-                    continue
-            url = safe_url_string(url, encoding=response_encoding)
-            # to fix relative links after process_value
-            url = urljoin(response_url, url)
+        for el, url in self._link_urls(selector.root, response_url, response_encoding, base_url):
             link = Link(url, _collect_string_content(el) or '',
                         nofollow=rel_has_nofollow(el.get('rel')))
             links.append(link)
@@ -119,8 +189,8 @@ class LxmlLinkExtractor(FilteringLinkExtractor):
     ):
         tags, attrs = set(arg_to_iter(tags)), set(arg_to_iter(attrs))
         lx = LxmlParserLinkExtractor(
-            tag=partial(operator.contains, tags),
-            attr=partial(operator.contains, attrs),
+            tag=tags,
+            attr=attrs,
             unique=unique,
             process=process_value,
             strip=strip,
@@ -138,6 +208,14 @@ class LxmlLinkExtractor(FilteringLinkExtractor):
             deny_extensions=deny_extensions,
             restrict_text=restrict_text,
         )
+        # links can be filtered while they are extracted unless the filtering
+        # is customized by a subclass
+        cls = type(self)
+        self._single_pass = (
+            cls._link_allowed is FilteringLinkExtractor._link_allowed
+            and cls._process_links is FilteringLinkExtractor._process_links
+            and cls._extract_links is FilteringLinkExtractor._extract_links
+        )
 
     def extract_links(self, response):
         """Returns a list of :class:`~scrapy.link.Link` objects from the
@@ -159,6 +237,47 @@ class LxmlLinkExtractor(FilteringLinkExtractor):
             docs = [response.selector]
         all_links = []
         for doc in docs:
-            links = self._extract_links(doc, response.url, response.encoding, base_url)
-            all_links.extend(self._process_links(links))
+            if self._single_pass:
+                links = self._extract_allowed_links(doc, response.url, response.encoding, base_url)
+            else:
+                links = self._extract_links(doc, response.url, response.encoding, base_url)
+                links = self._process_links(links)
+            all_links.extend(links)
         return unique_list(all_links)
+
+    def _extract_allowed_links(self, selector, response_url, response_encoding, base_url):
+        """Equivalent to ``self._process_links(self._extract_links(...))``,
+        filtering and deduplicating the URLs before building the links, so
+        that the text of the links that are dropped is never extracted"""
+        lx = self.link_extractor
+        seen_urls = set()
+        seen_keys = set()
+        canonical_keys = set()
+        links = []
+        for el, url in lx._link_urls(selector.root, response_url, response_encoding, base_url):
+            if lx.unique:
+                if url in seen_urls:
+                    continue
+                seen_urls.add(url)
+                if not self.canonicalize:
+                    key = canonicalize_url(url, keep_fragments=True)
+                    if key in seen_keys:
+                        continue
+                    seen_keys.add(key)
+            if not self._url_allowed(url):
+                continue
+            text = None
+            if self.restrict_text:
+                text = _collect_string_content(el) or ''
+                if not _matches(text, self.restrict_text):
+                    continue
+            if self.canonicalize:
+                url = canonicalize_url(url)
+                if lx.unique:
+                    if url in canonical_keys:
+                        continue
+                    canonical_keys.add(url)
+            if text is None:
+                text = _collect_string_content(el) or ''
+            links.append(Link(url, text, nofollow=rel_has_nofollow(el.get('rel'))))
+        return links
@@ -46,7 +46,11 @@ class MiddlewareManager:
                     {'componentname': cls.component_name,
                      'enabledlist': pprint.pformat(enabled)},
                     extra={'crawler': crawler})
-        return cls(*middlewares)
+        mwman = cls(*middlewares)
+        profiler = getattr(crawler, 'profiler', None)
+        if profiler is not None:
+            profiler.profile_middlewares(mwman)
+        return mwman
 
     @classmethod
     def from_crawler(cls, crawler):
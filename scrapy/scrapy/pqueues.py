@@ -1,6 +1,8 @@
 import hashlib
+import heapq
 import logging
 
+from scrapy import signals
 from scrapy.utils.misc import create_instance
 
 logger = logging.getLogger(__name__)
@@ -46,6 +48,10 @@ class ScrapyPriorityQueue:
     previously closed leaving some priority buckets non-empty, those priorities
     should be passed in startprios.
 
+    Priorities in use are kept in a heap and the number of queued requests is
+    tracked as they are pushed and popped, so neither draining a priority
+    bucket nor ``len()`` depends on the number of priorities.
+
     """
 
     @classmethod
@@ -57,7 +63,9 @@ class ScrapyPriorityQueue:
         self.downstream_queue_cls = downstream_queue_cls
         self.key = key
         self.queues = {}
+        self.prios = []  # heap of the priorities in self.queues
         self.curprio = None
+        self._len = 0
         self.init_prios(startprios)
 
     def init_prios(self, startprios):
@@ -65,9 +73,13 @@ class ScrapyPriorityQueue:
             return
 
         for priority in startprios:
-            self.queues[priority] = self.qfactory(priority)
+            if priority not in self.queues:
+                self.queues[priority] = self.qfactory(priority)
+                self._len += len(self.queues[priority])
 
-        self.curprio = min(startprios)
+        self.prios = list(self.queues)
+        heapq.heapify(self.prios)
+        self.curprio = self.prios[0]
 
     def qfactory(self, key):
         return create_instance(self.downstream_queue_cls,
@@ -81,22 +93,32 @@ class ScrapyPriorityQueue:
     def push(self, request):
         priority = self.priority(request)
         if priority not in self.queues:
-            self.queues[priority] = self.qfactory(priority)
-        q = self.queues[priority]
-        q.push(request)  # this may fail (eg. serialization error)
-        if self.curprio is None or priority < self.curprio:
-            self.curprio = priority
+            q = self.qfactory(priority)
+            try:
+                q.push(request)  # this may fail (eg. serialization error)
+            except Exception:
+                q.close()
+                raise
+            self.queues[priority] = q
+            heapq.heappush(self.prios, priority)
+        else:
+            self.queues[priority].push(request)  # this may fail (eg. serialization error)
+        self._len += 1
+        self.curprio = self.prios[0]
 
     def pop(self):
         if self.curprio is None:
             return
         q = self.queues[self.curprio]
         m = q.pop()
+        if m is not None:
+            self._len -= 1
         if not q:
-            del self.queues[self.curprio]
-            q.close()
-            prios = [p for p, q in self.queues.items() if q]
-            self.curprio = min(prios) if prios else None
+            # drop the drained queues at the top of the heap (queues passed
+            # in startprios may be empty too)
+            while self.prios and not self.queues[self.prios[0]]:
+                self.queues.pop(heapq.heappop(self.prios)).close()
+            self.curprio = self.prios[0] if self.prios else None
         return m
 
     def close(self):
@@ -107,7 +129,37 @@ class ScrapyPriorityQueue:
         return active
 
     def __len__(self):
-        return sum(len(x) for x in self.queues.values()) if self.queues else 0
+        return self._len
+
+
+class DelayedPriorityQueue(ScrapyPriorityQueue):
+    """A :class:`ScrapyPriorityQueue` of delayed requests, whose
+    ``not_before`` meta key is set: requests are kept in buckets of
+    ``bucket_secs`` seconds and dequeued in the order of their buckets, so
+    that a bucket is only popped once it is due.
+
+    Requests within a bucket are not sorted by time, the scheduler keeps the
+    requests of the due buckets in memory until they are due themselves.
+    """
+
+    bucket_secs = 60
+
+    def priority(self, request):
+        return int(request.meta['not_before'] // self.bucket_secs)
+
+    @property
+    def next_due(self):
+        """Start time of the earliest bucket, ``None`` if the queue is empty"""
+        if self.curprio is None:
+            return None
+        return self.curprio * self.bucket_secs
+
+    def pop_due(self, now):
+        """Pop a request from a bucket which started before ``now``, return
+        ``None`` if there is none"""
+        if self.curprio is None or self.curprio * self.bucket_secs > now:
+            return None
+        return self.pop()
 
 
 class DownloaderInterface:
@@ -133,6 +185,11 @@ class DownloaderAwarePriorityQueue:
     """ PriorityQueue which takes Downloader activity into account:
     domains (slots) with the least amount of active downloads are dequeued
     first.
+
+    The number of active downloads per slot is tracked through the
+    ``request_reached_downloader`` and ``request_left_downloader`` signals,
+    and slots are kept in a heap ordered by that number, so that dequeuing
+    does not require checking every slot.
     """
 
     @classmethod
@@ -157,9 +214,22 @@ class DownloaderAwarePriorityQueue:
         self.key = key
         self.crawler = crawler
 
+        self._active_downloads = {}  # slot -> number of active downloads
+        # (active downloads, slot) entries; entries are not removed when the
+        # number of active downloads of a slot changes, they are skipped in
+        # pop() instead
+        self._slots_heap = []
+        self._len = 0
+        crawler.signals.connect(self._request_reached_downloader,
+                                signals.request_reached_downloader)
+        crawler.signals.connect(self._request_left_downloader,
+                                signals.request_left_downloader)
+
         self.pqueues = {}  # slot -> priority queue
         for slot, startprios in (slot_startprios or {}).items():
             self.pqueues[slot] = self.pqfactory(slot, startprios)
+            self._len += len(self.pqueues[slot])
+            self._push_slot(slot)
 
     def pqfactory(self, slot, startprios=()):
         return ScrapyPriorityQueue(self.crawler,
@@ -167,34 +237,67 @@ class DownloaderAwarePriorityQueue:
                                    self.key + '/' + _path_safe(slot),
                                    startprios)
 
-    def pop(self):
-        stats = self._downloader_interface.stats(self.pqueues)
+    def _request_reached_downloader(self, request, spider):
+        self._update_active_downloads(request, 1)
 
-        if not stats:
-            return
+    def _request_left_downloader(self, request, spider):
+        self._update_active_downloads(request, -1)
 
-        slot = min(stats)[1]
-        queue = self.pqueues[slot]
-        request = queue.pop()
-        if len(queue) == 0:
-            del self.pqueues[slot]
-        return request
+    def _update_active_downloads(self, request, delta):
+        slot = self._downloader_interface.get_slot_key(request)
+        active = self._active_downloads.get(slot, 0) + delta
+        if active > 0:
+            self._active_downloads[slot] = active
+        else:
+            self._active_downloads.pop(slot, None)
+        if slot in self.pqueues:
+            self._push_slot(slot)
+
+    def _push_slot(self, slot):
+        if len(self._slots_heap) > 2 * len(self.pqueues) + 64:
+            # drop outdated entries
+            self._slots_heap = [(self._active_downloads.get(s, 0), s)
+                                for s in self.pqueues]
+            heapq.heapify(self._slots_heap)
+        heapq.heappush(self._slots_heap,
+                       (self._active_downloads.get(slot, 0), slot))
+
+    def pop(self):
+        heap = self._slots_heap
+        while heap:
+            active, slot = heap[0]
+            if slot not in self.pqueues or self._active_downloads.get(slot, 0) != active:
+                heapq.heappop(heap)
+                continue
+            queue = self.pqueues[slot]
+            request = queue.pop()
+            if len(queue) == 0:
+                del self.pqueues[slot]
+            if request is not None:
+                self._len -= 1
+                return request
 
     def push(self, request):
         slot = self._downloader_interface.get_slot_key(request)
         if slot not in self.pqueues:
             self.pqueues[slot] = self.pqfactory(slot)
+            self._push_slot(slot)
         queue = self.pqueues[slot]
         queue.push(request)
+        self._len += 1
 
     def close(self):
+        self.crawler.signals.disconnect(self._request_reached_downloader,
+                                        signals.request_reached_downloader)
+        self.crawler.signals.disconnect(self._request_left_downloader,
+                                        signals.request_left_downloader)
         active = {slot: queue.close()
                   for slot, queue in self.pqueues.items()}
         self.pqueues.clear()
         return active
 
     def __len__(self):
-        return sum(len(x) for x in self.pqueues.values()) if self.pqueues else 0
+        return self._len
 
     def __contains__(self, slot):
         return slot in self.pqueues
@@ -1,25 +1,85 @@
+from time import time
+
 from twisted.internet import defer
 from twisted.internet.base import ThreadedResolver
+from twisted.internet.error import DNSLookupError
 from twisted.internet.interfaces import IHostResolution, IHostnameResolver, IResolutionReceiver, IResolverSimple
+from twisted.python.failure import Failure
 from zope.interface.declarations import implementer, provider
 
 from scrapy.utils.datatypes import LocalCache
 
 
-# TODO: cache misses
-dnscache = LocalCache(10000)
+class ExpiringCache(LocalCache):
+    """LocalCache whose items expire ``ttl`` seconds after being set
+    (``None`` or ``0`` for items that do not expire).
+
+    Items are stored with their expiration time; expired items are removed
+    when they are looked up, or evicted like other items when the cache is
+    full.
+    """
+
+    def __init__(self, limit=None, ttl=None):
+        super().__init__(limit)
+        self.ttl = ttl
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def set(self, key, value, ttl=None):
+        """Set ``key`` to ``value``, expiring after ``ttl`` seconds instead of
+        :attr:`ttl` if given, e.g. the TTL of the DNS records"""
+        ttl = self.ttl if ttl is None else ttl
+        # re-set items go to the end, so that older items are evicted first
+        self.pop(key, None)
+        super().__setitem__(key, (value, time() + ttl if ttl else None))
+
+    def __getitem__(self, key):
+        value, expires = super().__getitem__(key)
+        if expires is not None and expires <= time():
+            del self[key]
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+dnscache = ExpiringCache(10000)
 
 
 @implementer(IResolverSimple)
 class CachingThreadedResolver(ThreadedResolver):
     """
     Default caching resolver. IPv4 only, supports setting a timeout value for DNS requests.
+
+    Resolved addresses are cached for ``ttl`` seconds, and lookup failures
+    other than timeouts for ``negative_ttl`` seconds. Concurrent lookups of
+    the same name share a single query, which :meth:`prefetch` can start
+    ahead of time.
+
+    The cache hits and misses, and the latency of the queries, are recorded
+    in the stats of ``crawlers``.
     """
 
-    def __init__(self, reactor, cache_size, timeout):
+    def __init__(self, reactor, cache_size, timeout, ttl=None, negative_ttl=None, crawlers=()):
         super().__init__(reactor)
         dnscache.limit = cache_size
+        dnscache.ttl = ttl
         self.timeout = timeout
+        self.failures = ExpiringCache(cache_size, negative_ttl) if cache_size and negative_ttl else None
+        self.crawlers = crawlers
+        self._lookups = {}  # name -> deferreds waiting for the ongoing query
 
     @classmethod
     def from_crawler(cls, crawler, reactor):
@@ -27,28 +87,100 @@ class CachingThreadedResolver(ThreadedResolver):
             cache_size = crawler.settings.getint('DNSCACHE_SIZE')
         else:
             cache_size = 0
-        return cls(reactor, cache_size, crawler.settings.getfloat('DNS_TIMEOUT'))
+        # the resolver is shared by the crawlers of a CrawlerProcess
+        return cls(reactor, cache_size, crawler.settings.getfloat('DNS_TIMEOUT'),
+                   ttl=crawler.settings.getfloat('DNSCACHE_TTL'),
+                   negative_ttl=crawler.settings.getfloat('DNSCACHE_NEGATIVE_TTL'),
+                   crawlers=getattr(crawler, 'crawlers', ()))
 
     def install_on_reactor(self):
         self.reactor.installResolver(self)
 
     def getHostByName(self, name, timeout=None):
-        if name in dnscache:
-            return defer.succeed(dnscache[name])
+        try:
+            result = dnscache[name]
+        except KeyError:
+            pass
+        else:
+            self._record_lookup('dnscache/hit')
+            return defer.succeed(result)
+        if self.failures is not None and name in self.failures:
+            self._record_lookup('dnscache/negative_hit')
+            return defer.fail(DNSLookupError(self.failures[name]))
+        if name in self._lookups:
+            self._record_lookup('dnscache/pending_hit')
+        else:
+            self._record_lookup('dnscache/miss')
+            self._query(name)
+        d = defer.Deferred()
+        self._lookups[name].append(d)
+        return d
+
+    def prefetch(self, name):
+        """Start resolving ``name`` unless it is cached or being resolved,
+        without counting a cache lookup in the stats. Return a deferred
+        fired with the result of the query, or ``None``."""
+        if name in dnscache or name in self._lookups:
+            return None
+        if self.failures is not None and name in self.failures:
+            return None
+        self._record('dnscache/prefetch')
+        self._query(name)
+        d = defer.Deferred()
+        self._lookups[name].append(d)
+        return d
+
+    def _query(self, name):
+        self._lookups[name] = []
         # in Twisted<=16.6, getHostByName() is always called with
         # a default timeout of 60s (actually passed as (1, 3, 11, 45) tuple),
-        # so the input argument above is simply overridden
+        # so the timeout argument of getHostByName() is simply overridden
         # to enforce Scrapy's DNS_TIMEOUT setting's value
-        timeout = (self.timeout,)
-        d = super().getHostByName(name, timeout)
-        if dnscache.limit:
-            d.addCallback(self._cache_result, name)
-        return d
+        d = super().getHostByName(name, (self.timeout,))
+        d.addBoth(self._query_done, name, time())
+
+    def _query_done(self, result, name, start):
+        latency = time() - start
+        if isinstance(result, Failure):
+            self._record('dns/failed')
+            # timeouts are often transient, and are not cached
+            if self.failures is not None and latency < self.timeout:
+                self.failures[name] = result.getErrorMessage()
+        else:
+            self._record('dns/resolved')
+            if dnscache.limit:
+                self._cache_result(result, name)
+        self._record_latency(latency)
+        for d in self._lookups.pop(name):
+            if isinstance(result, Failure):
+                d.errback(result)
+            else:
+                d.callback(result)
 
     def _cache_result(self, result, name):
         dnscache[name] = result
         return result
 
+    def _record(self, key):
+        for crawler in self.crawlers:
+            crawler.stats.inc_value(key)
+
+    def _record_lookup(self, key):
+        for crawler in self.crawlers:
+            stats = crawler.stats
+            stats.inc_value(key)
+            hits = stats.get_value('dnscache/hit', 0) + stats.get_value('dnscache/negative_hit', 0)
+            lookups = hits + stats.get_value('dnscache/pending_hit', 0) + stats.get_value('dnscache/miss', 0)
+            stats.set_value('dnscache/hit_rate', hits / lookups)
+
+    def _record_latency(self, latency):
+        for crawler in self.crawlers:
+            stats = crawler.stats
+            stats.inc_value('dns/latency/total', latency)
+            stats.max_value('dns/latency/max', latency)
+            queries = stats.get_value('dns/resolved', 0) + stats.get_value('dns/failed', 0)
+            stats.set_value('dns/latency/mean', stats.get_value('dns/latency/total') / queries)
+
 
 @implementer(IHostResolution)
 class HostResolution:
@@ -87,10 +219,11 @@ class CachingHostnameResolver:
     does not support setting a timeout value for DNS requests.
     """
 
-    def __init__(self, reactor, cache_size):
+    def __init__(self, reactor, cache_size, ttl=None):
         self.reactor = reactor
         self.original_resolver = reactor.nameResolver
         dnscache.limit = cache_size
+        dnscache.ttl = ttl
 
     @classmethod
     def from_crawler(cls, crawler, reactor):
@@ -98,7 +231,7 @@ class CachingHostnameResolver:
             cache_size = crawler.settings.getint('DNSCACHE_SIZE')
         else:
             cache_size = 0
-        return cls(reactor, cache_size)
+        return cls(reactor, cache_size, crawler.settings.getfloat('DNSCACHE_TTL'))
 
     def install_on_reactor(self):
         self.reactor.installNameResolver(self)
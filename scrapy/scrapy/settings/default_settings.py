@@ -23,7 +23,10 @@ ASYNCIO_EVENT_LOOP = None
 
 AUTOTHROTTLE_ENABLED = False
 AUTOTHROTTLE_DEBUG = False
+AUTOTHROTTLE_HISTORY_SIZE = 50
+AUTOTHROTTLE_MAX_CONCURRENCY = 16
 AUTOTHROTTLE_MAX_DELAY = 60.0
+AUTOTHROTTLE_MODE = 'delay'
 AUTOTHROTTLE_START_DELAY = 5.0
 AUTOTHROTTLE_TARGET_CONCURRENCY = 1.0
 
@@ -37,6 +40,7 @@ CLOSESPIDER_ERRORCOUNT = 0
 COMMANDS_MODULE = ''
 
 COMPRESSION_ENABLED = True
+COMPRESSION_STREAMING = False
 
 CONCURRENT_ITEMS = 100
 
@@ -46,6 +50,10 @@ CONCURRENT_REQUESTS_PER_IP = 0
 
 COOKIES_ENABLED = True
 COOKIES_DEBUG = False
+COOKIES_JARS_DIR = ''
+COOKIES_MAX_JARS = 0
+
+CRAWL_PROCESSES = 1
 
 DEFAULT_ITEM_CLASS = 'scrapy.item.Item'
 
@@ -59,7 +67,11 @@ DEPTH_STATS_VERBOSE = False
 DEPTH_PRIORITY = 0
 
 DNSCACHE_ENABLED = True
+DNSCACHE_NEGATIVE_TTL = 60
 DNSCACHE_SIZE = 10000
+DNSCACHE_TTL = 3600
+DNS_PREFETCH_CONCURRENCY = 8
+DNS_PREFETCH_ENABLED = False
 DNS_RESOLVER = 'scrapy.resolver.CachingThreadedResolver'
 DNS_TIMEOUT = 60
 
@@ -79,6 +91,7 @@ DOWNLOAD_TIMEOUT = 180      # 3mins
 
 DOWNLOAD_MAXSIZE = 1024 * 1024 * 1024   # 1024m
 DOWNLOAD_WARNSIZE = 32 * 1024 * 1024    # 32m
+DOWNLOAD_SPILLSIZE = 0
 
 DOWNLOAD_FAIL_ON_DATALOSS = True
 
@@ -112,9 +125,18 @@ DOWNLOADER_MIDDLEWARES_BASE = {
     # Downloader side
 }
 
+DOWNLOADER_POOL_IDLE_TIMEOUT = 240
+DOWNLOADER_POOL_SLOT_STATS = False
+
 DOWNLOADER_STATS = True
 
+DUPEFILTER_BLOOM_CAPACITY = 1000000
+DUPEFILTER_BLOOM_ERROR_RATE = 0.001
+DUPEFILTER_BLOOM_SCALABLE = True
 DUPEFILTER_CLASS = 'scrapy.dupefilters.RFPDupeFilter'
+DUPEFILTER_STORAGE = None
+DUPEFILTER_STORAGE_MIN_PENDING = 1024
+DUPEFILTER_STORAGE_MERGE_RATIO = 8
 
 EDITOR = 'vi'
 if sys.platform == 'win32':
@@ -124,6 +146,7 @@ EXTENSIONS = {}
 
 EXTENSIONS_BASE = {
     'scrapy.extensions.corestats.CoreStats': 0,
+    'scrapy.extensions.dnsprefetch.DnsPrefetch': 0,
     'scrapy.extensions.telnet.TelnetConsole': 0,
     'scrapy.extensions.memusage.MemoryUsage': 0,
     'scrapy.extensions.memdebug.MemoryDebugger': 0,
@@ -132,6 +155,7 @@ EXTENSIONS_BASE = {
     'scrapy.extensions.logstats.LogStats': 0,
     'scrapy.extensions.spiderstate.SpiderState': 0,
     'scrapy.extensions.throttle.AutoThrottle': 0,
+    'scrapy.extensions.profiler.Profiler': 0,
 }
 
 FEED_TEMPDIR = None
@@ -187,6 +211,10 @@ HTTPCACHE_IGNORE_RESPONSE_CACHE_CONTROLS = []
 HTTPCACHE_DBM_MODULE = 'dbm'
 HTTPCACHE_POLICY = 'scrapy.extensions.httpcache.DummyPolicy'
 HTTPCACHE_GZIP = False
+HTTPCACHE_SEGMENT_SIZE = 64 * 1024 * 1024
+HTTPCACHE_SEGMENT_COMPACT_RATIO = 0.5
+HTTPCACHE_THREADS = 0
+HTTPCACHE_WRITE_BATCH_SIZE = 100
 
 HTTPPROXY_ENABLED = True
 HTTPPROXY_AUTH_ENCODING = 'latin-1'
@@ -234,6 +262,13 @@ METAREFRESH_MAXDELAY = 100
 
 NEWSPIDER_MODULE = ''
 
+OFFLOAD_CALLBACKS = False
+OFFLOAD_PROCESSES = 0
+
+PROFILER_ENABLED = False
+PROFILER_LAG_INTERVAL = 0.1
+PROFILER_LOG_INTERVAL = 60.0
+
 RANDOMIZE_DOWNLOAD_DELAY = True
 
 REACTOR_THREADPOOL_MAXSIZE = 10
@@ -249,7 +284,12 @@ RETRY_ENABLED = True
 RETRY_TIMES = 2  # initial response + 2 retries = 3 requests
 RETRY_HTTP_CODES = [500, 502, 503, 504, 522, 524, 408, 429]
 RETRY_PRIORITY_ADJUST = -1
+RETRY_BACKOFF_BASE = 0
+RETRY_BACKOFF_MAX = 60
 
+ROBOTSTXT_CACHE_DIR = ''
+ROBOTSTXT_CACHE_EXPIRATION_SECS = 86400
+ROBOTSTXT_CACHE_SIZE = 10000
 ROBOTSTXT_OBEY = False
 ROBOTSTXT_PARSER = 'scrapy.robotstxt.ProtegoRobotParser'
 ROBOTSTXT_USER_AGENT = None
@@ -10,6 +10,7 @@ import warnings
 from scrapy import signals
 from scrapy.http import Request
 from scrapy.utils.httpobj import urlparse_cached
+from scrapy.utils.url import DomainMatcher
 
 logger = logging.getLogger(__name__)
 
@@ -43,19 +44,55 @@ class OffsiteMiddleware:
                 yield x
 
     def should_follow(self, request, spider):
-        regex = self.host_regex
         # hostname can be None for wrong urls (like javascript links)
         host = urlparse_cached(request).hostname or ''
-        return bool(regex.search(host))
+        if self.domain_matcher is not None:
+            return self.domain_matcher.match(host)
+        return bool(self.host_regex.search(host))
+
+    @property
+    def host_regex(self):
+        # only built when used, e.g. by subclasses overriding should_follow,
+        # since compiling a large number of allowed domains is slow
+        if self._host_regex is None:
+            with warnings.catch_warnings():
+                # already warned about when the spider was opened
+                warnings.simplefilter('ignore')
+                self._host_regex = self._compile_host_regex(self._allowed_domains)
+        return self._host_regex
+
+    @host_regex.setter
+    def host_regex(self, value):
+        self._host_regex = value
+        self.domain_matcher = None
 
     def get_host_regex(self, spider):
         """Override this method to implement a different offsite policy"""
-        allowed_domains = getattr(spider, 'allowed_domains', None)
+        return self._compile_host_regex(getattr(spider, 'allowed_domains', None))
+
+    def _compile_host_regex(self, allowed_domains):
         if not allowed_domains:
             return re.compile('')  # allow all by default
+        domains = [re.escape(d) for d in self._get_allowed_domains(allowed_domains)]
+        regex = fr'^(.*\.)?({"|".join(domains)})$'
+        return re.compile(regex)
+
+    def get_domain_matcher(self, spider):
+        """Return a :class:`~scrapy.utils.url.DomainMatcher` for the allowed
+        domains of the spider, or ``None`` if all domains are allowed.
+
+        Unless :meth:`get_host_regex` is overridden, this is used instead of
+        it, since matching requests against a large number of allowed domains
+        is much faster this way.
+        """
+        allowed_domains = getattr(spider, 'allowed_domains', None)
+        if not allowed_domains:
+            return None  # allow all by default
+        return DomainMatcher(self._get_allowed_domains(allowed_domains))
+
+    def _get_allowed_domains(self, allowed_domains):
         url_pattern = re.compile(r"^https?://.*$")
         port_pattern = re.compile(r":\d+$")
-        domains = []
         for domain in allowed_domains:
             if domain is None:
                 continue
@@ -68,12 +105,15 @@ class OffsiteMiddleware:
                            f"Ignoring entry {domain} in allowed_domains.")
                 warnings.warn(message, PortWarning)
             else:
-                domains.append(re.escape(domain))
-        regex = fr'^(.*\.)?({"|".join(domains)})$'
-        return re.compile(regex)
+                yield domain
 
     def spider_opened(self, spider):
-        self.host_regex = self.get_host_regex(spider)
+        self._allowed_domains = getattr(spider, 'allowed_domains', None)
+        if type(self).get_host_regex is OffsiteMiddleware.get_host_regex:
+            self._host_regex = None
+            self.domain_matcher = self.get_domain_matcher(spider)
+        else:
+            self.host_regex = self.get_host_regex(spider)
         self.domains_seen = set()
 
 
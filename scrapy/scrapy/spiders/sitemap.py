@@ -1,10 +1,11 @@
 import re
 import logging
+import zlib
 
 from scrapy.spiders import Spider
 from scrapy.http import Request, XmlResponse
 from scrapy.utils.sitemap import Sitemap, sitemap_urls_from_robots
-from scrapy.utils.gz import gunzip, gzip_magic_number
+from scrapy.utils.gz import gunzip_chunks, gzip_magic_number
 
 
 logger = logging.getLogger(__name__)
@@ -43,13 +44,22 @@ class SitemapSpider(Spider):
             for url in sitemap_urls_from_robots(response.text, base_url=response.url):
                 yield Request(url, callback=self._parse_sitemap)
         else:
-            body = self._get_sitemap_body(response)
+            if type(self)._get_sitemap_body is not SitemapSpider._get_sitemap_body:
+                body = self._get_sitemap_body(response)
+            else:
+                # the sitemap is parsed as it is decompressed
+                body = self._get_sitemap_chunks(response)
             if body is None:
                 logger.warning("Ignoring invalid sitemap: %(response)s",
                                {'response': response}, extra={'spider': self})
                 return
 
-            s = Sitemap(body)
+            try:
+                s = Sitemap(body)
+            except zlib.error:
+                logger.warning("Ignoring invalid sitemap: %(response)s",
+                               {'response': response}, extra={'spider': self})
+                return
             it = self.sitemap_filter(s)
 
             if s.type == 'sitemapindex':
@@ -67,10 +77,18 @@ class SitemapSpider(Spider):
         """Return the sitemap body contained in the given response,
         or None if the response is not a sitemap.
         """
+        chunks = self._get_sitemap_chunks(response)
+        if chunks is not None:
+            return b''.join(chunks)
+
+    def _get_sitemap_chunks(self, response):
+        """Return an iterator over the chunks of the sitemap body contained
+        in the given response, or None if the response is not a sitemap.
+        """
         if isinstance(response, XmlResponse):
-            return response.body
+            return iter((response.body,))
         elif gzip_magic_number(response):
-            return gunzip(response.body)
+            return gunzip_chunks(response.body)
         # actual gzipped sitemap files are decompressed above ;
         # if we are here (response body is not gzipped)
         # and have a response for .xml.gz,
@@ -81,7 +99,7 @@ class SitemapSpider(Spider):
         # merely XML gzip-compressed on the fly,
         # in other word, here, we have plain XML
         elif response.url.endswith('.xml') or response.url.endswith('.xml.gz'):
-            return response.body
+            return iter((response.body,))
 
 
 def regex(x):
@@ -8,7 +8,7 @@ import pickle
 
 from queuelib import queue
 
-from scrapy.utils.reqser import request_to_dict, request_from_dict
+from scrapy.utils.reqser import RequestCodec, request_to_dict, request_from_dict
 
 
 def _with_mkdir(queue_class):
@@ -25,6 +25,18 @@ def _with_mkdir(queue_class):
     return DirectoriesCreated
 
 
+class _BufferedFifoDiskQueue(queue.BufferedFifoDiskQueue):
+    """FIFO disk queue used for JOBDIR crawls: writes and reads are buffered,
+    and the queue state is saved every few seconds, so that a crawl that was
+    not stopped properly can be resumed close to where it stopped."""
+
+    checkpoint_interval = 5
+
+    def __init__(self, path, chunksize=100000):
+        super().__init__(path, chunksize,
+                         checkpoint_interval=self.checkpoint_interval)
+
+
 def _serializable_queue(queue_class, serialize, deserialize):
 
     class SerializableQueue(queue_class):
@@ -69,6 +81,98 @@ def _scrapy_serialization_queue(queue_class):
     return ScrapyRequestQueue
 
 
+def _scrapy_compact_queue(queue_class):
+
+    class ScrapyCompactRequestQueue(queue_class):
+        """Request queue serializing requests with
+        :class:`~scrapy.utils.reqser.RequestCodec`. The codec symbols are
+        appended to a ``<key>.symbols`` file as they are created, so that the
+        queue can be reopened."""
+
+        def __init__(self, crawler, key):
+            self.symbols_path = key + '.symbols'
+            symbols = []
+            if os.path.exists(self.symbols_path):
+                with open(self.symbols_path, 'rb') as f:
+                    while True:
+                        try:
+                            symbols.append(pickle.load(f))
+                        except EOFError:
+                            break
+            self.codec = RequestCodec(crawler.spider, symbols)
+            self._saved_symbols = len(symbols)
+            super().__init__(key)
+            self._symbols_file = open(self.symbols_path, 'ab')
+
+        @classmethod
+        def from_crawler(cls, crawler, key, *args, **kwargs):
+            return cls(crawler, key)
+
+        def push(self, request):
+            data = self.codec.encode(request)
+            symbols = self.codec.symbols
+            if len(symbols) > self._saved_symbols:
+                for symbol in symbols[self._saved_symbols:]:
+                    pickle.dump(symbol, self._symbols_file, protocol=4)
+                self._symbols_file.flush()
+                self._saved_symbols = len(symbols)
+            super().push(data)
+
+        def pop(self):
+            data = super().pop()
+            if data:
+                return self.codec.decode(data)
+
+        def close(self):
+            self._symbols_file.close()
+            super().close()
+            if not len(self):
+                os.remove(self.symbols_path)
+
+    return ScrapyCompactRequestQueue
+
+
+def _scrapy_compact_memory_queue(queue_class):
+
+    class ScrapyCompactMemoryQueue:
+        """Memory queue keeping requests serialized with
+        :class:`~scrapy.utils.reqser.RequestCodec` until they are popped,
+        which uses a fraction of the memory of request objects. Requests that
+        cannot be serialized are kept as they are.
+
+        It wraps a ``queue_class`` instance instead of subclassing it, since
+        queuelib memory queues may bind ``push`` on their instances."""
+
+        def __init__(self, crawler):
+            self.queue = queue_class()
+            self.codec = RequestCodec(crawler.spider)
+
+        @classmethod
+        def from_crawler(cls, crawler, *args, **kwargs):
+            return cls(crawler)
+
+        def push(self, request):
+            try:
+                data = self.codec.encode(request)
+            except ValueError:
+                data = request
+            self.queue.push(data)
+
+        def pop(self):
+            data = self.queue.pop()
+            if isinstance(data, bytes):
+                return self.codec.decode(data)
+            return data
+
+        def close(self):
+            self.queue.close()
+
+        def __len__(self):
+            return len(self.queue)
+
+    return ScrapyCompactMemoryQueue
+
+
 def _scrapy_non_serialization_queue(queue_class):
 
     class ScrapyRequestQueue(queue_class):
@@ -89,7 +193,7 @@ def _pickle_serialize(obj):
 
 
 PickleFifoDiskQueueNonRequest = _serializable_queue(
-    _with_mkdir(queue.FifoDiskQueue),
+    _with_mkdir(_BufferedFifoDiskQueue),
     _pickle_serialize,
     pickle.loads
 )
@@ -99,7 +203,7 @@ PickleLifoDiskQueueNonRequest = _serializable_queue(
     pickle.loads
 )
 MarshalFifoDiskQueueNonRequest = _serializable_queue(
-    _with_mkdir(queue.FifoDiskQueue),
+    _with_mkdir(_BufferedFifoDiskQueue),
     marshal.dumps,
     marshal.loads
 )
@@ -121,5 +225,13 @@ MarshalFifoDiskQueue = _scrapy_serialization_queue(
 MarshalLifoDiskQueue = _scrapy_serialization_queue(
     MarshalLifoDiskQueueNonRequest
 )
+CompactFifoDiskQueue = _scrapy_compact_queue(
+    _with_mkdir(_BufferedFifoDiskQueue)
+)
+CompactLifoDiskQueue = _scrapy_compact_queue(
+    _with_mkdir(queue.LifoDiskQueue)
+)
 FifoMemoryQueue = _scrapy_non_serialization_queue(queue.FifoMemoryQueue)
 LifoMemoryQueue = _scrapy_non_serialization_queue(queue.LifoMemoryQueue)
+CompactFifoMemoryQueue = _scrapy_compact_memory_queue(queue.FifoMemoryQueue)
+CompactLifoMemoryQueue = _scrapy_compact_memory_queue(queue.LifoMemoryQueue)
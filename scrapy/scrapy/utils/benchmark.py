@@ -0,0 +1,334 @@
+"""
+Component benchmarks, run by the :command:`benchsuite` command.
+
+Each benchmark measures a single Scrapy component outside of a running crawl,
+so that a performance regression can be traced to the component causing it.
+"""
+import os
+import platform
+import shutil
+import sys
+import tempfile
+from io import BytesIO
+from time import perf_counter
+
+from twisted.internet import defer
+
+import scrapy
+from scrapy import signals
+from scrapy.crawler import Crawler
+from scrapy.http import HtmlResponse, Request, Response
+from scrapy.settings import Settings
+from scrapy.spiders import Spider
+from scrapy.utils.misc import load_object
+
+
+# benchmark name -> (function, settings)
+BENCHMARKS = {}
+
+
+def benchmark(name, settings=None):
+    """Register the decorated function as the benchmark ``name``.
+
+    The function is called with a crawler, the number of operations to
+    perform and a :class:`Timer`, which must be used to time the measured
+    part of the benchmark. It returns the number of operations performed.
+
+    ``settings`` are set on the crawler, with :setting:`JOBDIR` and
+    :setting:`HTTPCACHE_DIR` relative to a temporary directory removed after
+    the benchmark.
+    """
+    def decorator(func):
+        BENCHMARKS[name] = (func, settings or {})
+        return func
+    return decorator
+
+
+class Timer:
+    """Context manager adding the time spent within it to :attr:`elapsed`"""
+
+    def __init__(self):
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.elapsed += perf_counter() - self._start
+
+
+class BenchmarkSpider(Spider):
+    name = 'benchmark'
+
+
+def select_benchmarks(names=()):
+    """Return the names of the benchmarks matching ``names``, which are
+    benchmark names or name prefixes (e.g. ``exporter`` selects all the item
+    exporter benchmarks), or of all the benchmarks if ``names`` is empty"""
+    if not names:
+        return list(BENCHMARKS)
+    selected = []
+    for name in names:
+        matches = [b for b in BENCHMARKS if b == name or b.startswith(name + '.')]
+        if not matches:
+            raise KeyError(name)
+        selected.extend(m for m in matches if m not in selected)
+    return selected
+
+
+def run_benchmark(name, settings=None, size=10000, repeat=3):
+    """Run the benchmark ``name`` ``repeat`` times and return its fastest run
+    as a dict with the number of operations, the time taken in seconds and
+    the number of operations per second"""
+    func, benchmark_settings = BENCHMARKS[name]
+    best = None
+    for _ in range(repeat):
+        tmpdir = tempfile.mkdtemp(prefix='scrapy-benchmark-')
+        try:
+            crawler = _create_crawler(settings, benchmark_settings, tmpdir)
+            timer = Timer()
+            operations = func(crawler, size, timer)
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        if best is None or timer.elapsed < best[1]:
+            best = (operations, timer.elapsed)
+    operations, seconds = best
+    return {
+        'operations': operations,
+        'seconds': seconds,
+        'rate': operations / seconds if seconds else float('inf'),
+    }
+
+
+def run_benchmarks(names=(), settings=None, size=10000, repeat=3):
+    """Run the benchmarks selected by ``names`` (see
+    :func:`select_benchmarks`) and return their results, along with the
+    environment they were run in, in a JSON-serializable dict"""
+    results = {}
+    for name in select_benchmarks(names):
+        results[name] = run_benchmark(name, settings, size, repeat)
+    return {
+        'environment': {
+            'scrapy': scrapy.__version__,
+            'python': sys.version.split()[0],
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+        },
+        'size': size,
+        'benchmarks': results,
+    }
+
+
+def compare_results(results, baseline, threshold=10.0):
+    """Compare the ``results`` of :func:`run_benchmarks` with a ``baseline``
+    of previous results.
+
+    Return a list of ``(name, rate, baseline rate, change)`` tuples, where
+    ``change`` is the relative change of the rate in percent, for the
+    benchmarks found in both, and the list of the names of the benchmarks
+    whose rate decreased by more than ``threshold`` percent.
+    """
+    comparison = []
+    regressions = []
+    baseline = baseline.get('benchmarks', {})
+    for name, result in results['benchmarks'].items():
+        if name not in baseline:
+            continue
+        base_rate = baseline[name]['rate']
+        change = (result['rate'] - base_rate) / base_rate * 100
+        comparison.append((name, result['rate'], base_rate, change))
+        if change < -threshold:
+            regressions.append(name)
+    return comparison, regressions
+
+
+def _create_crawler(settings, benchmark_settings, tmpdir):
+    settings = Settings(settings)
+    settings.setdict({
+        'JOBDIR': None,
+        'HTTPCACHE_DIR': 'httpcache',
+        'LOG_ENABLED': False,
+        'TELNETCONSOLE_ENABLED': False,
+    }, priority='cmdline')
+    settings.setdict(benchmark_settings, priority='cmdline')
+    for name in ('JOBDIR', 'HTTPCACHE_DIR'):
+        if settings[name]:
+            settings.set(name, os.path.join(tmpdir, settings[name]), priority='cmdline')
+    crawler = Crawler(BenchmarkSpider, settings)
+    crawler.spider = crawler._create_spider()
+    return crawler
+
+
+def _requests(size, domains=100):
+    return [
+        Request(f'http://www{i % domains}.example.com/page/{i}?sort=price&page={i // domains}',
+                priority=i % 5)
+        for i in range(size)
+    ]
+
+
+def _scheduler(crawler, size, timer):
+    scheduler = load_object(crawler.settings['SCHEDULER']).from_crawler(crawler)
+    scheduler.open(crawler.spider)
+    requests = _requests(size)
+    with timer:
+        for request in requests:
+            scheduler.enqueue_request(request)
+        while scheduler.next_request() is not None:
+            pass
+    scheduler.close('finished')
+    return 2 * size
+
+
+@benchmark('scheduler.memory')
+def _scheduler_memory(crawler, size, timer):
+    return _scheduler(crawler, size, timer)
+
+
+@benchmark('scheduler.disk', {'JOBDIR': 'job'})
+def _scheduler_disk(crawler, size, timer):
+    return _scheduler(crawler, size, timer)
+
+
+@benchmark('scheduler.downloader_aware',
+           {'SCHEDULER_PRIORITY_QUEUE': 'scrapy.pqueues.DownloaderAwarePriorityQueue'})
+def _scheduler_downloader_aware(crawler, size, timer):
+    crawler.engine = crawler._create_engine()
+    try:
+        return _scheduler(crawler, size, timer)
+    finally:
+        crawler.engine.downloader.close()
+
+
+@benchmark('dupefilter')
+def _dupefilter(crawler, size, timer):
+    dupefilter = load_object(crawler.settings['DUPEFILTER_CLASS']).from_settings(crawler.settings)
+    requests = _requests(size)
+    with timer:
+        # every request is seen twice
+        for request in requests:
+            dupefilter.request_seen(request)
+        for request in requests:
+            dupefilter.request_seen(request)
+    dupefilter.close('finished')
+    return 2 * size
+
+
+# robots.txt files would have to be downloaded by an engine
+@benchmark('downloadermw', {'ROBOTSTXT_OBEY': False})
+def _downloader_middleware(crawler, size, timer):
+    from scrapy.core.downloader.middleware import DownloaderMiddlewareManager
+    spider = crawler.spider
+    mwman = DownloaderMiddlewareManager.from_crawler(crawler)
+    crawler.signals.send_catch_log(signals.spider_opened, spider=spider)
+    requests = _requests(size)
+    body = b'<html><body>benchmark</body></html>'
+    headers = {'Content-Type': 'text/html', 'Set-Cookie': 'session=1'}
+    results = []
+
+    def download_func(request, spider):
+        return defer.succeed(Response(request.url, headers=headers, body=body, request=request))
+
+    with timer:
+        for request in requests:
+            mwman.download(download_func, request, spider).addBoth(results.append)
+    failures = [r for r in results if not isinstance(r, Response)]
+    if failures:
+        failures[0].raiseException()
+    return size
+
+
+def _links_page(links):
+    menu = ''.join(f'<li><a href="/category/{i}/">Category {i}</a></li>' for i in range(50))
+    items = ''.join(
+        f'<div class="item"><a href="/product/{i}.html?ref=list"><img src="/img/{i}.jpg"></a>'
+        f'<h2><a href="/product/{i}.html?ref=list">Product {i}</a></h2>'
+        f'<a href="https://partner{i % 20}.example.org/offer/{i}" rel="nofollow">Offer</a></div>'
+        for i in range(links)
+    )
+    body = f'<html><body><nav><ul>{menu}</ul></nav><main>{items}</main></body></html>'
+    return body.encode()
+
+
+@benchmark('linkextractor')
+def _link_extractor(crawler, size, timer):
+    from scrapy.linkextractors import LinkExtractor
+    body = _links_page(200)
+    responses = [HtmlResponse(f'http://www.example.com/list/{i}', body=body)
+                 for i in range(max(1, size // 1000))]
+    link_extractor = LinkExtractor()
+    links = 0
+    with timer:
+        for response in responses:
+            links += len(link_extractor.extract_links(response))
+    return links
+
+
+def _items(size):
+    return [
+        {
+            'url': f'http://www.example.com/product/{i}.html',
+            'name': f'Product {i}',
+            'price': i * 0.25,
+            'tags': ['one', 'two', 'three'],
+            'description': 'Lorem ipsum dolor sit amet. ' * 5,
+        }
+        for i in range(size)
+    ]
+
+
+def _exporter_benchmark(exporter_cls):
+    def _exporter(crawler, size, timer):
+        items = _items(size)
+        exporter = exporter_cls(BytesIO())
+        with timer:
+            exporter.start_exporting()
+            for item in items:
+                exporter.export_item(item)
+            exporter.finish_exporting()
+        return size
+    return _exporter
+
+
+def _register_exporter_benchmarks():
+    registered = set()
+    for fmt, path in Settings().getwithbase('FEED_EXPORTERS').items():
+        if path not in registered:
+            registered.add(path)
+            benchmark(f'exporter.{fmt}')(_exporter_benchmark(load_object(path)))
+
+
+_register_exporter_benchmarks()
+
+
+def _httpcache_benchmark(storage_path):
+    def _httpcache(crawler, size, timer):
+        storage = load_object(storage_path)(crawler.settings)
+        spider = crawler.spider
+        storage.open_spider(spider)
+        # cache storages write to disk, keep them to a tenth of the size
+        requests = _requests(max(1, size // 10))
+        body = b'<html><body>' + b'benchmark ' * 2000 + b'</body></html>'
+        responses = [Response(r.url, headers={'Content-Type': 'text/html'}, body=body)
+                     for r in requests]
+        with timer:
+            for request, response in zip(requests, responses):
+                storage.store_response(spider, request, response)
+            for request in requests:
+                storage.retrieve_response(spider, request)
+        storage.close_spider(spider)
+        return 2 * len(requests)
+    return _httpcache
+
+
+def _register_httpcache_benchmarks():
+    for name, path in [
+        ('dbm', 'scrapy.extensions.httpcache.DbmCacheStorage'),
+        ('filesystem', 'scrapy.extensions.httpcache.FilesystemCacheStorage'),
+        ('segment', 'scrapy.extensions.httpcache.SegmentCacheStorage'),
+    ]:
+        benchmark(f'httpcache.{name}')(_httpcache_benchmark(path))
+
+
+_register_httpcache_benchmarks()
@@ -0,0 +1,220 @@
+"""
+Bloom filters, used to check set membership with a bounded false positive rate
+and a fixed memory usage.
+
+Items are expected to be hash digests (e.g. request fingerprints), given either
+as raw bytes or as hexadecimal strings, at least 16 bytes long. Their bytes are
+used directly to compute bit positions (using double hashing), so no further
+hashing is performed.
+"""
+
+import json
+import math
+import mmap
+import os
+
+
+def _to_digest(item):
+    if isinstance(item, str):
+        return bytes.fromhex(item)
+    return bytes(item)
+
+
+class BloomFilter:
+    """A Bloom filter sized to hold ``capacity`` items with a false positive
+    rate of ``error_rate``.
+
+    If ``path`` is given the bit array is stored in that file, which is
+    memory-mapped, and it is reused if it already exists.
+    """
+
+    def __init__(self, capacity, error_rate, path=None):
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1: %r" % error_rate)
+        if capacity <= 0:
+            raise ValueError("capacity must be positive: %r" % capacity)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.count = 0
+        self.set_bits = 0
+        self.path = path
+        size = (self.num_bits + 7) // 8
+        if path is None:
+            self.bits = bytearray(size)
+        else:
+            with open(path, 'a+b') as f:
+                if os.path.getsize(path) != size:
+                    f.truncate(size)
+                self.bits = mmap.mmap(f.fileno(), size)
+
+    def _positions(self, digest):
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:16], 'big') | 1
+        num_bits = self.num_bits
+        return [(h1 + i * h2) % num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, item):
+        bits = self.bits
+        for pos in self._positions(_to_digest(item)):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+    def add(self, item):
+        """Add ``item`` to the filter. Return ``False`` if it was (probably)
+        already present, ``True`` otherwise."""
+        bits = self.bits
+        new_bits = 0
+        for pos in self._positions(_to_digest(item)):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                new_bits += 1
+        if not new_bits:
+            return False
+        self.set_bits += new_bits
+        self.count += 1
+        return True
+
+    @property
+    def fill_ratio(self):
+        """Ratio of bits set in the bit array"""
+        return self.set_bits / self.num_bits
+
+    @property
+    def estimated_error_rate(self):
+        """False positive rate estimated from the current fill ratio"""
+        return self.fill_ratio ** self.num_hashes
+
+    @property
+    def nbytes(self):
+        return len(self.bits)
+
+    def close(self):
+        if self.path is not None:
+            self.bits.flush()
+            self.bits.close()
+
+
+class ScalableBloomFilter:
+    """A scalable Bloom filter (Almeida et al., 2007).
+
+    When the current filter holds ``capacity`` items, a new filter is added
+    with ``growth`` times its capacity and ``tightening`` times its error rate,
+    so that the compound false positive rate stays under ``error_rate``. If
+    ``scalable`` is ``False`` a single filter is used, which keeps memory usage
+    fixed but lets its false positive rate grow once it is over capacity.
+
+    If ``path`` is given, filters are stored in memory-mapped files inside that
+    directory, along with an ``info.json`` file holding their item counts
+    (updated when a filter is added and on :meth:`close`), and an existing
+    filter is loaded from there (in which case its original parameters are
+    used).
+    """
+
+    growth = 2
+    tightening = 0.5
+
+    def __init__(self, capacity, error_rate, path=None, scalable=True):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.path = path
+        self.scalable = scalable
+        self.filters = []
+        counts = []
+        if path is not None:
+            if not os.path.exists(path):
+                os.makedirs(path)
+            info = self._read_info()
+            if info:
+                self.capacity = info['capacity']
+                self.error_rate = info['error_rate']
+                self.scalable = info['scalable']
+                counts = info['filters']
+        for count, set_bits in counts:
+            bf = self._add_filter()
+            bf.count, bf.set_bits = count, set_bits
+        if not self.filters:
+            self._add_filter()
+        if path is not None:
+            self._write_info()
+
+    def _read_info(self):
+        info_path = os.path.join(self.path, 'info.json')
+        if not os.path.exists(info_path):
+            return None
+        with open(info_path) as f:
+            return json.load(f)
+
+    def _add_filter(self):
+        i = len(self.filters)
+        # the first filter gets error_rate * (1 - tightening) so that the sum
+        # of the error rates of all filters converges to error_rate
+        error_rate = self.error_rate * (1 - self.tightening) * self.tightening ** i
+        if not self.scalable:
+            error_rate = self.error_rate
+        path = None
+        if self.path is not None:
+            path = os.path.join(self.path, 'filter-%d' % i)
+        bf = BloomFilter(self.capacity * self.growth ** i, error_rate, path)
+        self.filters.append(bf)
+        return bf
+
+    def __contains__(self, item):
+        digest = _to_digest(item)
+        return any(digest in bf for bf in reversed(self.filters))
+
+    def __len__(self):
+        return sum(bf.count for bf in self.filters)
+
+    def add(self, item):
+        """Add ``item`` to the filter. Return ``False`` if it was (probably)
+        already present, ``True`` otherwise."""
+        digest = _to_digest(item)
+        current = self.filters[-1]
+        if any(digest in bf for bf in self.filters[:-1]):
+            return False
+        if current.count >= current.capacity and self.scalable and digest not in current:
+            current = self._add_filter()
+            if self.path is not None:
+                self._write_info()
+        return current.add(digest)
+
+    @property
+    def fill_ratio(self):
+        """Fill ratio of the filter currently receiving new items"""
+        return self.filters[-1].fill_ratio
+
+    @property
+    def estimated_error_rate(self):
+        """Compound false positive rate estimated from the fill ratio of each
+        filter"""
+        rate = 1.0
+        for bf in self.filters:
+            rate *= 1 - bf.estimated_error_rate
+        return 1 - rate
+
+    @property
+    def nbytes(self):
+        return sum(bf.nbytes for bf in self.filters)
+
+    def _write_info(self):
+        info = {
+            'capacity': self.capacity,
+            'error_rate': self.error_rate,
+            'scalable': self.scalable,
+            'filters': [(bf.count, bf.set_bits) for bf in self.filters],
+        }
+        with open(os.path.join(self.path, 'info.json'), 'w') as f:
+            json.dump(info, f)
+
+    def close(self):
+        if self.path is not None:
+            self._write_info()
+        for bf in self.filters:
+            bf.close()
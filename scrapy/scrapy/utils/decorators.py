@@ -43,3 +43,11 @@ def inthread(func):
     def wrapped(*a, **kw):
         return threads.deferToThread(func, *a, **kw)
     return wrapped
+
+
+def offload(func):
+    """Decorator to run a spider callback in a separate process (see
+    :setting:`OFFLOAD_CALLBACKS`)
+    """
+    func.offload = True
+    return func
@@ -4,6 +4,7 @@ Helper functions for dealing with Twisted deferreds
 import asyncio
 import inspect
 from functools import wraps
+from types import GeneratorType
 
 from twisted.internet import defer, task
 from twisted.python import failure
@@ -75,29 +76,84 @@ def parallel(iterable, count, callable, *args, **named):
     return defer.DeferredList([coop.coiterate(work) for _ in range(count)])
 
 
-def process_chain(callbacks, input, *a, **kw):
-    """Return a Deferred built by chaining the given callbacks"""
+def _is_async(result):
+    """Return whether ``result`` is a Deferred or an awaitable, checking the
+    common synchronous results first, as this is called for every middleware
+    call"""
+    if result is None:
+        return False
+    if isinstance(result, defer.Deferred) or hasattr(type(result), '__await__'):
+        return True
+    # generator-based coroutines
+    return isinstance(result, GeneratorType) and inspect.isawaitable(result)
+
+
+def _chained(result):
+    """Return a new Deferred fired with the result of ``result``, a Deferred
+    or a coroutine, so that callbacks are not added to a Deferred owned by
+    the code which returned it"""
     d = defer.Deferred()
-    for x in callbacks:
-        d.addCallback(x, *a, **kw)
-    d.callback(input)
+    deferred_from_coro(result).chainDeferred(d)
     return d
 
 
+def process_chain(callbacks, input, *a, **kw):
+    """Return a Deferred built by chaining the given callbacks.
+
+    The callbacks are called right away, as long as they return synchronously;
+    the remaining ones are only chained to a Deferred once a callback returns
+    one, or a coroutine.
+    """
+    callbacks = iter(callbacks)
+    result = input
+    for cb in callbacks:
+        try:
+            result = cb(result, *a, **kw)
+        except Exception:
+            return defer.fail(failure.Failure())
+        if isinstance(result, failure.Failure):
+            return defer.fail(result)
+        if _is_async(result):
+            d = _chained(result)
+            for cb in callbacks:
+                d.addCallback(cb, *a, **kw)
+            return d
+    return defer.succeed(result)
+
+
 def process_chain_both(callbacks, errbacks, input, *a, **kw):
-    """Return a Deferred built by chaining the given callbacks and errbacks"""
-    d = defer.Deferred()
-    for cb, eb in zip(callbacks, errbacks):
-        d.addCallbacks(
-            callback=cb, errback=eb,
-            callbackArgs=a, callbackKeywords=kw,
-            errbackArgs=a, errbackKeywords=kw,
-        )
-    if isinstance(input, failure.Failure):
-        d.errback(input)
-    else:
-        d.callback(input)
-    return d
+    """Return a Deferred built by chaining the given callbacks and errbacks.
+
+    As with :func:`process_chain`, the callbacks and errbacks are called right
+    away until one of them returns a Deferred or a coroutine.
+    """
+    pairs = zip(callbacks, errbacks)
+    result = input
+    for cb, eb in pairs:
+        func = eb if isinstance(result, failure.Failure) else cb
+        if func is None:
+            continue
+        try:
+            result = func(result, *a, **kw)
+        except Exception:
+            result = failure.Failure()
+            continue
+        if _is_async(result):
+            d = _chained(result)
+            for cb, eb in pairs:
+                d.addCallbacks(
+                    callback=cb or _passthrough, errback=eb or _passthrough,
+                    callbackArgs=a, callbackKeywords=kw,
+                    errbackArgs=a, errbackKeywords=kw,
+                )
+            return d
+    if isinstance(result, failure.Failure):
+        return defer.fail(result)
+    return defer.succeed(result)
+
+
+def _passthrough(result, *a, **kw):
+    return result
 
 
 def process_parallel(callbacks, input, *a, **kw):
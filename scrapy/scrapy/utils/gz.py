@@ -1,4 +1,5 @@
 import struct
+import zlib
 from gzip import GzipFile
 from io import BytesIO
 
@@ -41,5 +42,93 @@ def gunzip(data):
     return b''.join(output_list)
 
 
+class IncrementalDecoder:
+    """Decode a gzip or deflate encoded body as its chunks are received.
+
+    Like :func:`gunzip`, decoding stops without error when corrupted data is
+    found after some data has been decoded. If the data is corrupted from the
+    start, :meth:`decode` raises :exc:`zlib.error`, and the chunks received so
+    far are available in :attr:`received`.
+    """
+
+    # window bits to try for each encoding, see zlib.decompressobj
+    encodings = {
+        b'gzip': (31,),
+        b'x-gzip': (31,),
+        # zlib stream, or raw deflate stream sent by some servers
+        b'deflate': (15, -15),
+    }
+
+    def __init__(self, encoding):
+        self.wbits = list(self.encodings[encoding])
+        self.received = []  # only kept until some data is decoded
+        self._decompressor = zlib.decompressobj(self.wbits[0])
+        self._stopped = False
+
+    def decode(self, data):
+        """Return the decoded data available after receiving ``data``"""
+        if self._stopped:
+            return b''
+        if self.received is not None:
+            self.received.append(data)
+        try:
+            decoded = self._decode(data)
+        except zlib.error:
+            if self.received is None:
+                self._stopped = True
+                return b''
+            self.wbits.pop(0)
+            if not self.wbits:
+                raise
+            self._decompressor = zlib.decompressobj(self.wbits[0])
+            received, self.received = self.received, []
+            return self.decode(b''.join(received))
+        if decoded:
+            self.received = None
+        return decoded
+
+    def _decode(self, data):
+        decoded = [self._decompressor.decompress(data)]
+        # concatenated gzip members
+        while self._decompressor.eof and self._decompressor.unused_data \
+                and self.wbits[0] == 31:
+            data = self._decompressor.unused_data
+            self._decompressor = zlib.decompressobj(31)
+            try:
+                decoded.append(self._decompressor.decompress(data))
+            except zlib.error:
+                # trailing garbage
+                self._stopped = True
+                break
+        return b''.join(decoded)
+
+    def flush(self):
+        """Return the remaining decoded data"""
+        if self._stopped:
+            return b''
+        try:
+            return self._decompressor.flush()
+        except zlib.error:
+            return b''
+
+
+def gunzip_chunks(data, chunk_size=16384):
+    """Gunzip the given data and return an iterator over the decompressed
+    chunks, so that the whole decompressed data is never held in memory.
+
+    Like :func:`gunzip`, this is resilient to CRC checksum errors, and
+    :exc:`zlib.error` is raised if the data is not gzipped.
+    """
+    decoder = IncrementalDecoder(b'gzip')
+    view = memoryview(data)
+    for start in range(0, len(data), chunk_size):
+        chunk = decoder.decode(view[start:start + chunk_size])
+        if chunk:
+            yield chunk
+    chunk = decoder.flush()
+    if chunk:
+        yield chunk
+
+
 def gzip_magic_number(response):
     return response.body[:3] == b'\x1f\x8b\x08'
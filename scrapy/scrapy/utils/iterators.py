@@ -62,6 +62,10 @@ def xmliter_lxml(obj, nodename, namespace=None, prefix='x'):
     for _, node in iterable:
         nodetext = etree.tostring(node, encoding='unicode')
         node.clear()
+        # drop the nodes parsed so far, so that memory usage does not grow
+        # with the size of the document
+        while node.getprevious() is not None:
+            del node.getparent()[0]
         xs = Selector(text=nodetext, type='xml')
         if namespace:
             xs.register_namespace(prefix, namespace)
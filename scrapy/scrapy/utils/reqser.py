@@ -2,6 +2,7 @@
 Helper functions for serializing (and deserializing) requests.
 """
 import inspect
+import pickle
 
 from scrapy.http import Request
 from scrapy.utils.python import to_unicode
@@ -70,6 +71,122 @@ def request_from_dict(d, spider=None):
     )
 
 
+class RequestCodec:
+    """Compact binary serializer for requests.
+
+    Callback and errback names, HTTP methods, request class paths, header
+    names and (string) meta keys are stored as integer ids ("symbols") in the
+    serialized requests, and the callbacks of a spider are looked up only
+    once per name. The rest of the request is serialized with pickle.
+
+    ``symbols`` is the list of the values of the symbols, in id order. It
+    only grows, so serialized requests can be deserialized as long as the
+    symbols known when they were serialized are passed to the codec that
+    deserializes them.
+    """
+
+    def __init__(self, spider=None, symbols=()):
+        self.spider = spider
+        self.symbols = list(symbols)
+        self._symbol_ids = {value: i for i, value in enumerate(self.symbols)}
+        self._method_names = {}  # function -> spider method name
+        self._methods = {}  # symbol id -> spider method
+
+    def _intern(self, value):
+        try:
+            return self._symbol_ids[value]
+        except KeyError:
+            self._symbol_ids[value] = len(self.symbols)
+            self.symbols.append(value)
+            return self._symbol_ids[value]
+
+    def _encode_method(self, func):
+        if func is None:
+            return None
+        func_key = getattr(func, '__func__', func)
+        name = self._method_names.get(func_key)
+        # the spider method may have been replaced since it was looked up
+        if name is None or getattr(getattr(self.spider, name, None), '__func__', None) is not func_key:
+            name = _find_method(self.spider, func)
+            self._method_names[func_key] = name
+        return self._intern(name)
+
+    def _decode_method(self, symbol):
+        if symbol is None:
+            return None
+        if symbol not in self._methods:
+            self._methods[symbol] = _get_method(self.spider, self.symbols[symbol])
+        return self._methods[symbol]
+
+    def encode(self, request):
+        """Return the serialized request, as bytes. Raise ValueError if the
+        request cannot be serialized."""
+        headers = []
+        for name, values in request.headers.items():
+            headers.append(self._intern(name))
+            headers.append(tuple(values))
+        meta, other_meta = [], {}
+        for key, value in request.meta.items():
+            if isinstance(key, str):
+                meta.append(self._intern(key))
+                meta.append(value)
+            else:
+                other_meta[key] = value
+        request_cls = None
+        if type(request) is not Request:
+            request_cls = self._intern(request.__module__ + '.' + request.__class__.__name__)
+        encoded = (
+            request.url,
+            self._intern(request.method),
+            self._encode_method(request.callback),
+            self._encode_method(request.errback),
+            tuple(headers),
+            request.body,
+            request.cookies or None,
+            tuple(meta),
+            other_meta or None,
+            request._encoding,
+            request.priority,
+            request.dont_filter,
+            request.flags or None,
+            request.cb_kwargs or None,
+            request_cls,
+        )
+        try:
+            return pickle.dumps(encoded, protocol=4)
+        # Both pickle.PicklingError and AttributeError can be raised by pickle.dump(s)
+        # TypeError is raised from parsel.Selector
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            raise ValueError(str(e)) from e
+
+    def decode(self, data):
+        """Return the request serialized in ``data`` by :meth:`encode`"""
+        (url, method, callback, errback, headers, body, cookies, meta,
+         other_meta, encoding, priority, dont_filter, flags, cb_kwargs,
+         request_cls) = pickle.loads(data)
+        symbols = self.symbols
+        meta = {symbols[meta[i]]: meta[i + 1] for i in range(0, len(meta), 2)}
+        if other_meta:
+            meta.update(other_meta)
+        request_cls = load_object(symbols[request_cls]) if request_cls is not None else Request
+        return request_cls(
+            url=url,
+            callback=self._decode_method(callback),
+            errback=self._decode_method(errback),
+            method=symbols[method],
+            headers={symbols[headers[i]]: list(headers[i + 1])
+                     for i in range(0, len(headers), 2)},
+            body=body,
+            cookies=cookies,
+            meta=meta,
+            encoding=encoding,
+            priority=priority,
+            dont_filter=dont_filter,
+            flags=flags,
+            cb_kwargs=cb_kwargs,
+        )
+
+
 def _find_method(obj, func):
     # Only instance methods contain ``__func__``
     if obj and hasattr(func, '__func__'):
@@ -0,0 +1,124 @@
+"""
+Helpers for sharded crawls, where a spider runs in several worker processes
+and requests are routed between them by downloader slot (see
+:setting:`CRAWL_PROCESSES`).
+"""
+import datetime
+import zlib
+from queue import Empty
+
+
+def shard_for_key(key, shards):
+    """Return the index of the shard owning the downloader slot ``key``, out of
+    ``shards`` shards. The same index is returned in every process."""
+    return zlib.crc32(key.encode('utf-8')) % shards
+
+
+class ShardChannel:
+    """Queues and counters shared by the worker processes of a sharded crawl.
+
+    Each worker has an inbox queue for the (serialized) requests routed to it,
+    and all of them send their results (items and stats) to the ``results``
+    queue, read by the main process. The counters of sent and received
+    requests, along with the idle and closed flags of each worker, are used to
+    detect when the crawl is finished: all workers are idle and no request is
+    in transit.
+
+    The channel is created in the main process, and passed to each worker,
+    which must set :attr:`index` before using it.
+    """
+
+    def __init__(self, shards, context):
+        self.shards = shards
+        self.index = None
+        self.inboxes = [context.Queue() for _ in range(shards)]
+        self.results = context.Queue()
+        self.lock = context.Lock()
+        self.sent = context.Array('q', shards, lock=False)
+        self.received = context.Array('q', shards, lock=False)
+        self.idle = context.Array('b', shards, lock=False)
+        self.closed = context.Array('b', shards, lock=False)
+        self._finished = context.Value('b', 0, lock=False)
+
+    @property
+    def finished(self):
+        return bool(self._finished.value)
+
+    def send(self, index, message):
+        """Send ``message`` to the inbox of worker ``index``. Return ``False``
+        if that worker is already closed."""
+        with self.lock:
+            if self.closed[index]:
+                return False
+            self.sent[index] += 1
+        self.inboxes[index].put(message)
+        return True
+
+    def receive(self):
+        """Return the messages waiting in the inbox of this worker"""
+        messages = []
+        inbox = self.inboxes[self.index]
+        with self.lock:
+            while True:
+                try:
+                    messages.append(inbox.get_nowait())
+                except Empty:
+                    break
+            if messages:
+                self.received[self.index] += len(messages)
+                self.idle[self.index] = 0
+        return messages
+
+    def set_busy(self):
+        if self.idle[self.index]:
+            with self.lock:
+                self.idle[self.index] = 0
+
+    def set_idle(self):
+        """Mark this worker as idle. Return ``True`` if the crawl is finished,
+        i.e. if the other workers are also idle (or closed) and every request
+        sent to an open worker has been received."""
+        with self.lock:
+            self.idle[self.index] = 1
+            if not self._finished.value and all(
+                self.closed[i] or (self.idle[i] and self.sent[i] == self.received[i])
+                for i in range(self.shards)
+            ):
+                self._finished.value = 1
+            return bool(self._finished.value)
+
+    def close(self):
+        with self.lock:
+            self.closed[self.index] = 1
+
+
+def merge_stats(stats_list):
+    """Merge the stats of the workers of a sharded crawl.
+
+    Numeric values are added up, except for maximums (keys containing
+    ``max``) and ``elapsed_time_seconds``, for which the maximum value is
+    kept, and ratios and means (keys ending with ``_rate`` or ``/mean``),
+    which are averaged. For dates, the earliest ``start_time`` and the latest
+    value of any other key are kept. For other values, the first one is kept.
+    """
+    merged = {}
+    averaged = {}
+    for stats in stats_list:
+        for key, value in stats.items():
+            if key.endswith(('_rate', '/mean')) and isinstance(value, (int, float)):
+                averaged.setdefault(key, []).append(value)
+            elif key not in merged:
+                merged[key] = value
+            elif isinstance(value, datetime.datetime):
+                if key == 'start_time':
+                    merged[key] = min(merged[key], value)
+                else:
+                    merged[key] = max(merged[key], value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                if 'max' in key or key == 'elapsed_time_seconds':
+                    merged[key] = max(merged[key], value)
+                else:
+                    merged[key] += value
+    for key, values in averaged.items():
+        merged[key] = sum(values) / len(values)
+    return merged
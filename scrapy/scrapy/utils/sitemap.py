@@ -5,6 +5,7 @@ Note: The main purpose of this module is to provide support for the
 SitemapSpider, its API is subject to change without notice.
 """
 
+import itertools
 from urllib.parse import urljoin
 
 import lxml.etree
@@ -12,30 +13,94 @@ import lxml.etree
 
 class Sitemap:
     """Class to parse Sitemap (type=urlset) and Sitemap Index
-    (type=sitemapindex) files"""
+    (type=sitemapindex) files
+
+    ``xmltext`` is the whole document, or an iterable of chunks of it. The
+    document is parsed incrementally as the entries are iterated, and the
+    entries are discarded once yielded, so that the memory used does not
+    depend on the number of entries. A sitemap can only be iterated once.
+    """
+
+    chunk_size = 65536
+
+    # tag of the entries of each type of sitemap, so that the parser only
+    # reports those
+    entry_tags = {'urlset': '{*}url', 'sitemapindex': '{*}sitemap'}
 
     def __init__(self, xmltext):
-        xmlp = lxml.etree.XMLParser(recover=True, remove_comments=True, resolve_entities=False)
-        self._root = lxml.etree.fromstring(xmltext, parser=xmlp)
-        rt = self._root.tag
-        self.type = self._root.tag.split('}', 1)[1] if '}' in rt else rt
+        chunks = xmltext
+        if isinstance(xmltext, bytes):
+            chunks = (xmltext[i:i + self.chunk_size]
+                      for i in range(0, len(xmltext), self.chunk_size))
+        chunks = iter(chunks)
+        self.type = None
+        self._events = iter(())
 
-    def __iter__(self):
-        for elem in self._root.getchildren():
-            d = {}
-            for el in elem.getchildren():
-                tag = el.tag
-                name = tag.split('}', 1)[1] if '}' in tag else tag
-
-                if name == 'link':
-                    if 'href' in el.attrib:
-                        d.setdefault('alternate', []).append(el.get('href'))
-                else:
-                    d[name] = el.text.strip() if el.text else ''
+        # read the beginning of the document, up to the root element
+        head = []
+        parser = self._parser(events=('start',))
+        for chunk in chunks:
+            head.append(chunk)
+            parser.feed(chunk)
+            for _, root in parser.read_events():
+                rt = root.tag
+                self.type = rt.split('}', 1)[1] if '}' in rt else rt
+                break
+            if self.type is not None:
+                break
+        if self.type is None:
+            return
+
+        parser = self._parser(events=('end',), tag=self.entry_tags.get(self.type))
+        self._events = self._iter_events(parser, itertools.chain(head, chunks))
 
+    @staticmethod
+    def _parser(**kwargs):
+        return lxml.etree.XMLPullParser(recover=True, remove_comments=True,
+                                        resolve_entities=False, **kwargs)
+
+    @staticmethod
+    def _iter_events(parser, chunks):
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield from parser.read_events()
+        try:
+            parser.close()
+        except lxml.etree.XMLSyntaxError:
+            pass
+        yield from parser.read_events()
+
+    def __iter__(self):
+        root = None
+        for _, elem in self._events:
+            if root is None:
+                for root in elem.iterancestors():
+                    pass
+                if root is None:  # the end of the root element
+                    return
+            if elem.getparent() is not root:
+                continue
+            d = self._entry(elem)
+            # drop the parsed entries
+            elem.clear()
+            while elem.getprevious() is not None:
+                del root[0]
             if 'loc' in d:
                 yield d
 
+    def _entry(self, elem):
+        d = {}
+        for el in elem.getchildren():
+            tag = el.tag
+            name = tag.split('}', 1)[1] if '}' in tag else tag
+
+            if name == 'link':
+                if 'href' in el.attrib:
+                    d.setdefault('alternate', []).append(el.get('href'))
+            else:
+                d[name] = el.text.strip() if el.text else ''
+        return d
+
 
 def sitemap_urls_from_robots(robots_text, base_url=None):
     """Return an iterator over all sitemap urls contained in the given
@@ -16,13 +16,47 @@ from w3lib.url import _safe_chars, _unquotepath  # noqa: F401
 from scrapy.utils.python import to_unicode
 
 
+class DomainMatcher:
+    """Check whether host names belong to any of the given domains, i.e. are
+    one of those domains or a subdomain of one of them.
+
+    Domains are kept in a set, and a host name is checked by looking up the
+    host name itself and each of its parent domains, so the time needed for a
+    check does not depend on the number of domains. Host names are expected
+    to be lowercase.
+    """
+
+    def __init__(self, domains):
+        self.domains = frozenset(d.lower() for d in domains)
+
+    def __len__(self):
+        return len(self.domains)
+
+    def match(self, host):
+        domains = self.domains
+        if host in domains:
+            return True
+        i = host.find('.')
+        while i != -1:
+            if host[i + 1:] in domains:
+                return True
+            i = host.find('.', i + 1)
+        return False
+
+
 def url_is_from_any_domain(url, domains):
-    """Return True if the url belongs to any of the given domains"""
+    """Return True if the url belongs to any of the given domains.
+
+    ``domains`` can also be a :class:`DomainMatcher`, which avoids preparing
+    the domains on each call when checking many urls against the same (long)
+    list of domains.
+    """
     host = parse_url(url).netloc.lower()
     if not host:
         return False
-    domains = [d.lower() for d in domains]
-    return any((host == d) or (host.endswith(f'.{d}')) for d in domains)
+    if not isinstance(domains, DomainMatcher):
+        domains = DomainMatcher(domains)
+    return domains.match(host)
 
 
 def url_is_from_spider(url, spider):
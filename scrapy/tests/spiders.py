@@ -2,7 +2,9 @@
 Some spiders used for testing and benchmarking
 """
 import asyncio
+import os
 import time
+import zlib
 from urllib.parse import urlencode
 
 from twisted.internet import defer
@@ -14,6 +16,7 @@ from scrapy.item import Item
 from scrapy.linkextractors import LinkExtractor
 from scrapy.spiders import Spider
 from scrapy.spiders.crawl import CrawlSpider, Rule
+from scrapy.utils.decorators import offload
 from scrapy.utils.test import get_from_asyncio_queue
 
 
@@ -212,6 +215,50 @@ class ItemSpider(FollowAllSpider):
             yield {}
 
 
+class ShardSpider(Spider):
+    """Follow the links of the mock server, spread across its localhost and
+    127.0.0.1 hosts, yielding an item per page"""
+
+    name = 'shard'
+    link_extractor = LinkExtractor()
+
+    def __init__(self, url=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.start_urls = [url]
+
+    def parse(self, response):
+        yield {'url': response.url}
+        for link in self.link_extractor.extract_links(response):
+            url = link.url.replace('localhost', '127.0.0.1', 1)
+            if zlib.crc32(url.split('?')[-1].encode()) % 2:
+                url = url.replace('127.0.0.1', 'localhost', 1)
+            yield Request(url, callback=self.parse)
+
+
+class OffloadSpider(MetaSpider):
+
+    name = 'offload'
+
+    def __init__(self, url=None, fail=False, meta=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.url = url
+        self.fail = fail
+        self.request_meta = meta
+
+    def start_requests(self):
+        yield Request(self.url, meta=self.request_meta)
+
+    @offload
+    def parse(self, response):
+        yield {'pid': os.getpid(), 'status': response.status, 'url': response.url}
+        yield response.follow('/status?n=202', self.parse_local, cb_kwargs={'foo': 'bar'})
+        if self.fail:
+            1 / 0
+
+    def parse_local(self, response, foo):
+        yield {'pid': os.getpid(), 'status': response.status, 'foo': foo}
+
+
 class DefaultError(Exception):
     pass
 
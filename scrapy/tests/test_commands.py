@@ -762,6 +762,44 @@ class BenchCommandTest(CommandTest):
         self.assertNotIn('Unhandled Error', log)
 
 
+class BenchSuiteCommandTest(CommandTest):
+
+    def test_list(self):
+        p, out, _ = self.proc('benchsuite', '--list', 'exporter')
+        self.assertEqual(p.returncode, 0)
+        self.assertIn('exporter.json', out.split())
+        self.assertNotIn('dupefilter', out.split())
+
+    def test_unknown_benchmark(self):
+        self.assertEqual(2, self.call('benchsuite', 'unknown'))
+
+    def test_run(self):
+        p, out, _ = self.proc('benchsuite', '-n', '100', '-r', '1', '-o', '-')
+        self.assertEqual(p.returncode, 0)
+        results = json.loads(out)
+        self.assertEqual(results['environment']['scrapy'], scrapy.__version__)
+        for name in ('scheduler.memory', 'scheduler.disk', 'dupefilter', 'downloadermw',
+                     'linkextractor', 'exporter.csv', 'httpcache.filesystem'):
+            self.assertGreater(results['benchmarks'][name]['rate'], 0)
+
+    def test_baseline(self):
+        baseline = join(self.cwd, 'baseline.json')
+        self.assertEqual(0, self.call('benchsuite', 'dupefilter', '-n', '100', '-o', baseline))
+        # timings of separate runs are too noisy for the default threshold
+        p, out, _ = self.proc('benchsuite', 'dupefilter', '-n', '100', '-b', baseline,
+                              '--threshold', '1000')
+        self.assertEqual(p.returncode, 0)
+        self.assertIn('Comparison with', out)
+        with open(baseline) as f:
+            results = json.load(f)
+        results['benchmarks']['dupefilter']['rate'] *= 100
+        with open(baseline, 'w') as f:
+            json.dump(results, f)
+        p, out, _ = self.proc('benchsuite', 'dupefilter', '-n', '100', '-b', baseline)
+        self.assertEqual(p.returncode, 1)
+        self.assertIn('REGRESSION', out)
+
+
 class CrawlCommandTest(CommandTest):
 
     def crawl(self, code, args=()):
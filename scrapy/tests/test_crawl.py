@@ -1,5 +1,6 @@
 import json
 import logging
+import os
 from ipaddress import IPv4Address
 from socket import gethostbyname
 from urllib.parse import urlparse
@@ -12,6 +13,7 @@ from twisted.python.failure import Failure
 from twisted.trial.unittest import TestCase
 
 from scrapy import signals
+from scrapy.core.offload import RemoteTraceback
 from scrapy.crawler import CrawlerRunner
 from scrapy.exceptions import StopDownload
 from scrapy.http import Request
@@ -35,6 +37,7 @@ from tests.spiders import (
     DelaySpider,
     DuplicateStartRequestsSpider,
     FollowAllSpider,
+    OffloadSpider,
     SimpleSpider,
     SingleRequestSpider,
 )
@@ -518,3 +521,43 @@ class CrawlSpiderTestCase(TestCase):
         self.assertLess(
             len(crawler.spider.meta["failure"].value.response.body),
             crawler.spider.full_response_length)
+
+    @defer.inlineCallbacks
+    def _run_offload_spider(self, **kwargs):
+        items = []
+
+        def _on_item_scraped(item):
+            items.append(item)
+
+        crawler = self.runner.create_crawler(OffloadSpider)
+        crawler.signals.connect(_on_item_scraped, signals.item_scraped)
+        with LogCapture() as log:
+            yield crawler.crawl(self.mockserver.url("/status?n=200"),
+                                mockserver=self.mockserver, **kwargs)
+        return log, items, crawler.stats
+
+    @defer.inlineCallbacks
+    def test_offload(self):
+        log, items, stats = yield self._run_offload_spider()
+        self.assertEqual(len(items), 2)
+        self.assertNotEqual(items[0]['pid'], os.getpid())
+        self.assertEqual(items[0]['status'], 200)
+        self.assertEqual(items[0]['url'], self.mockserver.url("/status?n=200"))
+        self.assertEqual(items[1], {'pid': os.getpid(), 'status': 202, 'foo': 'bar'})
+        self.assertEqual(stats.get_value('offload/callbacks'), 1)
+
+    @defer.inlineCallbacks
+    def test_offload_disabled_by_meta(self):
+        log, items, stats = yield self._run_offload_spider(meta={'offload': False})
+        self.assertEqual([item['pid'] for item in items], [os.getpid()] * 2)
+        self.assertIsNone(stats.get_value('offload/callbacks'))
+
+    @defer.inlineCallbacks
+    def test_offload_error(self):
+        log, items, stats = yield self._run_offload_spider(fail=True)
+        self.assertEqual(len(items), 2)
+        self.assertEqual(stats.get_value('spider_exceptions/ZeroDivisionError'), 1)
+        exc = [r.exc_info[1] for r in log.records if r.exc_info][0]
+        self.assertIsInstance(exc, ZeroDivisionError)
+        self.assertIsInstance(exc.__cause__, RemoteTraceback)
+        self.assertIn('1 / 0', str(exc.__cause__))
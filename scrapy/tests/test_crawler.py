@@ -1,8 +1,11 @@
+import json
 import logging
 import os
 import platform
+import shutil
 import subprocess
 import sys
+import tempfile
 import warnings
 from unittest import skipIf
 
@@ -12,7 +15,7 @@ from twisted.internet import defer
 from twisted.trial import unittest
 
 import scrapy
-from scrapy.crawler import Crawler, CrawlerRunner, CrawlerProcess
+from scrapy.crawler import Crawler, CrawlerRunner, CrawlerProcess, ShardedCrawler
 from scrapy.settings import Settings, default_settings
 from scrapy.spiderloader import SpiderLoader
 from scrapy.utils.log import configure_logging, get_scrapy_root_handler
@@ -23,6 +26,7 @@ from scrapy.extensions import telnet
 from scrapy.utils.test import get_testenv
 
 from tests.mockserver import MockServer
+from tests.spiders import ShardSpider
 
 
 class BaseCrawlerTest(unittest.TestCase):
@@ -281,6 +285,52 @@ class CrawlerRunnerHasSpider(unittest.TestCase):
             self.assertNotIn("Using reactor: twisted.internet.asyncioreactor.AsyncioSelectorReactor", str(log))
 
 
+class ShardedCrawlerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mockserver = MockServer()
+        self.mockserver.__enter__()
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.mockserver.__exit__(None, None, None)
+        shutil.rmtree(self.tmpdir)
+
+    def test_create_crawler(self):
+        runner = CrawlerRunner({'CRAWL_PROCESSES': 2})
+        crawler = runner.create_crawler(NoRequestsSpider)
+        self.assertIsInstance(crawler, ShardedCrawler)
+        self.assertEqual(crawler.processes, 2)
+        self.assertEqual(crawler.shard_settings['SCHEDULER'],
+                         'scrapy.core.scheduler.ShardedScheduler')
+        self.assertEqual(crawler.shard_settings.getint('CRAWL_PROCESSES'), 1)
+        self.assertFalse(crawler.export_items)
+        self.assertIsInstance(CrawlerRunner().create_crawler(NoRequestsSpider), Crawler)
+
+    @defer.inlineCallbacks
+    def test_crawl(self):
+        path = os.path.join(self.tmpdir, 'items.jl')
+        runner = CrawlerRunner({
+            'CRAWL_PROCESSES': 2,
+            'FEEDS': {path: {'format': 'jsonlines'}},
+        })
+        crawler = runner.create_crawler(ShardSpider)
+        url = self.mockserver.url('/follow?total=20&show=20&order=desc')
+        yield runner.crawl(crawler, url=url)
+
+        stats = crawler.stats.get_stats()
+        self.assertEqual(stats['finish_reason'], 'finished')
+        self.assertEqual(stats['response_received_count'], 21)
+        self.assertEqual(stats['item_scraped_count'], 21)
+        self.assertGreater(stats['shard/requests_sent'], 0)
+        self.assertEqual(stats['shard/requests_sent'], stats['shard/requests_received'])
+        with open(path) as f:
+            urls = [json.loads(line)['url'] for line in f]
+        self.assertEqual(len(set(urls)), 21)
+        self.assertTrue(any('localhost' in u for u in urls))
+        self.assertTrue(any('127.0.0.1' in u for u in urls))
+
+
 class ScriptRunnerMixin:
     def run_script(self, script_name, *script_args):
         script_path = os.path.join(self.script_dir, script_name)
@@ -1,4 +1,6 @@
 import contextlib
+import gzip
+import mmap
 import os
 import shutil
 import tempfile
@@ -6,7 +8,7 @@ from unittest import mock
 
 from testfixtures import LogCapture
 from twisted.cred import checkers, credentials, portal
-from twisted.internet import defer, error, reactor
+from twisted.internet import defer, error, reactor, task
 from twisted.protocols.policies import WrappingFactory
 from twisted.python.filepath import FilePath
 from twisted.trial import unittest
@@ -22,7 +24,7 @@ from scrapy.core.downloader.handlers.datauri import DataURIDownloadHandler
 from scrapy.core.downloader.handlers.file import FileDownloadHandler
 from scrapy.core.downloader.handlers.http import HTTPDownloadHandler
 from scrapy.core.downloader.handlers.http10 import HTTP10DownloadHandler
-from scrapy.core.downloader.handlers.http11 import HTTP11DownloadHandler
+from scrapy.core.downloader.handlers.http11 import HTTP11DownloadHandler, ScrapyHTTPConnectionPool
 from scrapy.core.downloader.handlers.s3 import S3DownloadHandler
 
 from scrapy.exceptions import NotConfigured, ScrapyDeprecationWarning
@@ -201,6 +203,21 @@ class LargeChunkedFileResource(resource.Resource):
         return server.NOT_DONE_YET
 
 
+class ContentEncodingResource(resource.Resource):
+    """
+    A testing resource which renders the request body sent with the
+    content-encoding given in the ``encoding`` query parameter, compressed
+    with gzip unless ``raw`` is given.
+    """
+    def render(self, request):
+        request.setHeader("content-type", "text/plain")
+        request.setHeader("content-encoding", request.args[b'encoding'][0])
+        body = request.content.read()
+        if b'raw' not in request.args:
+            body = gzip.compress(body)
+        return body
+
+
 class HttpTestCase(unittest.TestCase):
 
     scheme = 'http'
@@ -214,6 +231,7 @@ class HttpTestCase(unittest.TestCase):
         self.tmpname = self.mktemp()
         os.mkdir(self.tmpname)
         FilePath(self.tmpname).child("file").setContent(b"0123456789")
+        FilePath(self.tmpname).child("file.bin").setContent(b"\x01\xff" * 5000)
         r = static.File(self.tmpname)
         r.putChild(b"redirect", util.Redirect(b"/file"))
         r.putChild(b"wait", ForeverTakingResource())
@@ -227,6 +245,7 @@ class HttpTestCase(unittest.TestCase):
         r.putChild(b"contentlength", ContentLengthHeaderResource())
         r.putChild(b"nocontenttype", EmptyContentTypeHeaderResource())
         r.putChild(b"largechunkedfile", LargeChunkedFileResource())
+        r.putChild(b"contentencoding", ContentEncodingResource())
         r.putChild(b"echo", Echo())
         self.site = server.Site(r, timeout=None)
         self.wrapper = WrappingFactory(self.site)
@@ -443,6 +462,79 @@ class Http11TestCase(HttpTestCase):
         d.addCallback(self.assertEqual, b"0123456789")
         return d
 
+    @defer.inlineCallbacks
+    def test_download_with_spillsize(self):
+        request = Request(self.getURL('file.bin'))
+        response = yield self.download_request(request, Spider('foo', download_spillsize=1000))
+        self.assertIsInstance(response.body, mmap.mmap)
+        self.assertEqual(len(response.body), 10000)
+        self.assertEqual(response.body[:], b"\x01\xff" * 5000)
+
+        response = yield self.download_request(request, Spider('foo', download_spillsize=10000))
+        self.assertEqual(response.body, b"\x01\xff" * 5000)
+
+    @defer.inlineCallbacks
+    def test_download_with_spillsize_per_req(self):
+        request = Request(self.getURL('file.bin'), meta={'download_spillsize': 5000})
+        response = yield self.download_request(request, Spider('foo'))
+        self.assertIsInstance(response.body, mmap.mmap)
+        self.assertEqual(response.body[:], b"\x01\xff" * 5000)
+
+    @defer.inlineCallbacks
+    def test_download_decompress_body(self):
+        body = b'0123456789' * 10000
+        request = Request(self.getURL('contentencoding?encoding=gzip'), body=body,
+                          meta={'_decompress_body': True})
+        response = yield self.download_request(request, Spider('foo'))
+        self.assertEqual(response.body, body)
+        self.assertNotIn(b'Content-Encoding', response.headers)
+
+        request = Request(self.getURL('contentencoding?encoding=gzip'), body=body)
+        response = yield self.download_request(request, Spider('foo'))
+        self.assertEqual(gzip.decompress(response.body), body)
+        self.assertEqual(response.headers[b'Content-Encoding'], b'gzip')
+
+    @defer.inlineCallbacks
+    def test_download_decompress_body_not_decodable(self):
+        body = b'not compressed'
+        request = Request(self.getURL('contentencoding?encoding=gzip&raw=1'), body=body,
+                          meta={'_decompress_body': True})
+        response = yield self.download_request(request, Spider('foo'))
+        self.assertEqual(response.body, body)
+        self.assertEqual(response.headers[b'Content-Encoding'], b'gzip')
+
+    @defer.inlineCallbacks
+    def test_download_decompress_body_unsupported_encoding(self):
+        body = b'0123456789'
+        request = Request(self.getURL('contentencoding?encoding=br&raw=1'), body=body,
+                          meta={'_decompress_body': True})
+        response = yield self.download_request(request, Spider('foo'))
+        self.assertEqual(response.body, body)
+        self.assertEqual(response.headers[b'Content-Encoding'], b'br')
+
+    @defer.inlineCallbacks
+    def test_connection_stats(self):
+        stats = self.download_handler._crawler.stats
+        request = Request(self.getURL('file'), meta={'download_slot': self.host})
+        yield self.download_request(request, Spider('foo'))
+        # let the connection return to the pool
+        yield task.deferLater(reactor, 0, lambda: None)
+        yield self.download_request(request, Spider('foo'))
+        self.assertEqual(stats.get_value('downloader/connections/opened'), 1)
+        self.assertEqual(stats.get_value('downloader/connections/reused'), 1)
+        if self.scheme == 'https':
+            self.assertEqual(stats.get_value('downloader/connections/tls_handshakes'), 1)
+            self.assertGreaterEqual(stats.get_value('downloader/connections/tls_handshake_time'), 0)
+        else:
+            self.assertIsNone(stats.get_value('downloader/connections/tls_handshakes'))
+
+    @defer.inlineCallbacks
+    def test_download_with_spillsize_text_response(self):
+        request = Request(self.getURL('file'), meta={'download_spillsize': 5})
+        response = yield self.download_request(request, Spider('foo'))
+        self.assertIsInstance(response, TextResponse)
+        self.assertEqual(response.body, b"0123456789")
+
     def test_download_chunked_content(self):
         request = Request(self.getURL('chunked'))
         d = self.download_request(request, Spider('foo'))
@@ -490,6 +582,72 @@ class Http11TestCase(HttpTestCase):
         return self.test_download_broken_content_allow_data_loss_via_setting('broken-chunked')
 
 
+class _Endpoint:
+
+    def connect(self, factory):
+        return defer.succeed(factory.buildProtocol(None))
+
+
+class _Connection:
+    state = 'QUIESCENT'
+
+    def __init__(self):
+        self.transport = mock.Mock()
+
+
+class ScrapyHTTPConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = task.Clock()
+        self.crawler = get_crawler()
+        self.pool = ScrapyHTTPConnectionPool(self.clock, stats=self.crawler.stats,
+                                             slot_stats=True)
+        self.pool.maxPersistentPerHost = 1
+
+    def test_slot_limit(self):
+        key = ('http', b'example.com', 80)
+        slot = ('example.com', 2)
+        self.pool.next_slot = slot
+        self.pool.getConnection(key, _Endpoint())
+        connections = [_Connection() for _ in range(3)]
+        for connection in connections:
+            self.pool._putConnection(key, connection, slot)
+        self.assertEqual(self.pool._connections[key], connections[1:])
+        connections[0].transport.loseConnection.assert_called_once_with()
+
+        self.pool.getConnection(key, _Endpoint())
+        self.assertEqual(self.pool._connections[key], connections[2:])
+        self.pool.getConnection(key, _Endpoint())
+        self.assertNotIn(key, self.pool._connections)
+        stats = self.crawler.stats
+        self.assertEqual(stats.get_value('downloader/connections/opened'), 1)
+        self.assertEqual(stats.get_value('downloader/connections/reused'), 2)
+        self.assertEqual(stats.get_value('downloader/slot/example.com/connections/opened'), 1)
+        self.assertEqual(stats.get_value('downloader/slot/example.com/connections/reused'), 2)
+
+    def test_default_limit(self):
+        key = ('http', b'example.com', 80)
+        connections = [_Connection() for _ in range(2)]
+        for connection in connections:
+            self.pool._putConnection(key, connection)
+        self.assertEqual(self.pool._connections[key], connections[1:])
+
+    def test_zero_limit(self):
+        key = ('http', b'example.com', 80)
+        connection = _Connection()
+        self.pool._putConnection(key, connection, ('example.com', 0))
+        connection.transport.loseConnection.assert_called_once_with()
+        self.assertNotIn(key, self.pool._connections)
+
+    def test_idle_timeout(self):
+        key = ('http', b'example.com', 80)
+        connection = _Connection()
+        self.pool._putConnection(key, connection, ('example.com', 2))
+        self.clock.advance(self.pool.cachedConnectionTimeout)
+        connection.transport.loseConnection.assert_called_once_with()
+        self.assertNotIn(key, self.pool._connections)
+
+
 class Https11TestCase(Http11TestCase):
     scheme = 'https'
 
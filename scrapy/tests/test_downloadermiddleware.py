@@ -210,6 +210,74 @@ class MiddlewareUsingDeferreds(ManagerTestCase):
         self.assertIs(results[0], resp)
         self.assertFalse(download_func.called)
 
+    def test_deferred_resumes_chain(self):
+        calls = []
+        request_dfd, response_dfd = Deferred(), Deferred()
+
+        class DeferredMiddleware:
+            def process_request(self, request, spider):
+                calls.append('deferred.process_request')
+                return request_dfd
+
+            def process_response(self, request, response, spider):
+                calls.append('deferred.process_response')
+                return response_dfd
+
+        class SyncMiddleware:
+            def process_request(self, request, spider):
+                calls.append('sync.process_request')
+
+            def process_response(self, request, response, spider):
+                calls.append('sync.process_response')
+                return response
+
+        self.mwman._add_middleware(DeferredMiddleware())
+        self.mwman._add_middleware(SyncMiddleware())
+        req = Request('http://example.com/index.html')
+        resp = Response(req.url)
+        dfd = self.mwman.download(lambda **kwargs: resp, req, self.spider)
+        results = []
+        dfd.addBoth(results.append)
+        self.assertEqual(calls, ['deferred.process_request'])
+        request_dfd.callback(None)
+        self.assertEqual(calls, ['deferred.process_request', 'sync.process_request',
+                                 'sync.process_response', 'deferred.process_response'])
+        self.assertEqual(results, [])
+        response_dfd.callback(resp)
+        self.assertIs(results[0], resp)
+
+
+class SynchronousMiddlewares(ManagerTestCase):
+    """Chains of synchronous middlewares should run without waiting for the
+    reactor"""
+
+    def test_fired_deferred(self):
+        req = Request('http://example.com/index.html')
+        resp = Response(req.url)
+        dfd = self.mwman.download(lambda **kwargs: resp, req, self.spider)
+        results = []
+        dfd.addBoth(results.append)
+        self.assertIs(results[0], resp)
+
+    def test_exception(self):
+        class RaiseMiddleware:
+            def process_request(self, request, spider):
+                raise ValueError
+
+        class ExceptionMiddleware:
+            def process_exception(self, request, exception, spider):
+                return Response(request.url, status=202)
+
+        self.mwman._add_middleware(ExceptionMiddleware())
+        self.mwman._add_middleware(RaiseMiddleware())
+        req = Request('http://example.com/index.html')
+        download_func = mock.MagicMock()
+        dfd = self.mwman.download(download_func, req, self.spider)
+        results = []
+        dfd.addBoth(results.append)
+        self.assertEqual(results[0].status, 202)
+        self.assertFalse(download_func.called)
+
 
 class MiddlewareUsingCoro(ManagerTestCase):
     """Middlewares using asyncio coroutines should work"""
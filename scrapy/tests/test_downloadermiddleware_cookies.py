@@ -1,4 +1,7 @@
 import logging
+import os
+import shutil
+import tempfile
 from testfixtures import LogCapture
 from unittest import TestCase
 
@@ -347,3 +350,58 @@ class CookiesMiddlewareTest(TestCase):
         self.assertCookieValEqual(req1.headers['Cookie'], 'key=value1')
         self.assertCookieValEqual(req2.headers['Cookie'], 'key=value2')
         self.assertCookieValEqual(req3.headers['Cookie'], 'key=')
+
+
+class CookieJarsTest(TestCase):
+
+    def setUp(self):
+        self.spider = Spider('foo')
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _get_middleware(self, **settings):
+        crawler = get_crawler(Spider, settings)
+        crawler.stats.open_spider(self.spider)
+        return crawler, CookiesMiddleware.from_crawler(crawler)
+
+    def _visit(self, mw, jar, set_cookie=None):
+        request = Request('http://scrapytest.org/', meta={'cookiejar': jar})
+        mw.process_request(request, self.spider)
+        headers = {'Set-Cookie': set_cookie} if set_cookie else {}
+        response = Response(request.url, headers=headers, request=request)
+        mw.process_response(request, response, self.spider)
+        return request.headers.get('Cookie')
+
+    def test_max_jars(self):
+        crawler, mw = self._get_middleware(COOKIES_MAX_JARS=2)
+        for jar in range(3):
+            self._visit(mw, jar, f'jar={jar}')
+        self.assertEqual(len(mw.jars), 2)
+        self.assertNotIn(0, mw.jars)
+        self.assertEqual(crawler.stats.get_value('cookies/jars/evicted'), 1)
+        self.assertIsNone(self._visit(mw, 0))
+        self.assertEqual(self._visit(mw, 2), b'jar=2')
+
+    def test_lru(self):
+        crawler, mw = self._get_middleware(COOKIES_MAX_JARS=2)
+        self._visit(mw, 0, 'jar=0')
+        self._visit(mw, 1, 'jar=1')
+        self._visit(mw, 0)
+        self._visit(mw, 2, 'jar=2')
+        self.assertCountEqual(mw.jars, [0, 2])
+
+    def test_spill(self):
+        crawler, mw = self._get_middleware(COOKIES_MAX_JARS=2, COOKIES_JARS_DIR=self.tmpdir)
+        for jar in range(5):
+            self._visit(mw, jar, f'jar={jar}')
+        self.assertEqual(len(mw.jars), 2)
+        self.assertEqual(crawler.stats.get_value('cookies/jars/spilled'), 3)
+        for jar in range(5):
+            self.assertEqual(self._visit(mw, jar), f'jar={jar}'.encode())
+        self.assertEqual(crawler.stats.get_value('cookies/jars/restored'), 5)
+        self.assertIsNone(crawler.stats.get_value('cookies/jars/evicted'))
+
+        mw.spider_closed(self.spider)
+        self.assertEqual(os.listdir(self.tmpdir), [])
@@ -1,3 +1,5 @@
+import mmap
+import os
 import time
 import tempfile
 import shutil
@@ -5,12 +7,18 @@ import unittest
 import email.utils
 from contextlib import contextmanager
 
+from twisted.internet import defer
+from twisted.trial import unittest as trial
+from testfixtures import LogCapture
+
 from scrapy.http import Response, HtmlResponse, Request
 from scrapy.spiders import Spider
 from scrapy.settings import Settings
 from scrapy.exceptions import IgnoreRequest
 from scrapy.utils.test import get_crawler
 from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+from scrapy.extensions.httpcache import ThreadedCacheStorage
+from scrapy.utils.misc import load_object
 
 
 class _BaseTest(unittest.TestCase):
@@ -115,6 +123,19 @@ class DefaultStorageTest(_BaseTest):
             time.sleep(2)  # wait for cache to expire
             assert storage.retrieve_response(self.spider, request2) is None
 
+    def test_storage_spilled_body(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(b'spilled body')
+            f.flush()
+            body = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        response = Response('http://www.example.com', body=body,
+                            headers={'Content-Type': 'application/octet-stream'})
+        with self._storage(HTTPCACHE_EXPIRATION_SECS=0) as storage:
+            storage.store_response(self.spider, self.request, response)
+            response2 = storage.retrieve_response(self.spider, self.request)
+            self.assertEqual(response2.body[:], b'spilled body')
+        body.close()
+
     def test_storage_never_expire(self):
         with self._storage(HTTPCACHE_EXPIRATION_SECS=0) as storage:
             assert storage.retrieve_response(self.spider, self.request) is None
@@ -154,6 +175,93 @@ class FilesystemStorageGzipTest(FilesystemStorageTest):
         return super()._get_settings(**new_settings)
 
 
+class SegmentStorageTest(DefaultStorageTest):
+
+    storage_class = 'scrapy.extensions.httpcache.SegmentCacheStorage'
+
+    def _responses(self, n):
+        for i in range(n):
+            request = Request(f'http://www.example.com/{i}')
+            response = Response(request.url, headers={'Content-Type': 'text/html'},
+                                body=b'body %d' % i * 10, status=200)
+            yield request, response
+
+    def test_storage_reopen(self):
+        pairs = list(self._responses(10))
+        with self._storage(HTTPCACHE_EXPIRATION_SECS=0) as storage:
+            for request, response in pairs:
+                storage.store_response(self.spider, request, response)
+        with self._storage(HTTPCACHE_EXPIRATION_SECS=0) as storage:
+            for request, response in pairs:
+                self.assertEqualResponse(response, storage.retrieve_response(self.spider, request))
+
+    def test_storage_without_index(self):
+        """Records appended after the index was saved are recovered, and
+        incomplete records are dropped"""
+        pairs = list(self._responses(10))
+        with self._storage(HTTPCACHE_EXPIRATION_SECS=0) as storage:
+            for request, response in pairs:
+                storage.store_response(self.spider, request, response)
+            path = storage.path
+        os.remove(os.path.join(path, 'index'))
+        with open(os.path.join(path, 'segment-000000'), 'ab') as f:
+            f.write(b'incomplete record')
+        with self._storage(HTTPCACHE_EXPIRATION_SECS=0) as storage:
+            for request, response in pairs:
+                self.assertEqualResponse(response, storage.retrieve_response(self.spider, request))
+            storage.store_response(self.spider, self.request, self.response)
+            self.assertEqualResponse(self.response,
+                                     storage.retrieve_response(self.spider, self.request))
+
+    def test_segments(self):
+        pairs = list(self._responses(10))
+        with self._storage(HTTPCACHE_EXPIRATION_SECS=0, HTTPCACHE_SEGMENT_SIZE=200) as storage:
+            for request, response in pairs:
+                storage.store_response(self.spider, request, response)
+            self.assertEqual(len(storage.segment_sizes), 10)
+            for request, response in pairs:
+                self.assertEqualResponse(response, storage.retrieve_response(self.spider, request))
+
+    def test_compact(self):
+        pairs = list(self._responses(10))
+        with self._storage(HTTPCACHE_EXPIRATION_SECS=0, HTTPCACHE_SEGMENT_SIZE=1000,
+                           HTTPCACHE_SEGMENT_COMPACT_RATIO=0) as storage:
+            for _ in range(3):
+                for request, response in pairs:
+                    storage.store_response(self.spider, request, response)
+            size = sum(storage.segment_sizes.values())
+            storage.compact()
+            self.assertEqual(sum(storage.segment_sizes.values()), size // 3)
+            self.assertEqual(sum(storage.live_bytes.values()), size // 3)
+            for request, response in pairs:
+                self.assertEqualResponse(response, storage.retrieve_response(self.spider, request))
+        with self._storage(HTTPCACHE_EXPIRATION_SECS=0) as storage:
+            for request, response in pairs:
+                self.assertEqualResponse(response, storage.retrieve_response(self.spider, request))
+
+    def test_compact_on_close(self):
+        pairs = list(self._responses(10))
+        with self._storage(HTTPCACHE_EXPIRATION_SECS=0) as storage:
+            for _ in range(2):
+                for request, response in pairs:
+                    storage.store_response(self.spider, request, response)
+            size = sum(storage.segment_sizes.values())
+        with self._storage(HTTPCACHE_EXPIRATION_SECS=0) as storage:
+            self.assertEqual(sum(storage.segment_sizes.values()), size // 2)
+
+    def test_compact_expired(self):
+        pairs = list(self._responses(10))
+        with self._storage(HTTPCACHE_EXPIRATION_SECS=1) as storage:
+            for request, response in pairs:
+                storage.store_response(self.spider, request, response)
+            time.sleep(1.5)
+            storage.store_response(self.spider, self.request, self.response)
+            storage.compact()
+            self.assertEqual(len(storage.index), 1)
+            self.assertEqualResponse(self.response,
+                                     storage.retrieve_response(self.spider, self.request))
+
+
 class DummyPolicyTest(_BaseTest):
 
     policy_class = 'scrapy.extensions.httpcache.DummyPolicy'
@@ -502,5 +610,114 @@ class RFC2616PolicyTest(DefaultStorageTest):
                 assert 'cached' in res2.flags
 
 
+class ThreadedStorageTest(trial.TestCase):
+
+    storage_class = 'scrapy.extensions.httpcache.FilesystemCacheStorage'
+
+    def setUp(self):
+        self.crawler = get_crawler(Spider)
+        self.spider = self.crawler._create_spider('example.com')
+        self.tmpdir = tempfile.mkdtemp()
+        self.crawler.stats.open_spider(self.spider)
+
+    def tearDown(self):
+        self.crawler.stats.close_spider(self.spider, '')
+        shutil.rmtree(self.tmpdir)
+
+    def _get_settings(self, **new_settings):
+        settings = {
+            'HTTPCACHE_ENABLED': True,
+            'HTTPCACHE_DIR': self.tmpdir,
+            'HTTPCACHE_POLICY': 'scrapy.extensions.httpcache.DummyPolicy',
+            'HTTPCACHE_STORAGE': self.storage_class,
+            'HTTPCACHE_THREADS': 2,
+            'HTTPCACHE_WRITE_BATCH_SIZE': 3,
+        }
+        settings.update(new_settings)
+        return Settings(settings)
+
+    def _pairs(self, count):
+        return [(Request(f'http://www.example.com/{i}'),
+                 Response(f'http://www.example.com/{i}', body=b'body %d' % i,
+                          headers={'Content-Type': 'text/html'}))
+                for i in range(count)]
+
+    @defer.inlineCallbacks
+    def test_storage(self):
+        storage = HttpCacheMiddleware(self._get_settings(), self.crawler.stats).storage
+        self.assertIsInstance(storage, ThreadedCacheStorage)
+        yield storage.open_spider(self.spider)
+        pairs = self._pairs(10)
+        for request, response in pairs:
+            self.assertIsNone((yield storage.retrieve_response(self.spider, request)))
+            storage.store_response(self.spider, request, response)
+        # written behind, but already retrievable
+        cached = yield storage.retrieve_response(self.spider, pairs[-1][0])
+        self.assertIsNot(cached, pairs[-1][1])
+        self.assertEqual(cached.body, b'body 9')
+        yield storage.close_spider(self.spider)
+        self.assertFalse(storage._pending)
+        self.assertFalse(storage._writing)
+
+        storage = load_object(self.storage_class)(self._get_settings())
+        storage.open_spider(self.spider)
+        for request, response in pairs:
+            self.assertEqual(storage.retrieve_response(self.spider, request).body, response.body)
+        storage.close_spider(self.spider)
+
+    @defer.inlineCallbacks
+    def test_store_error(self):
+        storage = HttpCacheMiddleware(self._get_settings(), self.crawler.stats).storage
+        yield storage.open_spider(self.spider)
+        pairs = self._pairs(3)
+        store_response = storage.storage.store_response
+
+        def failing_store_response(spider, request, response):
+            if request is pairs[1][0]:
+                raise ValueError('cannot store')
+            store_response(spider, request, response)
+
+        storage.storage.store_response = failing_store_response
+        with LogCapture() as log:
+            for request, response in pairs:
+                storage.store_response(self.spider, request, response)
+            yield storage.close_spider(self.spider)
+        log.check_present(('scrapy.extensions.httpcache', 'ERROR',
+                           f'Error storing {pairs[1][0]} in the HTTP cache'))
+
+        storage = load_object(self.storage_class)(self._get_settings())
+        storage.open_spider(self.spider)
+        self.assertEqual(storage.retrieve_response(self.spider, pairs[0][0]).body, b'body 0')
+        self.assertIsNone(storage.retrieve_response(self.spider, pairs[1][0]))
+        self.assertEqual(storage.retrieve_response(self.spider, pairs[2][0]).body, b'body 2')
+        storage.close_spider(self.spider)
+
+    @defer.inlineCallbacks
+    def test_middleware(self):
+        mw = HttpCacheMiddleware(self._get_settings(), self.crawler.stats)
+        yield mw.spider_opened(self.spider)
+        request, response = self._pairs(1)[0]
+        dfd = mw.process_request(request, self.spider)
+        self.assertIsInstance(dfd, defer.Deferred)
+        self.assertIsNone((yield dfd))
+        mw.process_response(request, response, self.spider)
+        cached = yield mw.process_request(request.copy(), self.spider)
+        self.assertEqual(cached.body, response.body)
+        self.assertIn('cached', cached.flags)
+        self.assertNotIn('cached', response.flags)
+        yield mw.spider_closed(self.spider)
+        self.assertEqual(self.crawler.stats.get_value('httpcache/hit'), 1)
+
+
+class ThreadedDbmStorageTest(ThreadedStorageTest):
+
+    storage_class = 'scrapy.extensions.httpcache.DbmCacheStorage'
+
+
+class ThreadedSegmentStorageTest(ThreadedStorageTest):
+
+    storage_class = 'scrapy.extensions.httpcache.SegmentCacheStorage'
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -62,6 +62,16 @@ class HttpCompressionTest(TestCase):
         self.mw.process_request(request, self.spider)
         self.assertEqual(request.headers.get('Accept-Encoding'),
                          b', '.join(ACCEPTED_ENCODINGS))
+        self.assertNotIn('_decompress_body', request.meta)
+
+    def test_process_request_streaming(self):
+        mw = HttpCompressionMiddleware(streaming=True)
+        request = Request('http://scrapytest.org')
+        mw.process_request(request, self.spider)
+        self.assertTrue(request.meta['_decompress_body'])
+        response = Response('http://scrapytest.org', body=b'body')
+        self.assertIs(mw.process_response(request, response, self.spider), response)
+        self.assertNotIn('_decompress_body', request.meta)
 
     def test_process_response_gzip(self):
         response = self._getresponse('gzip')
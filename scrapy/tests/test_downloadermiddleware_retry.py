@@ -1,4 +1,6 @@
 import unittest
+from unittest import mock
+
 from twisted.internet import defer
 from twisted.internet.error import (
     ConnectError,
@@ -196,5 +198,39 @@ class MaxRetryTimesTest(unittest.TestCase):
         self.assertEqual(req, None)
 
 
+class BackoffTest(unittest.TestCase):
+    def setUp(self):
+        self.crawler = get_crawler(Spider, {'RETRY_BACKOFF_BASE': 2,
+                                            'RETRY_BACKOFF_MAX': 10,
+                                            'RETRY_TIMES': 5})
+        self.spider = self.crawler._create_spider('foo')
+        self.mw = RetryMiddleware.from_crawler(self.crawler)
+
+    @mock.patch('scrapy.downloadermiddlewares.retry.time', return_value=1000.0)
+    def test_exponential(self, _):
+        req = Request('http://www.scrapytest.org/invalid_url')
+        delays = []
+        for _ in range(4):
+            req = self.mw.process_exception(req, DNSLookupError('foo'), self.spider)
+            delays.append(req.meta['not_before'] - 1000.0)
+        self.assertEqual(delays, [2, 4, 8, 10])
+
+    @mock.patch('scrapy.downloadermiddlewares.retry.time', return_value=1000.0)
+    def test_retry_after(self, _):
+        req = Request('http://www.scrapytest.org/503')
+        rsp = Response(req.url, status=503, headers={'Retry-After': '7'})
+        self.assertEqual(self.mw.process_response(req, rsp, self.spider).meta['not_before'], 1007.0)
+        rsp = Response(req.url, status=503, headers={'Retry-After': '3600'})
+        self.assertEqual(self.mw.process_response(req, rsp, self.spider).meta['not_before'], 1010.0)
+        rsp = Response(req.url, status=503, headers={'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+        self.assertEqual(self.mw.process_response(req, rsp, self.spider).meta['not_before'], 1002.0)
+
+    def test_disabled(self):
+        mw = RetryMiddleware.from_crawler(get_crawler(Spider))
+        req = mw.process_exception(Request('http://www.scrapytest.org/invalid_url'),
+                                   DNSLookupError('foo'), self.spider)
+        self.assertNotIn('not_before', req.meta)
+
+
 if __name__ == "__main__":
     unittest.main()
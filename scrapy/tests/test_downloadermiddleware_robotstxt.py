@@ -1,3 +1,4 @@
+from time import time
 from unittest import mock
 
 from twisted.internet import reactor, error
@@ -172,6 +173,77 @@ Disallow: /some/randome/page.html
         middleware.process_request_2(rp, Request('http://site.local/allowed'), None)
         rp.allowed.assert_called_once_with('http://site.local/allowed', 'Examplebot')
 
+    def test_robotstxt_cache_size(self):
+        crawler = self._get_successful_crawler()
+        crawler.settings.set('ROBOTSTXT_CACHE_SIZE', 1)
+        middleware = RobotsTxtMiddleware(crawler)
+        d = self.assertIgnored(Request('http://site.local/admin/main'), middleware)
+        d.addCallback(lambda _: self.assertIgnored(Request('http://site2.local/admin/main'), middleware))
+        d.addCallback(lambda _: self.assertIgnored(Request('http://site.local/admin/main'), middleware))
+
+        def check(_):
+            self.assertEqual(list(middleware._parsers), ['site.local'])
+            self.assertEqual(crawler.engine.download.call_count, 3)
+            crawler.stats.inc_value.assert_any_call('robotstxt/cache/eviction')
+        d.addCallback(check)
+        return d
+
+    def test_robotstxt_cache_hit(self):
+        crawler = self._get_successful_crawler()
+        middleware = RobotsTxtMiddleware(crawler)
+        d = self.assertIgnored(Request('http://site.local/admin/main'), middleware)
+        d.addCallback(lambda _: self.assertNotIgnored(Request('http://site.local/allowed'), middleware))
+
+        def check(_):
+            self.assertEqual(crawler.engine.download.call_count, 1)
+            crawler.stats.inc_value.assert_any_call('robotstxt/cache/miss')
+            crawler.stats.inc_value.assert_any_call('robotstxt/cache/hit')
+        d.addCallback(check)
+        return d
+
+    def _get_stored_middleware(self, cachedir, expiration_secs=86400):
+        crawler = self._get_successful_crawler()
+        crawler.settings.set('ROBOTSTXT_CACHE_DIR', cachedir)
+        crawler.settings.set('ROBOTSTXT_CACHE_EXPIRATION_SECS', expiration_secs)
+        return RobotsTxtMiddleware(crawler)
+
+    def test_robotstxt_cache_dir(self):
+        cachedir = self.mktemp()
+        middleware = self._get_stored_middleware(cachedir)
+        d = self.assertIgnored(Request('http://site.local/admin/main'), middleware)
+
+        def reopen(_):
+            middleware.spider_closed(None)
+            self.crawler.engine.download.reset_mock()
+            middleware2 = self._get_stored_middleware(cachedir)
+            d = self.assertIgnored(Request('http://site.local/admin/main'), middleware2)
+            d.addCallback(lambda _: middleware2.spider_closed(None))
+            return d
+        d.addCallback(reopen)
+
+        def check(_):
+            self.assertFalse(self.crawler.engine.download.called)
+            self.crawler.stats.inc_value.assert_any_call('robotstxt/cache/store_hit')
+        d.addCallback(check)
+        return d
+
+    def test_robotstxt_cache_dir_expired(self):
+        cachedir = self.mktemp()
+        middleware = self._get_stored_middleware(cachedir)
+        d = self.assertIgnored(Request('http://site.local/admin/main'), middleware)
+
+        def reopen(_):
+            middleware.spider_closed(None)
+            self.crawler.engine.download.reset_mock()
+            middleware2 = self._get_stored_middleware(cachedir, expiration_secs=1)
+            with mock.patch('scrapy.downloadermiddlewares.robotstxt.time', return_value=time() + 2):
+                d = self.assertIgnored(Request('http://site.local/admin/main'), middleware2)
+            d.addCallback(lambda _: middleware2.spider_closed(None))
+            return d
+        d.addCallback(reopen)
+        d.addCallback(lambda _: self.assertTrue(self.crawler.engine.download.called))
+        return d
+
     def assertNotIgnored(self, request, middleware):
         spider = None  # not actually used
         dfd = maybeDeferred(middleware.process_request, request, spider)
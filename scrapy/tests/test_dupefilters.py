@@ -6,7 +6,12 @@ import os
 import sys
 from testfixtures import LogCapture
 
-from scrapy.dupefilters import RFPDupeFilter
+from scrapy.dupefilters import (
+    BloomDupeFilter,
+    DiskFingerprintStore,
+    MemoryFingerprintStore,
+    RFPDupeFilter,
+)
 from scrapy.http import Request
 from scrapy.core.scheduler import Scheduler
 from scrapy.utils.python import to_bytes
@@ -224,3 +229,177 @@ class RFPDupeFilterTest(unittest.TestCase):
             )
 
             dupefilter.close('finished')
+
+
+class MemoryFingerprintStoreTest(unittest.TestCase):
+
+    def _fingerprints(self, n, prefix=''):
+        return [hashlib.sha1(to_bytes('%s%d' % (prefix, i))).hexdigest() for i in range(n)]
+
+    def _get_store(self):
+        return MemoryFingerprintStore(min_pending=4, merge_ratio=2)
+
+    def test_add_contains(self):
+        store = self._get_store()
+        fps = self._fingerprints(2000)
+        for fp in fps:
+            self.assertNotIn(fp, store)
+            self.assertTrue(store.add(fp))
+            self.assertIn(fp, store)
+        self.assertEqual(len(store), 2000)
+        for fp in fps:
+            self.assertFalse(store.add(fp))
+        self.assertEqual(len(store), 2000)
+        self.assertIn(bytes.fromhex(fps[0]), store)
+        for fp in self._fingerprints(100, 'other'):
+            self.assertNotIn(fp, store)
+        store.close()
+
+    def test_contains_many(self):
+        store = self._get_store()
+        fps = self._fingerprints(500)
+        others = self._fingerprints(500, 'other')
+        self.assertEqual(store.update(fps), 500)
+        self.assertEqual(store.update(fps), 0)
+        fps_and_others = [fp for pair in zip(fps, others) for fp in pair]
+        self.assertEqual(store.contains_many(fps_and_others), [True, False] * 500)
+        store.close()
+
+
+class DiskFingerprintStoreTest(MemoryFingerprintStoreTest):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _get_store(self):
+        return DiskFingerprintStore(self.path, min_pending=4, merge_ratio=2)
+
+    def test_resume(self):
+        fps = self._fingerprints(1000)
+        store = self._get_store()
+        store.update(fps)
+        store.close()
+        self.assertEqual(os.path.getsize(os.path.join(self.path, 'journal')), 0)
+
+        store = self._get_store()
+        self.assertEqual(len(store), 1000)
+        self.assertEqual(store.contains_many(fps), [True] * 1000)
+        self.assertFalse(store.add(fps[0]))
+        store.close()
+
+    def test_resume_from_journal(self):
+        fps = self._fingerprints(1000)
+        store = self._get_store()
+        store.update(fps)
+
+        # simulate a crash: partitions not merged, store not closed
+        store2 = self._get_store()
+        self.assertEqual(len(store2), 1000)
+        self.assertEqual(store2.contains_many(fps), [True] * 1000)
+        store2.close()
+        store.journal.close()
+        for m in store._mmaps.values():
+            m.close()
+
+    def test_resume_from_journal_unmerged(self):
+        fps = self._fingerprints(3)
+        store = self._get_store()
+        store.update(fps)
+
+        store2 = self._get_store()
+        self.assertEqual(len(store2), 3)
+        self.assertEqual(store2.contains_many(fps), [True] * 3)
+        store2.close()
+        store.journal.close()
+
+    def test_dupefilter(self):
+        settings = {'JOBDIR': self.path,
+                    'DUPEFILTER_STORAGE': 'scrapy.dupefilters.DiskFingerprintStore'}
+        crawler = get_crawler(settings_dict=settings)
+        r1 = Request('http://scrapytest.org/1')
+        r2 = Request('http://scrapytest.org/2')
+
+        df = RFPDupeFilter.from_settings(crawler.settings)
+        self.assertIsInstance(df.fingerprints, DiskFingerprintStore)
+        df.open()
+        assert not df.request_seen(r1)
+        assert df.request_seen(r1)
+        df.close('finished')
+        assert not os.path.exists(os.path.join(self.path, 'requests.seen'))
+
+        df2 = RFPDupeFilter.from_settings(crawler.settings)
+        df2.open()
+        assert df2.request_seen(r1)
+        assert not df2.request_seen(r2)
+        assert df2.request_seen(r2)
+        df2.close('finished')
+
+    def test_dupefilter_no_jobdir(self):
+        settings = {'DUPEFILTER_STORAGE': 'scrapy.dupefilters.DiskFingerprintStore'}
+        crawler = get_crawler(settings_dict=settings)
+        df = RFPDupeFilter.from_settings(crawler.settings)
+        self.assertIsInstance(df.fingerprints, MemoryFingerprintStore)
+        self.assertNotIsInstance(df.fingerprints, DiskFingerprintStore)
+        df.close('finished')
+
+
+class BloomDupeFilterTest(unittest.TestCase):
+
+    def test_filter(self):
+        crawler = get_crawler(settings_dict={'DUPEFILTER_CLASS': BloomDupeFilter})
+        scheduler = Scheduler.from_crawler(crawler)
+        dupefilter = scheduler.df
+        self.assertIsInstance(dupefilter, BloomDupeFilter)
+        dupefilter.open()
+
+        r1 = Request('http://scrapytest.org/1')
+        r2 = Request('http://scrapytest.org/2')
+        r3 = Request('http://scrapytest.org/2')
+
+        assert not dupefilter.request_seen(r1)
+        assert dupefilter.request_seen(r1)
+        assert not dupefilter.request_seen(r2)
+        assert dupefilter.request_seen(r3)
+
+        dupefilter.close('finished')
+        stats = crawler.stats
+        self.assertEqual(stats.get_value('dupefilter/bloom/count'), 2)
+        self.assertEqual(stats.get_value('dupefilter/bloom/filters'), 1)
+        self.assertGreater(stats.get_value('dupefilter/bloom/fill_ratio'), 0)
+        self.assertLess(stats.get_value('dupefilter/bloom/estimated_error_rate'), 0.001)
+
+    def test_settings(self):
+        settings = {'DUPEFILTER_CLASS': BloomDupeFilter,
+                    'DUPEFILTER_BLOOM_CAPACITY': 10,
+                    'DUPEFILTER_BLOOM_ERROR_RATE': 0.1,
+                    'DUPEFILTER_BLOOM_SCALABLE': False}
+        crawler = get_crawler(settings_dict=settings)
+        dupefilter = Scheduler.from_crawler(crawler).df
+        self.assertEqual(dupefilter.fingerprints.capacity, 10)
+        self.assertEqual(dupefilter.fingerprints.error_rate, 0.1)
+        self.assertFalse(dupefilter.fingerprints.scalable)
+
+    def test_dupefilter_path(self):
+        r1 = Request('http://scrapytest.org/1')
+        r2 = Request('http://scrapytest.org/2')
+
+        path = tempfile.mkdtemp()
+        try:
+            df = BloomDupeFilter(path)
+            df.open()
+            assert not df.request_seen(r1)
+            assert df.request_seen(r1)
+            df.close('finished')
+            assert os.path.isdir(os.path.join(path, 'requests.bloom'))
+
+            df2 = BloomDupeFilter(path)
+            df2.open()
+            assert df2.request_seen(r1)
+            assert not df2.request_seen(r2)
+            assert df2.request_seen(r2)
+            df2.close('finished')
+        finally:
+            shutil.rmtree(path)
@@ -0,0 +1,62 @@
+import unittest
+from unittest import mock
+
+from twisted.internet import defer, reactor
+from twisted.internet.base import ThreadedResolver
+
+from scrapy.exceptions import NotConfigured
+from scrapy.extensions.dnsprefetch import DnsPrefetch
+from scrapy.http import Request
+from scrapy.resolver import CachingThreadedResolver, dnscache
+from scrapy.spiders import Spider
+from scrapy.utils.test import get_crawler
+
+
+class DnsPrefetchTest(unittest.TestCase):
+
+    def setUp(self):
+        dnscache.clear()
+        self.addCleanup(dnscache.clear)
+        self.queries = {}
+        patcher = mock.patch.object(ThreadedResolver, 'getHostByName', self.query)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.crawler = get_crawler(Spider, {'DNS_PREFETCH_ENABLED': True,
+                                            'DNS_PREFETCH_CONCURRENCY': 2})
+        self.spider = self.crawler._create_spider('foo')
+        resolver = CachingThreadedResolver(reactor, 100, 5, crawlers=[self.crawler])
+        patcher = mock.patch.object(reactor, 'resolver', resolver, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.prefetch = DnsPrefetch.from_crawler(self.crawler)
+
+    def query(self, name, timeout):
+        self.queries[name] = defer.Deferred()
+        return self.queries[name]
+
+    def schedule(self, url, **meta):
+        self.prefetch.request_scheduled(Request(url, meta=meta), self.spider)
+
+    def test_prefetch(self):
+        self.schedule('http://a.example.com/1')
+        self.schedule('http://a.example.com/2')
+        self.schedule('http://10.0.0.1/')
+        self.schedule('http://b.example.com/', proxy='http://proxy:8080')
+        self.assertEqual(list(self.queries), ['a.example.com'])
+        self.schedule('http://b.example.com/')
+        self.schedule('http://c.example.com/')
+        self.schedule('http://c.example.com/')
+        self.assertEqual(list(self.queries), ['a.example.com', 'b.example.com'])
+        self.queries['a.example.com'].callback('10.0.0.2')
+        self.assertEqual(list(self.queries), ['a.example.com', 'b.example.com', 'c.example.com'])
+        self.queries['b.example.com'].errback(Exception())
+        self.queries['c.example.com'].callback('10.0.0.3')
+        self.assertEqual(self.prefetch.active, 0)
+        self.schedule('http://a.example.com/3')
+        self.assertEqual(len(self.queries), 3)
+        self.assertEqual(dnscache['a.example.com'], '10.0.0.2')
+        self.assertEqual(self.crawler.stats.get_value('dnscache/prefetch'), 3)
+
+    def test_disabled(self):
+        with self.assertRaises(NotConfigured):
+            DnsPrefetch.from_crawler(get_crawler(Spider))
@@ -0,0 +1,88 @@
+import time
+import unittest
+
+from twisted.internet import defer
+from twisted.trial.unittest import TestCase
+
+from scrapy.exceptions import NotConfigured
+from scrapy.extensions.profiler import Histogram, Profiler
+from scrapy.utils.test import get_crawler
+from tests.mockserver import MockServer
+from tests.spiders import ItemSpider
+
+
+class CountPipeline:
+
+    def process_item(self, item, spider):
+        return item
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_histogram(self):
+        h = Histogram()
+        self.assertEqual(h.percentile(99), 0.0)
+        for _ in range(98):
+            h.add(0.001)
+        h.add(0.5)
+        h.add(3.0)
+        self.assertEqual(h.count, 100)
+        self.assertAlmostEqual(h.total, 3.598)
+        self.assertEqual(h.max, 3.0)
+        self.assertTrue(0.001 <= h.percentile(50) < 0.002)
+        self.assertTrue(0.5 <= h.percentile(99) < 1.0)
+        self.assertEqual(h.percentile(100), 3.0)
+
+
+class ProfilerTest(TestCase):
+
+    def test_not_configured(self):
+        crawler = get_crawler()
+        self.assertRaises(NotConfigured, Profiler, crawler)
+        self.assertIsNone(crawler.profiler)
+
+    def test_nested_time_excluded(self):
+        profiler = Profiler(get_crawler(settings_dict={'PROFILER_ENABLED': True}))
+
+        def inner(response):
+            time.sleep(0.05)
+            yield 1
+
+        profiled_inner = profiler.profile_callback(inner)
+
+        def outer(response):
+            time.sleep(0.01)
+            yield from profiled_inner(response)
+
+        self.assertEqual(list(profiler.profile_callback(outer)(None)), [1])
+        inner_wall = profiler.histograms[f'callback/{inner.__qualname__}/wall']
+        outer_wall = profiler.histograms[f'callback/{outer.__qualname__}/wall']
+        self.assertEqual(inner_wall.count, 1)
+        self.assertGreaterEqual(inner_wall.total, 0.05)
+        self.assertGreaterEqual(outer_wall.total, 0.01)
+        self.assertLess(outer_wall.total, 0.04)
+        self.assertGreaterEqual(profiler.totals['callbacks'], 0.06)
+
+    @defer.inlineCallbacks
+    def test_crawl(self):
+        crawler = get_crawler(ItemSpider, {
+            'PROFILER_ENABLED': True,
+            'PROFILER_LAG_INTERVAL': 0.01,
+            'ITEM_PIPELINES': {__name__ + '.CountPipeline': 100},
+        })
+        with MockServer() as mockserver:
+            yield crawler.crawl(total=5, maxlatency=0.1, mockserver=mockserver)
+        stats = crawler.stats.get_stats()
+        self.assertGreater(stats['profiler/reactor_lag/count'], 0)
+        # the start request has no callback
+        self.assertEqual(stats['profiler/callback/ItemSpider._parse/wall/count'], 1)
+        self.assertEqual(stats['profiler/callback/ItemSpider.parse/wall/count'],
+                         stats['response_received_count'] - 1)
+        self.assertIn('profiler/callback/ItemSpider.parse/cpu/p99', stats)
+        self.assertGreater(
+            stats['profiler/downloader_middleware/RetryMiddleware.process_response/count'], 0)
+        self.assertGreater(
+            stats['profiler/spider_middleware/OffsiteMiddleware.process_spider_output/count'], 0)
+        self.assertEqual(stats['profiler/item_pipeline/CountPipeline.process_item/count'],
+                         stats['item_scraped_count'])
+        self.assertIn('ItemSpider.parse', crawler.profiler.report())
@@ -0,0 +1,113 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from scrapy.core.downloader import Slot
+from scrapy.extensions.throttle import AutoThrottle
+from scrapy.http import Request, Response
+from scrapy.spiders import Spider
+from scrapy.utils.test import get_crawler
+
+
+class ConcurrencyModeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.crawler = get_crawler(Spider, {
+            'AUTOTHROTTLE_ENABLED': True,
+            'AUTOTHROTTLE_MODE': 'concurrency',
+            'AUTOTHROTTLE_MAX_CONCURRENCY': 8,
+            'AUTOTHROTTLE_HISTORY_SIZE': 10,
+        })
+        self.spider = self.crawler._create_spider('foo')
+        self.slot = Slot(concurrency=4, delay=0, randomize_delay=False)
+        self.crawler.engine = SimpleNamespace(
+            downloader=SimpleNamespace(slots={'foo.com': self.slot}))
+        self.crawler.stats.open_spider(self.spider)
+        self.throttle = AutoThrottle.from_crawler(self.crawler)
+        self.throttle._spider_opened(self.spider)
+        self.now = 1000.0
+
+    def download(self, status=200, latency=0.1, failed=False):
+        request = Request('http://foo.com', meta={'download_slot': 'foo.com',
+                                                  'download_latency': latency})
+        self.throttle._request_reached_downloader(request, self.spider)
+        with mock.patch('scrapy.extensions.throttle.time', return_value=self.now):
+            if not failed:
+                response = Response(request.url, status=status)
+                self.throttle._response_downloaded(response, request, self.spider)
+            self.throttle._request_left_downloader(request, self.spider)
+        self.now += latency
+
+    def test_slow_start(self):
+        self.download()
+        self.assertEqual(self.slot.concurrency, 2)
+        for _ in range(2):
+            self.download()
+        self.assertEqual(self.slot.concurrency, 4)
+        for _ in range(20):
+            self.download()
+        self.assertEqual(self.slot.concurrency, 8)
+        self.assertFalse(self.throttle._responded)
+
+    def test_back_off(self):
+        for _ in range(7):
+            self.download()
+        self.assertEqual(self.slot.concurrency, 8)
+        self.download(status=429, latency=0)
+        self.assertEqual(self.slot.concurrency, 4)
+        # the responses to the requests sent before are ignored
+        self.now += 0.05
+        self.download(status=503, latency=0.1)
+        self.assertEqual(self.slot.concurrency, 4)
+        self.now += 1
+        # additive increase after a back off
+        for _ in range(9):
+            self.download()
+        self.assertEqual(self.slot.concurrency, 4)
+        self.download()
+        self.assertEqual(self.slot.concurrency, 5)
+        self.assertEqual(self.crawler.stats.get_value('autothrottle/backoff'), 1)
+
+    def test_failure(self):
+        for _ in range(19):
+            self.download()
+        self.assertEqual(self.slot.concurrency, 8)
+        # occasional failures are ignored
+        self.download(failed=True, latency=0)
+        self.assertEqual(self.slot.concurrency, 8)
+        self.download(failed=True, latency=0)
+        self.assertEqual(self.slot.concurrency, 4)
+        self.download(failed=True, latency=0)
+        self.assertEqual(self.slot.concurrency, 4)
+
+    def test_latency(self):
+        for _ in range(3):
+            self.download(latency=0.1)
+        self.assertEqual(self.slot.concurrency, 4)
+        for _ in range(5):
+            self.download(latency=1.0)
+        self.assertEqual(self.slot.concurrency, 1)
+
+    def test_delay(self):
+        self.download()
+        self.download(status=429)
+        self.assertEqual(self.slot.concurrency, 1)
+        self.download(status=429)
+        self.assertEqual(self.slot.delay, 0.1)
+        self.download(status=429)
+        self.assertEqual(self.slot.delay, 0.2)
+        self.download()
+        self.assertEqual(self.slot.delay, 0.1)
+        self.assertEqual(self.slot.concurrency, 1)
+        for _ in range(4):
+            self.download()
+        self.assertEqual(self.slot.delay, 0)
+        self.assertEqual(self.slot.concurrency, 1)
+        for _ in range(10):
+            self.download()
+        self.assertEqual(self.slot.concurrency, 2)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            get_crawler(Spider, {'AUTOTHROTTLE_ENABLED': True,
+                                 'AUTOTHROTTLE_MODE': 'foo'})
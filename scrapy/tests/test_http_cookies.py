@@ -1,8 +1,9 @@
+import time
+from unittest import TestCase, mock
 from urllib.parse import urlparse
-from unittest import TestCase
 
 from scrapy.http import Request, Response
-from scrapy.http.cookies import WrappedRequest, WrappedResponse
+from scrapy.http.cookies import CookieJar, WrappedRequest, WrappedResponse
 
 
 class WrappedRequestTest(TestCase):
@@ -67,3 +68,38 @@ class WrappedResponseTest(TestCase):
     def test_get_all(self):
         # get_all result must be native string
         self.assertEqual(self.wrapped.get_all('content-type'), ['text/html'])
+
+
+class CookieJarTest(TestCase):
+
+    def _set_cookies(self, jar, url, *cookies):
+        request = Request(url)
+        response = Response(url, headers={'Set-Cookie': list(cookies)})
+        jar.extract_cookies(response, request)
+
+    def _add_cookie_header_later(self, jar, url, seconds):
+        request = Request(url)
+        with mock.patch('time.time', return_value=time.time() + seconds):
+            jar.add_cookie_header(request)
+        return request
+
+    def test_clear_expired_cookies(self):
+        jar = CookieJar(check_expired_frequency=1)
+        self._set_cookies(jar, 'http://www.example.com/', 'session=1',
+                          'short=1; Max-Age=100', 'long=1; Max-Age=1000')
+        self._set_cookies(jar, 'http://other.example.org/a/', 'short=1; Max-Age=100')
+        self.assertEqual(len(jar), 4)
+
+        request = self._add_cookie_header_later(jar, 'http://www.example.com/', 500)
+        self.assertCountEqual(request.headers['Cookie'].split(b'; '), [b'session=1', b'long=1'])
+        self.assertCountEqual([c.name for c in jar], ['session', 'long'])
+        self.assertNotIn('other.example.org', jar._cookies)
+
+    def test_replaced_cookie(self):
+        jar = CookieJar(check_expired_frequency=1)
+        self._set_cookies(jar, 'http://www.example.com/', 'token=1; Max-Age=100')
+        self._set_cookies(jar, 'http://www.example.com/', 'token=2; Max-Age=1000')
+        request = self._add_cookie_header_later(jar, 'http://www.example.com/', 500)
+        self.assertEqual(request.headers['Cookie'], b'token=2')
+        self.assertEqual(len(jar), 1)
+        self.assertEqual(len(jar.jar._expiry), 1)
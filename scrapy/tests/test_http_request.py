@@ -244,6 +244,25 @@ class RequestTest(unittest.TestCase):
         self.assertEqual(r4.meta, {})
         assert r4.dont_filter is False
 
+    def test_lazy_attributes(self):
+        r1 = Request("http://www.example.com")
+        r2 = r1.replace(url="http://www.example.com/2")
+        for r in (r1, r2):
+            self.assertIsNone(r._headers)
+            self.assertIsNone(r._cookies)
+            self.assertIsNone(r._flags)
+            self.assertEqual(vars(r), {})
+        self.assertEqual(r1.headers, {})
+        self.assertEqual(r1.cookies, {})
+        self.assertEqual(r1.flags, [])
+        r1.flags.append('cached')
+        r1.headers['X-Key'] = 'value'
+        self.assertEqual(r1.replace().flags, ['cached'])
+        self.assertEqual(r1.replace().headers[b'X-Key'], b'value')
+        # arbitrary attributes can still be set
+        r1.custom = 1
+        self.assertEqual(r1.custom, 1)
+
     def test_method_always_str(self):
         r = self.request_class("http://www.example.com", method="POST")
         assert isinstance(r.method, str)
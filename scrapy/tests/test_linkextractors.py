@@ -518,6 +518,44 @@ class LxmlLinkExtractorTestCase(Base.LinkExtractorTestCase):
     def test_restrict_xpaths_with_html_entities(self):
         super().test_restrict_xpaths_with_html_entities()
 
+    def test_single_pass(self):
+        html = b"""
+        <a href="/item1.html">Item 1</a>
+        <a href="/item1.html">Item 1 again</a>
+        <a href="/item2.html?b=2&a=1">Item 2</a>
+        <a href="/item2.html?a=1&b=2">Item 2 sorted</a>
+        <a href="/item3.html#top">Item 3</a>
+        <a href="/item3.html#bottom" rel="nofollow">Item 3 bottom</a>
+        <area href="/area.html" alt="area">
+        <img src="/image.png">
+        <a href="mailto:someone@example.org">Mail</a>
+        <a href="/other.html">Other</a>
+        """
+        response = HtmlResponse("http://example.org/index.html", body=html)
+        for kwargs in [
+            {},
+            {'unique': False},
+            {'canonicalize': True},
+            {'canonicalize': True, 'unique': False},
+            {'deny': 'other', 'restrict_text': 'Item'},
+            {'restrict_text': 'again'},
+            {'tags': 'img', 'attrs': 'src', 'deny_extensions': []},
+            {'process_value': lambda value: value.replace('item', 'page')},
+        ]:
+            lx = self.extractor_cls(**kwargs)
+            self.assertTrue(lx._single_pass)
+            links = lx.extract_links(response)
+            lx._single_pass = False
+            self.assertEqual(links, lx.extract_links(response), kwargs)
+
+        class CustomLinkExtractor(LxmlLinkExtractor):
+            def _link_allowed(self, link):
+                return link.text != 'Other' and super()._link_allowed(link)
+
+        lx = CustomLinkExtractor()
+        self.assertFalse(lx._single_pass)
+        self.assertNotIn('Other', [link.text for link in lx.extract_links(response)])
+
     def test_filteringlinkextractor_deprecation_warning(self):
         """Make sure the FilteringLinkExtractor deprecation warning is not
         issued for LxmlLinkExtractor"""
@@ -0,0 +1,142 @@
+import unittest
+from unittest import mock
+
+from twisted.internet import defer
+from twisted.internet.base import ThreadedResolver
+from twisted.internet.error import DNSLookupError
+
+from scrapy.resolver import CachingThreadedResolver, dnscache, ExpiringCache
+from scrapy.spiders import Spider
+from scrapy.utils.test import get_crawler
+
+
+class ExpiringCacheTest(unittest.TestCase):
+
+    def test_expiry(self):
+        cache = ExpiringCache(ttl=10)
+        with mock.patch('scrapy.resolver.time', return_value=1000):
+            cache['a'] = 1
+            cache.set('b', 2, ttl=30)
+        with mock.patch('scrapy.resolver.time', return_value=1020):
+            self.assertNotIn('a', cache)
+            self.assertEqual(cache.get('a', 'default'), 'default')
+            self.assertEqual(cache['b'], 2)
+            self.assertRaises(KeyError, cache.__getitem__, 'a')
+        self.assertEqual(list(cache), ['b'])
+
+    def test_limit(self):
+        cache = ExpiringCache(limit=2)
+        cache['a'] = 1
+        cache['b'] = 2
+        cache['a'] = 3
+        cache['c'] = 4
+        self.assertEqual(list(cache), ['a', 'c'])
+        self.assertEqual(cache['a'], 3)
+
+
+class CachingThreadedResolverTest(unittest.TestCase):
+
+    def setUp(self):
+        dnscache.clear()
+        self.addCleanup(dnscache.clear)
+        self.queries = {}
+        patcher = mock.patch.object(ThreadedResolver, 'getHostByName', self.query)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.now = 1000.0
+        patcher = mock.patch('scrapy.resolver.time', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.crawler = get_crawler(Spider)
+        self.stats = self.crawler.stats
+        self.resolver = CachingThreadedResolver(mock.Mock(), 100, 5, ttl=60, negative_ttl=10,
+                                                crawlers=[self.crawler])
+
+    def query(self, name, timeout):
+        self.assertNotIn(name, self.queries)
+        self.assertEqual(timeout, (5,))
+        self.queries[name] = defer.Deferred()
+        return self.queries[name]
+
+    def resolve(self, name, result, latency=0.1):
+        self.now += latency
+        d = self.queries.pop(name)
+        if isinstance(result, Exception):
+            d.errback(result)
+        else:
+            d.callback(result)
+
+    def lookup(self, name):
+        results = []
+        self.resolver.getHostByName(name).addBoth(results.append)
+        return results
+
+    def test_cache(self):
+        first = self.lookup('example.com')
+        second = self.lookup('example.com')
+        self.assertEqual(list(self.queries), ['example.com'])
+        self.resolve('example.com', '10.0.0.1', latency=0.5)
+        self.assertEqual(first, ['10.0.0.1'])
+        self.assertEqual(second, ['10.0.0.1'])
+        self.assertEqual(self.lookup('example.com'), ['10.0.0.1'])
+        self.assertFalse(self.queries)
+        self.assertEqual(self.stats.get_value('dnscache/miss'), 1)
+        self.assertEqual(self.stats.get_value('dnscache/pending_hit'), 1)
+        self.assertEqual(self.stats.get_value('dnscache/hit'), 1)
+        self.assertAlmostEqual(self.stats.get_value('dnscache/hit_rate'), 1 / 3)
+        self.assertEqual(self.stats.get_value('dns/resolved'), 1)
+        self.assertAlmostEqual(self.stats.get_value('dns/latency/mean'), 0.5)
+        self.assertAlmostEqual(self.stats.get_value('dns/latency/max'), 0.5)
+
+    def test_ttl(self):
+        self.lookup('example.com')
+        self.resolve('example.com', '10.0.0.1')
+        self.now += 59
+        self.assertEqual(self.lookup('example.com'), ['10.0.0.1'])
+        self.now += 1
+        result = self.lookup('example.com')
+        self.assertFalse(result)
+        self.resolve('example.com', '10.0.0.2')
+        self.assertEqual(result, ['10.0.0.2'])
+        self.assertEqual(self.stats.get_value('dnscache/miss'), 2)
+
+    def test_negative_cache(self):
+        first = self.lookup('example.com')
+        self.resolve('example.com', DNSLookupError('not found'))
+        self.assertIsInstance(first[0].value, DNSLookupError)
+        second = self.lookup('example.com')
+        self.assertFalse(self.queries)
+        self.assertIsInstance(second[0].value, DNSLookupError)
+        self.assertEqual(self.stats.get_value('dnscache/negative_hit'), 1)
+        self.assertEqual(self.stats.get_value('dns/failed'), 1)
+        self.now += 10
+        self.lookup('example.com')
+        self.assertEqual(list(self.queries), ['example.com'])
+
+    def test_timeout_not_cached(self):
+        first = self.lookup('example.com')
+        self.resolve('example.com', DNSLookupError('timeout error'), latency=5)
+        self.assertIsInstance(first[0].value, DNSLookupError)
+        self.lookup('example.com')
+        self.assertEqual(list(self.queries), ['example.com'])
+
+    def test_prefetch(self):
+        prefetched = []
+        self.resolver.prefetch('example.com').addBoth(prefetched.append)
+        self.assertIsNone(self.resolver.prefetch('example.com'))
+        result = self.lookup('example.com')
+        self.resolve('example.com', '10.0.0.1')
+        self.assertEqual(prefetched, ['10.0.0.1'])
+        self.assertEqual(result, ['10.0.0.1'])
+        self.assertIsNone(self.resolver.prefetch('example.com'))
+        self.assertEqual(self.stats.get_value('dnscache/prefetch'), 1)
+        self.assertEqual(self.stats.get_value('dnscache/pending_hit'), 1)
+        self.assertIsNone(self.stats.get_value('dnscache/miss'))
+
+    def test_cache_disabled(self):
+        resolver = CachingThreadedResolver(mock.Mock(), 0, 5, ttl=60, negative_ttl=10)
+        for result in ('10.0.0.1', DNSLookupError('not found')):
+            resolver.getHostByName('example.com')
+            self.resolve('example.com', result)
+        self.assertFalse(dnscache)
+        self.assertIsNone(resolver.failures)
@@ -2,10 +2,13 @@ import shutil
 import tempfile
 import unittest
 import collections
+import time
+from unittest import mock
 
 from twisted.internet import defer
 from twisted.trial.unittest import TestCase
 
+from scrapy import signals
 from scrapy.crawler import Crawler
 from scrapy.core.downloader import Downloader
 from scrapy.core.scheduler import Scheduler
@@ -21,8 +24,9 @@ MockSlot = collections.namedtuple('MockSlot', ['active'])
 
 
 class MockDownloader:
-    def __init__(self):
+    def __init__(self, signals):
         self.slots = dict()
+        self.signals = signals
 
     def _get_slot_key(self, request, spider):
         if Downloader.DOWNLOAD_SLOT in request.meta:
@@ -30,39 +34,48 @@ class MockDownloader:
 
         return urlparse_cached(request).hostname or ''
 
-    def increment(self, slot_key):
+    def increment(self, request):
+        slot_key = self._get_slot_key(request, None)
         slot = self.slots.setdefault(slot_key, MockSlot(active=list()))
         slot.active.append(1)
+        self.signals.send_catch_log(signal=signals.request_reached_downloader,
+                                    request=request, spider=None)
 
-    def decrement(self, slot_key):
+    def decrement(self, request):
+        slot_key = self._get_slot_key(request, None)
         slot = self.slots.get(slot_key)
         slot.active.pop()
+        self.signals.send_catch_log(signal=signals.request_left_downloader,
+                                    request=request, spider=None)
 
     def close(self):
         pass
 
 
 class MockCrawler(Crawler):
-    def __init__(self, priority_queue_cls, jobdir):
+    def __init__(self, priority_queue_cls, jobdir,
+                 disk_queue_cls='scrapy.squeues.PickleLifoDiskQueue'):
 
         settings = dict(
             SCHEDULER_DEBUG=False,
-            SCHEDULER_DISK_QUEUE='scrapy.squeues.PickleLifoDiskQueue',
+            SCHEDULER_DISK_QUEUE=disk_queue_cls,
             SCHEDULER_MEMORY_QUEUE='scrapy.squeues.LifoMemoryQueue',
             SCHEDULER_PRIORITY_QUEUE=priority_queue_cls,
             JOBDIR=jobdir,
             DUPEFILTER_CLASS='scrapy.dupefilters.BaseDupeFilter',
         )
         super().__init__(Spider, settings)
-        self.engine = MockEngine(downloader=MockDownloader())
+        self.engine = MockEngine(downloader=MockDownloader(self.signals))
 
 
 class SchedulerHandler:
     priority_queue_cls = None
     jobdir = None
+    disk_queue_cls = 'scrapy.squeues.PickleLifoDiskQueue'
 
     def create_scheduler(self):
-        self.mock_crawler = MockCrawler(self.priority_queue_cls, self.jobdir)
+        self.mock_crawler = MockCrawler(self.priority_queue_cls, self.jobdir,
+                                        self.disk_queue_cls)
         self.scheduler = Scheduler.from_crawler(self.mock_crawler)
         self.spider = Spider(name='spider')
         self.scheduler.open(self.spider)
@@ -121,6 +134,19 @@ class BaseSchedulerInMemoryTester(SchedulerHandler):
         self.assertEqual(priorities,
                          sorted([x[1] for x in _PRIORITIES], key=lambda x: -x))
 
+    def test_dequeue_many_priorities(self):
+        priorities = [(i * 7919) % 500 for i in range(500)]
+        for priority in priorities:
+            self.scheduler.enqueue_request(
+                Request('http://foo.com/%d' % priority, priority=priority))
+
+        dequeued = list()
+        while self.scheduler.has_pending_requests():
+            dequeued.append(self.scheduler.next_request().priority)
+            self.assertEqual(len(self.scheduler), len(priorities) - len(dequeued))
+
+        self.assertEqual(dequeued, sorted(priorities, reverse=True))
+
 
 class BaseSchedulerOnDiskTester(SchedulerHandler):
 
@@ -183,6 +209,75 @@ class TestSchedulerOnDisk(BaseSchedulerOnDiskTester, unittest.TestCase):
     priority_queue_cls = 'scrapy.pqueues.ScrapyPriorityQueue'
 
 
+class TestSchedulerOnDiskCompact(BaseSchedulerOnDiskTester, unittest.TestCase):
+    priority_queue_cls = 'scrapy.pqueues.ScrapyPriorityQueue'
+    disk_queue_cls = 'scrapy.squeues.CompactLifoDiskQueue'
+
+
+class DelayedRequestsTestMixin:
+    priority_queue_cls = 'scrapy.pqueues.ScrapyPriorityQueue'
+    reopen = False
+
+    def _reopen(self):
+        if self.reopen:
+            self.close_scheduler()
+            self.create_scheduler()
+
+    def _dequeue(self, now):
+        with mock.patch('scrapy.core.scheduler.time', return_value=now):
+            urls = []
+            while True:
+                request = self.scheduler.next_request()
+                if request is None:
+                    return urls
+                urls.append(request.url)
+
+    def test_delayed(self):
+        now = time.time()
+        self.scheduler.enqueue_request(Request('http://foo.com/a'))
+        self.scheduler.enqueue_request(Request('http://foo.com/b', meta={'not_before': now + 300}))
+        self.scheduler.enqueue_request(Request('http://foo.com/c', meta={'not_before': now + 10}))
+        self.scheduler.enqueue_request(Request('http://foo.com/d', meta={'not_before': now - 10}))
+        self._reopen()
+
+        self.assertEqual(len(self.scheduler), 4)
+        self.assertEqual(sorted(self._dequeue(now)), ['http://foo.com/a', 'http://foo.com/d'])
+        self.assertTrue(self.scheduler.has_pending_requests())
+        self.assertEqual(self._dequeue(now + 11), ['http://foo.com/c'])
+        self._reopen()
+        self.assertEqual(len(self.scheduler), 1)
+        self.assertEqual(self._dequeue(now + 299), [])
+        self.assertEqual(self._dequeue(now + 301), ['http://foo.com/b'])
+        self.assertFalse(self.scheduler.has_pending_requests())
+
+        stats = self.mock_crawler.stats
+        if not self.reopen:
+            self.assertEqual(stats.get_value('scheduler/enqueued/delayed'), 2)
+            self.assertEqual(stats.get_value('scheduler/delayed/released'), 2)
+            # released requests are not counted again per queue
+            self.assertEqual(stats.get_value('scheduler/enqueued/memory'), 2)
+            self.assertEqual(stats.get_value('scheduler/enqueued'), 4)
+
+    def test_wakeup(self):
+        self.scheduler.enqueue_request(
+            Request('http://foo.com/a', meta={'not_before': time.time() + 300}))
+        self.scheduler.enqueue_request(
+            Request('http://foo.com/b', meta={'not_before': time.time() + 10}))
+        wakeup = self.scheduler._wakeup
+        self.assertTrue(wakeup.active())
+        self.assertLess(wakeup.getTime() - wakeup.seconds(), 11)
+
+
+class TestDelayedRequestsInMemory(DelayedRequestsTestMixin, SchedulerHandler,
+                                  unittest.TestCase):
+    pass
+
+
+class TestDelayedRequestsOnDisk(DelayedRequestsTestMixin, BaseSchedulerOnDiskTester,
+                                unittest.TestCase):
+    reopen = True
+
+
 _URLS_WITH_SLOTS = [("http://foo.com/a", 'a'),
                     ("http://foo.com/b", 'a'),
                     ("http://foo.com/c", 'b'),
@@ -267,18 +362,43 @@ class DownloaderAwareSchedulerTestMixin:
             # pylint: disable=protected-access
             slot = downloader._get_slot_key(request, None)
             dequeued_slots.append(slot)
-            downloader.increment(slot)
+            downloader.increment(request)
             requests.append(request)
 
         for request in requests:
-            # pylint: disable=protected-access
-            slot = downloader._get_slot_key(request, None)
-            downloader.decrement(slot)
+            downloader.decrement(request)
 
         self.assertTrue(_is_scheduling_fair(list(s for u, s in _URLS_WITH_SLOTS),
                                             dequeued_slots))
         self.assertEqual(sum(len(s.active) for s in downloader.slots.values()), 0)
 
+    def test_active_downloads(self):
+        for url, slot in _URLS_WITH_SLOTS:
+            request = Request(url)
+            request.meta[Downloader.DOWNLOAD_SLOT] = slot
+            self.scheduler.enqueue_request(request)
+
+        if self.reopen:
+            self.close_scheduler()
+            self.create_scheduler()
+
+        downloader = self.mock_crawler.engine.downloader
+        active = [Request('http://foo.com/active', meta={Downloader.DOWNLOAD_SLOT: slot})
+                  for slot in ('a', 'a', 'b')]
+        for request in active:
+            downloader.increment(request)
+
+        dequeued_slots = list()
+        while self.scheduler.has_pending_requests():
+            request = self.scheduler.next_request()
+            # pylint: disable=protected-access
+            dequeued_slots.append(downloader._get_slot_key(request, None))
+
+        for request in active:
+            downloader.decrement(request)
+
+        self.assertEqual(dequeued_slots, ['c', 'c', 'b', 'b', 'a', 'a'])
+
 
 class TestSchedulerWithDownloaderAwareInMemory(DownloaderAwareSchedulerTestMixin,
                                                BaseSchedulerInMemoryTester,
@@ -577,6 +577,37 @@ Sitemap: /sitemap-relative-url.xml
         self.assertEqual([req.url for req in spider._parse_sitemap(r)],
                          ['http://www.example.com/sitemap2.xml'])
 
+    def test_gzipped_sitemap(self):
+        sitemap = b"""<?xml version="1.0" encoding="UTF-8"?>
+    <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+    """ + b"".join(b"<url><loc>http://www.example.com/%d</loc></url>" % i
+                   for i in range(2000)) + b"</urlset>"
+        r = Response(url="http://www.example.com/sitemap.xml.gz", body=gzip.compress(sitemap))
+        spider = self.spider_class("example.com")
+        self.assertEqual([req.url for req in spider._parse_sitemap(r)],
+                         [f'http://www.example.com/{i}' for i in range(2000)])
+
+    def test_invalid_gzipped_sitemap(self):
+        r = Response(url="http://www.example.com/sitemap.xml.gz",
+                     body=self.GZBODY[:3] + b'invalid')
+        spider = self.spider_class("example.com")
+        with LogCapture() as log:
+            self.assertEqual(list(spider._parse_sitemap(r)), [])
+        self.assertIn('Ignoring invalid sitemap', str(log))
+
+    def test_get_sitemap_body_override(self):
+        class CustomSitemapSpider(self.spider_class):
+            def _get_sitemap_body(self, response):
+                return b"""<?xml version="1.0" encoding="UTF-8"?>
+    <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+        <url><loc>http://www.example.com/custom/</loc></url>
+    </urlset>"""
+
+        r = HtmlResponse(url="http://www.example.com/", body=self.BODY)
+        spider = CustomSitemapSpider("example.com")
+        self.assertEqual([req.url for req in spider._parse_sitemap(r)],
+                         ['http://www.example.com/custom/'])
+
 
 class DeprecationTest(unittest.TestCase):
 
@@ -1,3 +1,4 @@
+import re
 from unittest import TestCase
 from urllib.parse import urlparse
 import warnings
@@ -5,6 +6,7 @@ import warnings
 from scrapy.http import Response, Request
 from scrapy.spiders import Spider
 from scrapy.spidermiddlewares.offsite import OffsiteMiddleware, URLWarning, PortWarning
+from scrapy.utils.httpobj import urlparse_cached
 from scrapy.utils.test import get_crawler
 
 
@@ -86,6 +88,14 @@ class TestOffsiteMiddleware5(TestOffsiteMiddleware4):
             self.mw.get_host_regex(self.spider)
             assert issubclass(w[-1].category, URLWarning)
 
+    def test_spider_opened(self):
+        self.spider.allowed_domains = ['http://scrapytest.org', 'scrapy.org', 'scrapy.test.org']
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            self.mw.spider_opened(self.spider)
+            assert issubclass(w[-1].category, URLWarning)
+        self.assertEqual(self.mw.domain_matcher.domains, {'scrapy.org', 'scrapy.test.org'})
+
 
 class TestOffsiteMiddleware6(TestOffsiteMiddleware4):
 
@@ -95,3 +105,50 @@ class TestOffsiteMiddleware6(TestOffsiteMiddleware4):
             warnings.simplefilter("always")
             self.mw.get_host_regex(self.spider)
             assert issubclass(w[-1].category, PortWarning)
+
+
+class CustomHostRegexOffsiteMiddleware(OffsiteMiddleware):
+
+    def get_host_regex(self, spider):
+        return re.compile(r'^scrapytest\.org$')
+
+
+class TestOffsiteMiddleware7(TestCase):
+
+    def test_get_host_regex_overridden(self):
+        crawler = get_crawler(Spider)
+        spider = crawler._create_spider(name='foo', allowed_domains=['scrapy.org'])
+        mw = CustomHostRegexOffsiteMiddleware.from_crawler(crawler)
+        mw.spider_opened(spider)
+        res = Response('http://scrapytest.org')
+        reqs = [Request('http://scrapytest.org/1'), Request('http://sub.scrapytest.org/1'),
+                Request('http://scrapy.org/1')]
+        out = list(mw.process_spider_output(res, reqs, spider))
+        self.assertEqual(out, reqs[:1])
+
+
+class CustomShouldFollowOffsiteMiddleware(OffsiteMiddleware):
+
+    def should_follow(self, request, spider):
+        return bool(self.host_regex.search(urlparse_cached(request).hostname))
+
+
+class TestOffsiteMiddleware8(TestCase):
+
+    def test_host_regex_in_should_follow(self):
+        crawler = get_crawler(Spider)
+        spider = crawler._create_spider(name='foo', allowed_domains=['scrapy.org'])
+        mw = CustomShouldFollowOffsiteMiddleware.from_crawler(crawler)
+        mw.spider_opened(spider)
+        res = Response('http://scrapy.org')
+        reqs = [Request('http://scrapy.org/1'), Request('http://sub.scrapy.org/1'),
+                Request('http://scrapytest.org/1')]
+        out = list(mw.process_spider_output(res, reqs, spider))
+        self.assertEqual(out, reqs[:2])
+
+
+class TestOffsiteMiddlewareManyDomains(TestOffsiteMiddleware):
+
+    def _get_spiderargs(self):
+        domains = [f'domain{i}.example' for i in range(10000)]
+        return dict(name='foo', allowed_domains=domains + ['scrapytest.org', 'scrapy.org', 'scrapy.test.org'])
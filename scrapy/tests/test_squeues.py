@@ -1,8 +1,16 @@
+import os
 import pickle
 import sys
+import unittest
 
+from queuelib.tests import QueuelibTestCase
 from queuelib.tests import test_queue as t
+from scrapy.spiders import Spider
 from scrapy.squeues import (
+    CompactFifoDiskQueue,
+    CompactFifoMemoryQueue,
+    CompactLifoDiskQueue,
+    CompactLifoMemoryQueue,
     MarshalFifoDiskQueueNonRequest as MarshalFifoDiskQueue,
     MarshalLifoDiskQueueNonRequest as MarshalLifoDiskQueue,
     PickleFifoDiskQueueNonRequest as PickleFifoDiskQueue,
@@ -12,6 +20,7 @@ from scrapy.item import Item, Field
 from scrapy.http import Request
 from scrapy.loader import ItemLoader
 from scrapy.selector import Selector
+from scrapy.utils.test import get_crawler
 
 
 class TestItem(Item):
@@ -189,3 +198,128 @@ class PickleLifoDiskQueueTest(t.LifoDiskQueueTest, LifoDiskQueueTestMixin):
         assert isinstance(r2, Request)
         self.assertEqual(r.url, r2.url)
         assert r2.meta['request'] is r2
+
+
+class CompactQueueSpider(Spider):
+    name = 'compact'
+
+    def parse_page(self, response):
+        pass
+
+
+class CompactQueueTestMixin:
+
+    lifo = False
+
+    def setUp(self):
+        super().setUp()
+        self.crawler = get_crawler(CompactQueueSpider)
+        self.crawler.spider = self.crawler._create_spider()
+
+    def requests(self):
+        spider = self.crawler.spider
+        for i in range(5):
+            yield Request('http://www.example.com/%d' % i,
+                          callback=spider.parse_page,
+                          headers={'Referer': 'http://www.example.com'},
+                          meta={'depth': i}, priority=i)
+
+    def assertSameRequests(self, q, requests):
+        if self.lifo:
+            requests = list(reversed(requests))
+        for r in requests:
+            r2 = q.pop()
+            self.assertEqual(r.url, r2.url)
+            self.assertEqual(r.callback, r2.callback)
+            self.assertEqual(r.headers, r2.headers)
+            self.assertEqual(r.meta, r2.meta)
+            self.assertEqual(r.priority, r2.priority)
+        self.assertIsNone(q.pop())
+
+
+class CompactFifoDiskQueueTest(CompactQueueTestMixin, QueuelibTestCase):
+
+    queue_class = CompactFifoDiskQueue
+
+    def queue(self):
+        return self.queue_class(self.crawler, self.qpath)
+
+    def test_push_pop(self):
+        q = self.queue()
+        requests = list(self.requests())
+        for r in requests:
+            q.push(r)
+        self.assertEqual(len(q), 5)
+        self.assertSameRequests(q, requests)
+        q.close()
+
+    def test_reopen(self):
+        q = self.queue()
+        requests = list(self.requests())
+        for r in requests:
+            q.push(r)
+        q.close()
+        q = self.queue()
+        self.assertEqual(len(q), 5)
+        self.assertSameRequests(q, requests)
+        q.close()
+
+    def test_symbols_file_removed(self):
+        q = self.queue()
+        q.push(next(self.requests()))
+        self.assertTrue(os.path.exists(self.qpath + '.symbols'))
+        q.pop()
+        q.close()
+        self.assertFalse(os.path.exists(self.qpath + '.symbols'))
+
+    def test_unserializable_request(self):
+        q = self.queue()
+        r = Request('http://www.example.com', callback=lambda x: x)
+        self.assertRaises(ValueError, q.push, r)
+        r = Request('http://www.example.com', meta={'new key': lambda x: x})
+        self.assertRaises(ValueError, q.push, r)
+        self.assertEqual(len(q), 0)
+        # symbols created by a failed push are saved with the next one
+        requests = list(self.requests())
+        q.push(requests[0])
+        q.close()
+        q = self.queue()
+        self.assertIn('new key', q.codec.symbols)
+        self.assertSameRequests(q, requests[:1])
+        q.close()
+
+
+class CompactLifoDiskQueueTest(CompactFifoDiskQueueTest):
+
+    queue_class = CompactLifoDiskQueue
+    lifo = True
+
+
+class CompactFifoMemoryQueueTest(CompactQueueTestMixin, unittest.TestCase):
+
+    queue_class = CompactFifoMemoryQueue
+
+    def queue(self):
+        return self.queue_class.from_crawler(self.crawler, 'key')
+
+    def test_push_pop(self):
+        q = self.queue()
+        requests = list(self.requests())
+        for r in requests:
+            q.push(r)
+        self.assertEqual(len(q), 5)
+        self.assertTrue(all(isinstance(data, bytes) for data in q.queue.q))
+        self.assertSameRequests(q, requests)
+
+    def test_unserializable_request(self):
+        q = self.queue()
+        r = Request('http://www.example.com', callback=lambda x: x)
+        q.push(r)
+        self.assertEqual(len(q), 1)
+        self.assertIs(q.pop(), r)
+
+
+class CompactLifoMemoryQueueTest(CompactFifoMemoryQueueTest):
+
+    queue_class = CompactLifoMemoryQueue
+    lifo = True
@@ -0,0 +1,86 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from scrapy.utils.bloom import BloomFilter, ScalableBloomFilter
+
+
+def _digests(n, prefix=''):
+    return [hashlib.sha1(('%s%d' % (prefix, i)).encode()).hexdigest() for i in range(n)]
+
+
+class BloomFilterTest(unittest.TestCase):
+
+    def test_add_contains(self):
+        bf = BloomFilter(1000, 0.01)
+        digests = _digests(1000)
+        added = sum(bf.add(digest) for digest in digests)
+        self.assertGreater(added, 990)
+        self.assertEqual(len(bf), added)
+        for digest in digests:
+            self.assertIn(digest, bf)
+            self.assertIn(bytes.fromhex(digest), bf)
+            self.assertFalse(bf.add(digest))
+
+    def test_error_rate(self):
+        bf = BloomFilter(2000, 0.01)
+        for digest in _digests(2000):
+            bf.add(digest)
+        false_positives = sum(digest in bf for digest in _digests(10000, 'other'))
+        self.assertLess(false_positives, 200)
+        self.assertGreater(bf.fill_ratio, 0.4)
+        self.assertLess(bf.fill_ratio, 0.6)
+        self.assertAlmostEqual(bf.estimated_error_rate, 0.01, delta=0.005)
+
+    def test_invalid_arguments(self):
+        self.assertRaises(ValueError, BloomFilter, 1000, 0)
+        self.assertRaises(ValueError, BloomFilter, 1000, 1)
+        self.assertRaises(ValueError, BloomFilter, 0, 0.01)
+
+
+class ScalableBloomFilterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_scalable(self):
+        sbf = ScalableBloomFilter(100, 0.01)
+        digests = _digests(1000)
+        added = sum(sbf.add(digest) for digest in digests)
+        self.assertGreater(added, 990)
+        self.assertEqual(len(sbf.filters), 4)
+        self.assertTrue(all(digest in sbf for digest in digests))
+        false_positives = sum(digest in sbf for digest in _digests(10000, 'other'))
+        self.assertLess(false_positives, 200)
+
+    def test_not_scalable(self):
+        sbf = ScalableBloomFilter(100, 0.01, scalable=False)
+        nbytes = sbf.nbytes
+        for digest in _digests(1000):
+            sbf.add(digest)
+        self.assertEqual(len(sbf.filters), 1)
+        self.assertEqual(sbf.nbytes, nbytes)
+        self.assertGreater(sbf.estimated_error_rate, 0.5)
+
+    def test_persistence(self):
+        digests = _digests(500)
+        sbf = ScalableBloomFilter(100, 0.01, self.path)
+        for digest in digests:
+            sbf.add(digest)
+        count, nfilters = len(sbf), len(sbf.filters)
+        sbf.close()
+        self.assertTrue(os.path.exists(os.path.join(self.path, 'info.json')))
+
+        # parameters are taken from the stored filter
+        sbf = ScalableBloomFilter(1000, 0.1, self.path)
+        self.assertEqual(sbf.capacity, 100)
+        self.assertEqual(sbf.error_rate, 0.01)
+        self.assertEqual(len(sbf), count)
+        self.assertEqual(len(sbf.filters), nfilters)
+        self.assertTrue(all(digest in sbf for digest in digests))
+        sbf.close()
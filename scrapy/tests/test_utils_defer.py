@@ -82,6 +82,35 @@ class DeferUtilsTest(unittest.TestCase):
         x = yield process_chain_both([eb1, cb2, cb3], [eb1, None, None], fail, 'v1', 'v2')
         self.assertEqual(x, "(cb3 (cb2 (eb1 ZeroDivisionError v1 v2) v1 v2) v1 v2)")
 
+    def test_process_chain_unfired_deferred(self):
+        dfd = defer.Deferred()
+        calls = []
+
+        def cb_deferred(value, arg1, arg2):
+            calls.append(value)
+            return dfd
+
+        d = process_chain([cb1, cb_deferred, cb3], 'res', 'v1', 'v2')
+        self.assertEqual(calls, ['(cb1 res v1 v2)'])
+        self.assertNoResult(d)
+        dfd.callback('deferred')
+        self.assertEqual(self.successResultOf(d), '(cb3 deferred v1 v2)')
+
+    def test_process_chain_coroutine(self):
+        async def cb_coro(value, arg1, arg2):
+            return await cb2(value, arg1, arg2)
+
+        d = process_chain([cb1, cb_coro, cb3], 'res', 'v1', 'v2')
+        self.assertEqual(self.successResultOf(d), "(cb3 (cb2 (cb1 res v1 v2) v1 v2) v1 v2)")
+
+    def test_process_chain_both_unfired_deferred(self):
+        dfd = defer.Deferred()
+        d = process_chain_both([lambda v, *a: dfd, cb1, cb3], [None, eb1, None],
+                               'res', 'v1', 'v2')
+        self.assertNoResult(d)
+        dfd.errback(ZeroDivisionError())
+        self.assertEqual(self.successResultOf(d), "(cb3 (eb1 ZeroDivisionError v1 v2) v1 v2)")
+
     @defer.inlineCallbacks
     def test_process_parallel(self):
         x = yield process_parallel([cb1, cb2, cb3], 'res', 'v1', 'v2')
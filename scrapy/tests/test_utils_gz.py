@@ -1,9 +1,11 @@
+import gzip
 import unittest
+import zlib
 from os.path import join
 
 from w3lib.encoding import html_to_unicode
 
-from scrapy.utils.gz import gunzip, gzip_magic_number
+from scrapy.utils.gz import IncrementalDecoder, gunzip, gunzip_chunks, gzip_magic_number
 from scrapy.http import Response
 from tests import tests_datadir
 
@@ -40,6 +42,18 @@ class GunzipTest(unittest.TestCase):
             assert r2.body.endswith(b'</html>')
             self.assertFalse(gzip_magic_number(r2))
 
+    def test_gunzip_chunks(self):
+        for name in ('feed-sample1.xml.gz', 'truncated-crc-error.gz', 'unexpected-eof.gz'):
+            with open(join(SAMPLEDIR, name), 'rb') as f:
+                data = f.read()
+            chunks = list(gunzip_chunks(data, chunk_size=100))
+            self.assertGreater(len(chunks), 1)
+            self.assertEqual(b''.join(chunks), gunzip(data))
+
+    def test_gunzip_chunks_no_gzip_file_raises(self):
+        with open(join(SAMPLEDIR, 'feed-sample1.xml'), 'rb') as f:
+            self.assertRaises(zlib.error, list, gunzip_chunks(f.read()))
+
     def test_is_gzipped_empty(self):
         r1 = Response("http://www.example.com")
         self.assertFalse(gzip_magic_number(r1))
@@ -51,3 +65,41 @@ class GunzipTest(unittest.TestCase):
                 expected_text = o.read().decode("utf-8")
                 self.assertEqual(len(text), len(expected_text))
                 self.assertEqual(text, expected_text)
+
+
+class IncrementalDecoderTest(unittest.TestCase):
+
+    def _decode(self, data, encoding=b'gzip', chunksize=7):
+        decoder = IncrementalDecoder(encoding)
+        decoded = [decoder.decode(data[i:i + chunksize])
+                   for i in range(0, len(data), chunksize)]
+        decoded.append(decoder.flush())
+        return b''.join(decoded)
+
+    def test_same_as_gunzip(self):
+        for name in ('feed-sample1.xml.gz', 'truncated-crc-error.gz',
+                     'truncated-crc-error-short.gz', 'unexpected-eof.gz',
+                     'html-gzip.bin'):
+            with open(join(SAMPLEDIR, name), 'rb') as f:
+                data = f.read()
+            for chunksize in (1, 100, len(data)):
+                self.assertEqual(self._decode(data, chunksize=chunksize), gunzip(data))
+
+    def test_deflate(self):
+        for name in ('html-rawdeflate.bin', 'html-zlibdeflate.bin'):
+            with open(join(SAMPLEDIR, name), 'rb') as f:
+                data = f.read()
+            decoded = self._decode(data, b'deflate')
+            self.assertTrue(decoded.startswith(b'<!DOCTYPE'))
+            self.assertEqual(decoded, self._decode(data, b'deflate', len(data)))
+
+    def test_concatenated_members(self):
+        data = gzip.compress(b'abc' * 1000) + gzip.compress(b'def' * 1000) + b'\0' * 10
+        self.assertEqual(self._decode(data), b'abc' * 1000 + b'def' * 1000)
+
+    def test_not_encoded(self):
+        with open(join(SAMPLEDIR, 'feed-sample1.xml'), 'rb') as f:
+            data = f.read()
+        decoder = IncrementalDecoder(b'gzip')
+        self.assertRaises(zlib.error, decoder.decode, data[:100])
+        self.assertEqual(decoder.received, [data[:100]])
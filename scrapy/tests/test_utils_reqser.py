@@ -2,7 +2,7 @@ import unittest
 
 from scrapy.http import Request, FormRequest
 from scrapy.spiders import Spider
-from scrapy.utils.reqser import request_to_dict, request_from_dict
+from scrapy.utils.reqser import RequestCodec, request_to_dict, request_from_dict
 
 
 class RequestSerializationTest(unittest.TestCase):
@@ -133,6 +133,70 @@ class RequestSerializationTest(unittest.TestCase):
         self.assertRaises(ValueError, request_to_dict, r, spider=spider)
 
 
+class RequestCodecTest(RequestSerializationTest):
+
+    def _assert_serializes_ok(self, request, spider=None):
+        codec = RequestCodec(spider)
+        data = codec.encode(request)
+        self.assertIsInstance(data, bytes)
+        request2 = RequestCodec(spider, codec.symbols).decode(data)
+        self._assert_same_request(request, request2)
+
+    def test_symbols(self):
+        codec = RequestCodec(self.spider)
+        r1 = Request("http://www.example.com/1", callback=self.spider.parse_item,
+                     headers={'Referer': 'http://www.example.com'},
+                     meta={'depth': 1, 1: 'non-str key'})
+        r2 = Request("http://www.example.com/2", callback=self.spider.parse_item,
+                     headers={'Referer': 'http://www.example.com/1'},
+                     meta={'depth': 2})
+        data1 = codec.encode(r1)
+        symbols = list(codec.symbols)
+        self.assertIn('parse_item', symbols)
+        self.assertIn(b'Referer', symbols)
+        self.assertIn('depth', symbols)
+        self.assertNotIn('http://www.example.com', symbols)
+        data2 = codec.encode(r2)
+        self.assertEqual(codec.symbols, symbols)
+        self.assertNotIn(b'parse_item', data2)
+        self.assertNotIn(b'Referer', data2)
+
+        decoder = RequestCodec(self.spider, symbols)
+        self._assert_same_request(r2, decoder.decode(data2))
+        self._assert_same_request(r1, decoder.decode(data1))
+
+    def test_unserializable_callback1(self):
+        r = Request("http://www.example.com", callback=lambda x: x)
+        self.assertRaises(ValueError, RequestCodec().encode, r)
+        self.assertRaises(ValueError, RequestCodec(self.spider).encode, r)
+
+    def test_unserializable_callback2(self):
+        r = Request("http://www.example.com", callback=self.spider.parse_item)
+        self.assertRaises(ValueError, RequestCodec().encode, r)
+
+    def test_unserializable_callback3(self):
+        """Parser method is removed or replaced dynamically, after requests
+        using it were serialized."""
+
+        class MySpider(Spider):
+
+            name = 'my_spider'
+
+            def parse(self, response):
+                pass
+
+        spider = MySpider()
+        codec = RequestCodec(spider)
+        r = Request("http://www.example.com", callback=spider.parse)
+        codec.encode(r)
+        setattr(spider, 'parse', None)
+        self.assertRaises(ValueError, codec.encode, r)
+
+    def test_unserializable_meta(self):
+        r = Request("http://www.example.com", meta={'callback': lambda x: x})
+        self.assertRaises(ValueError, RequestCodec().encode, r)
+
+
 class TestSpiderMixin:
     def __mixin_callback(self, response):
         pass
@@ -0,0 +1,94 @@
+import datetime
+import multiprocessing
+import time
+import unittest
+
+from scrapy.utils.shard import merge_stats, shard_for_key, ShardChannel
+
+
+class ShardForKeyTest(unittest.TestCase):
+
+    def test_shard_for_key(self):
+        self.assertEqual(shard_for_key('example.com', 1), 0)
+        shards = {shard_for_key('example%d.com' % i, 4) for i in range(100)}
+        self.assertEqual(shards, {0, 1, 2, 3})
+        self.assertEqual(shard_for_key('example.com', 4), shard_for_key('example.com', 4))
+
+
+class MergeStatsTest(unittest.TestCase):
+
+    def test_merge_stats(self):
+        start = datetime.datetime(2020, 1, 1)
+        finish = datetime.datetime(2020, 1, 2)
+        merged = merge_stats([
+            {
+                'start_time': start,
+                'finish_time': finish,
+                'finish_reason': 'finished',
+                'elapsed_time_seconds': 10.0,
+                'item_scraped_count': 3,
+                'memusage/max': 100,
+                'dnscache/hit_rate': 0.5,
+            },
+            {
+                'start_time': start + datetime.timedelta(seconds=1),
+                'finish_time': finish + datetime.timedelta(seconds=1),
+                'finish_reason': 'shutdown',
+                'elapsed_time_seconds': 12.0,
+                'item_scraped_count': 4,
+                'memusage/max': 50,
+                'log_count/ERROR': 1,
+                'dnscache/hit_rate': 0.75,
+            },
+        ])
+        self.assertEqual(merged, {
+            'start_time': start,
+            'finish_time': finish + datetime.timedelta(seconds=1),
+            'finish_reason': 'finished',
+            'elapsed_time_seconds': 12.0,
+            'item_scraped_count': 7,
+            'memusage/max': 100,
+            'log_count/ERROR': 1,
+            'dnscache/hit_rate': 0.625,
+        })
+
+
+class ShardChannelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.channel = ShardChannel(2, multiprocessing.get_context('spawn'))
+
+    def worker(self, index):
+        self.channel.index = index
+        return self.channel
+
+    def receive(self, index, timeout=5):
+        # Queue.put hands messages to a feeder thread, so they may not be
+        # available right after being sent
+        deadline = time.time() + timeout
+        while True:
+            messages = self.worker(index).receive()
+            if messages or time.time() >= deadline:
+                return messages
+            time.sleep(0.01)
+
+    def test_finished(self):
+        self.worker(0).send(1, b'request')
+        self.assertFalse(self.worker(0).set_idle())
+        # the request has not been received yet
+        self.assertFalse(self.worker(1).set_idle())
+        self.assertEqual(self.receive(1), [b'request'])
+        self.assertFalse(self.worker(1).finished)
+        self.assertTrue(self.worker(1).set_idle())
+        self.assertTrue(self.worker(0).finished)
+
+    def test_busy(self):
+        self.worker(0).set_idle()
+        self.worker(0).set_busy()
+        self.assertFalse(self.worker(1).set_idle())
+        self.assertTrue(self.worker(0).set_idle())
+
+    def test_closed(self):
+        self.worker(1).close()
+        self.assertFalse(self.worker(0).send(1, b'request'))
+        self.assertTrue(self.worker(0).set_idle())
@@ -244,6 +244,31 @@ Disallow: /forum/active/
 
         self.assertEqual(list(s), [{'loc': 'http://127.0.0.1:8000/'}])
 
+    def test_chunks(self):
+        body = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+""" + b"".join(b"<url><loc>http://www.example.com/%d</loc><priority>1</priority></url>\n" % i
+               for i in range(100)) + b"</urlset>"
+        s = Sitemap(body[i:i + 7] for i in range(0, len(body), 7))
+        self.assertEqual(s.type, 'urlset')
+        self.assertEqual(list(s), [{'loc': f'http://www.example.com/{i}', 'priority': '1'}
+                                   for i in range(100)])
+
+    def test_truncated(self):
+        s = Sitemap(b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<url><loc>http://www.example.com/1</loc></url>
+<url><loc>http://www.example.com/2</loc></url>
+<url><loc>http://www.exa""")
+        self.assertEqual(s.type, 'urlset')
+        self.assertEqual([d['loc'] for d in s][:2],
+                         ['http://www.example.com/1', 'http://www.example.com/2'])
+
+    def test_not_xml(self):
+        s = Sitemap(b"SITEMAP")
+        self.assertIsNone(s.type)
+        self.assertEqual(list(s), [])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -2,6 +2,7 @@ import unittest
 
 from scrapy.spiders import Spider
 from scrapy.utils.url import (
+    DomainMatcher,
     add_http_if_no_scheme,
     guess_scheme,
     _is_filesystem_path,
@@ -40,6 +41,28 @@ class UrlUtilsTest(unittest.TestCase):
         self.assertFalse(url_is_from_any_domain(url, ['testdomain.com']))
         self.assertFalse(url_is_from_any_domain(url + '.testdomain.com', ['testdomain.com']))
 
+    def test_url_is_from_any_domain_matcher(self):
+        matcher = DomainMatcher(['wheele-bin-art.CO.UK', 'example.com'])
+        self.assertEqual(len(matcher), 2)
+        self.assertTrue(url_is_from_any_domain('http://www.Wheele-Bin-Art.co.uk/get', matcher))
+        self.assertTrue(url_is_from_any_domain('http://a.b.example.com/', matcher))
+        self.assertFalse(url_is_from_any_domain('http://art.co.uk/', matcher))
+        self.assertFalse(url_is_from_any_domain('http://notexample.com/', matcher))
+
+    def test_domain_matcher(self):
+        matcher = DomainMatcher(['example.com', 'sub.example.org'])
+        self.assertTrue(matcher.match('example.com'))
+        self.assertTrue(matcher.match('www.example.com'))
+        self.assertTrue(matcher.match('a.b.example.com'))
+        self.assertTrue(matcher.match('sub.example.org'))
+        self.assertTrue(matcher.match('a.sub.example.org'))
+        self.assertFalse(matcher.match('example.org'))
+        self.assertFalse(matcher.match('notexample.com'))
+        self.assertFalse(matcher.match('example.com.evil.org'))
+        self.assertFalse(matcher.match('com'))
+        self.assertFalse(matcher.match(''))
+        self.assertFalse(DomainMatcher([]).match('example.com'))
+
     def test_url_is_from_spider(self):
         spider = Spider(name='example.com')
         self.assertTrue(url_is_from_spider('http://www.example.com/some/page.html', spider))